@@ -0,0 +1,56 @@
+"""
+Benchmark the update journal with concurrent and one-at-a-time writers.
+
+Concurrent appends share group commits, so their fsync cost is amortized;
+one-at-a-time appends pay for a commit each.
+
+Run with:
+    python benchmarks/journal.py
+"""
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from samples import make_updates
+
+from gpgram.journal import UpdateJournal
+
+
+async def bench(updates: list[dict], concurrent: bool, synchronous: str) -> tuple:
+    """Get the update rate and the number of commits."""
+    with tempfile.TemporaryDirectory() as directory:
+        journal = UpdateJournal(Path(directory) / "journal.db", synchronous=synchronous)
+        await journal.open()
+
+        async def handle(update_data: dict) -> None:
+            await journal.append(update_data)
+            journal.done(update_data["update_id"])
+
+        start = time.perf_counter()
+        if concurrent:
+            await asyncio.gather(*(handle(update) for update in updates))
+        else:
+            for update in updates:
+                await handle(update)
+        await journal.flush()
+        elapsed = time.perf_counter() - start
+        await journal.close()
+    return len(updates) / elapsed, journal.commits
+
+
+async def main() -> None:
+    updates = make_updates(2000)
+    for synchronous in ("FULL", "NORMAL"):
+        for concurrent in (False, True):
+            rate, commits = await bench(updates, concurrent, synchronous)
+            mode = "concurrent" if concurrent else "one at a time"
+            print(
+                f"synchronous={synchronous:6} {mode:13} "
+                f"{rate:9.0f} updates/s {commits:5} commits"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+"""
+Benchmark update parsing: validated and lazy construction.
+
+Run with:
+    python benchmarks/parse_updates.py
+"""
+
+import timeit
+
+from samples import make_updates
+
+from gpgram.types import LazyUpdate, Update
+
+
+def main() -> None:
+    updates = make_updates(100)
+    rounds = 50
+
+    cases = {
+        "validated": lambda: [Update.from_dict(u) for u in updates],
+        "lazy (routing only)": lambda: [LazyUpdate(u) for u in updates],
+        "lazy + message access": lambda: [
+            LazyUpdate(u).effective_message for u in updates
+        ],
+    }
+
+    baseline = None
+    print(f"Parsing batches of {len(updates)} updates ({rounds} rounds)")
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=rounds, repeat=5)) / rounds
+        per_update = seconds / len(updates) * 1e6
+        if baseline is None:
+            baseline = seconds
+        print(
+            f"{name:32} {seconds * 1e3:8.3f} ms/batch "
+            f"{per_update:8.2f} us/update {baseline / seconds:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
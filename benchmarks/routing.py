@@ -0,0 +1,72 @@
+"""
+Benchmark handler routing as the number of registered handlers grows.
+
+Run with:
+    python benchmarks/routing.py
+"""
+
+import re
+import timeit
+
+from gpgram.routing import CommandRouter, PatternMatcher, parse_command
+
+
+def handler(event) -> None:
+    pass
+
+
+def bench_commands(count: int, rounds: int = 20000) -> float:
+    """Get the time to route a command in microseconds."""
+    router = CommandRouter()
+    for i in range(count):
+        router.add(f"command{i}", handler)
+    text = f"/command{count - 1} some arguments"
+
+    def route():
+        name, _, _ = parse_command(text)
+        return router.match(name, text)
+
+    return min(timeit.repeat(route, number=rounds, repeat=5)) / rounds * 1e6
+
+
+def bench_patterns(count: int, rounds: int = 2000) -> tuple[float, float]:
+    """
+    Get the time to match a message against keyword patterns in microseconds,
+    searching each pattern in turn and with the combined matcher.
+    """
+    patterns = [f"keyword{i}" for i in range(count)]
+    text = f"a typical message that mentions keyword{count // 2} somewhere"
+
+    compiled = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    matcher = PatternMatcher()
+    for pattern in patterns:
+        matcher.add(pattern, handler)
+
+    def search_each():
+        return [p for p in compiled if p.search(text)]
+
+    def search_combined():
+        return matcher.match(text)
+
+    return tuple(
+        min(timeit.repeat(case, number=rounds, repeat=5)) / rounds * 1e6
+        for case in (search_each, search_combined)
+    )
+
+
+def main() -> None:
+    print("Routing the last registered command")
+    for count in (10, 100, 1000):
+        print(f"{count:6} commands {bench_commands(count):8.2f} us/command")
+
+    print("Matching a message against keyword patterns")
+    for count in (10, 100, 500):
+        each, combined = bench_patterns(count)
+        print(
+            f"{count:6} patterns {each:8.2f} us searching each "
+            f"{combined:8.2f} us combined {each / combined:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
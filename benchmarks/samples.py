@@ -0,0 +1,101 @@
+"""
+Realistic update payloads for the benchmarks.
+"""
+
+import random
+from typing import Any
+
+WORDS = ["hello", "ping", "buy", "help", "order", "status", "thanks", "price", "ok"]
+
+
+def make_user(user_id: int) -> dict[str, Any]:
+    """Build a user payload."""
+    return {
+        "id": user_id,
+        "is_bot": False,
+        "first_name": f"User{user_id}",
+        "last_name": "Example",
+        "username": f"user{user_id}",
+        "language_code": "en",
+    }
+
+
+def make_chat(chat_id: int) -> dict[str, Any]:
+    """Build a chat payload."""
+    if chat_id > 0:
+        return {
+            "id": chat_id,
+            "type": "private",
+            "first_name": f"User{chat_id}",
+            "username": f"user{chat_id}",
+        }
+    return {"id": chat_id, "type": "supergroup", "title": f"Group {-chat_id}"}
+
+
+def make_message(message_id: int, rng: random.Random) -> dict[str, Any]:
+    """Build a message payload, sometimes with a reply or a forward."""
+    user_id = rng.randint(1, 5000)
+    chat_id = user_id if rng.random() < 0.7 else -rng.randint(1000, 1100)
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+    if rng.random() < 0.2:
+        text = "/" + text
+
+    message = {
+        "message_id": message_id,
+        "from": make_user(user_id),
+        "chat": make_chat(chat_id),
+        "date": 1700000000 + message_id,
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [
+            {"offset": 0, "length": len(text.split()[0]), "type": "bot_command"}
+        ]
+    if rng.random() < 0.3:
+        message["reply_to_message"] = {
+            "message_id": message_id - 1,
+            "from": make_user(rng.randint(1, 5000)),
+            "chat": make_chat(chat_id),
+            "date": 1700000000 + message_id - 1,
+            "text": "previous message",
+        }
+    if rng.random() < 0.1:
+        message["forward_from"] = make_user(rng.randint(1, 5000))
+        message["forward_date"] = 1699990000
+    return message
+
+
+def make_updates(count: int = 100, seed: int = 0) -> list[dict[str, Any]]:
+    """
+    Build a batch of updates like the ones returned by getUpdates.
+
+    About 85% of the updates are messages and the rest are callback queries.
+
+    Args:
+        count: Number of updates
+        seed: Random seed
+
+    Returns:
+        List of update payloads
+    """
+    rng = random.Random(seed)
+    updates = []
+    for update_id in range(1, count + 1):
+        if rng.random() < 0.85:
+            updates.append(
+                {"update_id": update_id, "message": make_message(update_id, rng)}
+            )
+        else:
+            updates.append(
+                {
+                    "update_id": update_id,
+                    "callback_query": {
+                        "id": str(update_id),
+                        "from": make_user(rng.randint(1, 5000)),
+                        "message": make_message(update_id, rng),
+                        "chat_instance": "-123456789",
+                        "data": f"page_{rng.randint(1, 10)}",
+                    },
+                }
+            )
+    return updates
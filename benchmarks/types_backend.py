@@ -0,0 +1,63 @@
+"""
+Benchmark the pydantic and msgspec type backends: memory per message and
+decode throughput.
+
+Run with:
+    python benchmarks/types_backend.py
+"""
+
+import json
+import timeit
+import tracemalloc
+
+from samples import make_updates
+
+from gpgram.types import structs
+from gpgram.types.update import Update
+
+
+def measure_memory(decode, updates) -> float:
+    """Get the memory held by decoded updates in bytes per update."""
+    tracemalloc.start()
+    decoded = [decode(update) for update in updates]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del decoded
+    return size / len(updates)
+
+
+def measure_rate(decode, items, rounds: int) -> float:
+    """Get the decode throughput in items per second."""
+    seconds = min(
+        timeit.repeat(lambda: [decode(item) for item in items], number=rounds, repeat=5)
+    )
+    return len(items) * rounds / seconds
+
+
+def main() -> None:
+    updates = make_updates(1000)
+    payloads = [json.dumps(update).encode() for update in updates]
+    rounds = 5
+
+    backends = {
+        "pydantic": (
+            Update.from_dict,
+            Update.model_validate_json,
+        ),
+        "msgspec": (structs.Update.from_dict, structs.Update.from_json),
+    }
+
+    print(f"Decoding {len(updates)} updates ({rounds} rounds)")
+    for name, (from_dict, from_json) in backends.items():
+        memory = measure_memory(from_dict, updates)
+        dict_rate = measure_rate(from_dict, updates, rounds)
+        json_rate = measure_rate(from_json, payloads, rounds)
+        print(
+            f"{name:10} {memory:8.0f} bytes/update "
+            f"{dict_rate:10.0f} updates/s from dicts "
+            f"{json_rate:10.0f} updates/s from JSON"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,18 @@ Webhook Bot Example
 
 Demonstrates how to use webhooks instead of polling for updates.
 Webhooks are more efficient for production bots as they don't require constant polling.
+
+The bot is served as an ASGI application, so it can also run under uvicorn
+directly, e.g. with several worker processes:
+
+    uvicorn webhook_bot:app --host 0.0.0.0 --port 8443 --workers 4
 """
 
 import asyncio
 import os
 
 from gpgram import Bot
+from gpgram.asgi import create_asgi_app
 
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 if not TOKEN:
@@ -21,8 +27,12 @@ WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
 WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
 WEBHOOK_PATH = "/webhook"
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Must be set for webhook to work
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Recommended in production
+WEBHOOK_SSL_CERT = os.getenv("WEBHOOK_SSL_CERT")
+WEBHOOK_SSL_KEY = os.getenv("WEBHOOK_SSL_KEY")
 
 bot = Bot(TOKEN)
+app = create_asgi_app(bot, path=WEBHOOK_PATH, secret_token=WEBHOOK_SECRET)
 
 @bot.command(r"start")
 async def start(event):
@@ -175,11 +185,15 @@ async def setup_webhook():
     try:
         print(f"🔗 Setting up webhook at: {WEBHOOK_URL}")
 
-        # Set webhook with Telegram
-        success = await bot.set_webhook(
-            url=WEBHOOK_URL,
-            drop_pending_updates=True
-        )
+        # Use a separate client: the served bot runs on the server's event loop
+        async with Bot(TOKEN) as admin:
+            success = await admin.set_webhook(
+                url=WEBHOOK_URL,
+                secret_token=WEBHOOK_SECRET,
+                drop_pending_updates=True,
+                # Only the update types this bot has handlers for
+                allowed_updates=bot.allowed_updates
+            )
 
         if success:
             print("✅ Webhook set up successfully!")
@@ -192,7 +206,7 @@ async def setup_webhook():
         print(f"❌ Error setting up webhook: {e}")
         return False
 
-async def main():
+def main():
     """Main function to run the webhook bot."""
     print("🚀 Starting Webhook Bot...")
     print(f"Host: {WEBHOOK_HOST}:{WEBHOOK_PORT}")
@@ -200,75 +214,28 @@ async def main():
     print(f"URL: {WEBHOOK_URL or 'Not configured'}")
 
     # Set up webhook first
-    webhook_ok = await setup_webhook()
+    webhook_ok = asyncio.run(setup_webhook())
     if not webhook_ok:
         print("❌ Webhook setup failed. Exiting.")
         return
 
-    # Import webhook server
-    from gpgram.api.webhook import WebhookServer
+    # Check if uvicorn is available to serve the ASGI app
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ uvicorn is required to run this example")
+        print("Install it with: pip install uvicorn[standard]")
+        exit(1)
 
-    # Create webhook server
-    server = WebhookServer(
-        dispatcher=None,  # We'll handle updates directly
+    print("🌐 Starting webhook server...")
+    print("💡 Send messages to your bot to test webhook functionality")
+    uvicorn.run(
+        app,
         host=WEBHOOK_HOST,
         port=WEBHOOK_PORT,
-        webhook_path=WEBHOOK_PATH,
-        secret_token=None  # Add a secret token in production
+        ssl_certfile=WEBHOOK_SSL_CERT,
+        ssl_keyfile=WEBHOOK_SSL_KEY,
     )
 
-    # Add custom route to handle webhook updates
-    async def handle_webhook(request):
-        """Handle incoming webhook updates."""
-        try:
-            update_data = await request.json()
-            print(f"📨 Received update: {update_data}")
-
-            # Process the update with our bot
-            await bot.process_update(update_data)
-
-            return web.Response(status=200, text="OK")
-
-        except Exception as e:
-            print(f"❌ Error processing webhook: {e}")
-            return web.Response(status=500, text="Internal Server Error")
-
-    # Add the webhook route
-    server.app.router.add_post(WEBHOOK_PATH, handle_webhook)
-
-    # Add health check route
-    async def health_check(request):
-        return web.Response(status=200, text="OK")
-
-    server.app.router.add_get("/health", health_check)
-
-    try:
-        print("🌐 Starting webhook server...")
-        await server.start()
-
-        print("✅ Webhook bot is running!")
-        print(f"📡 Listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}")
-        print("💡 Send messages to your bot to test webhook functionality")
-
-        # Keep the server running
-        while True:
-            await asyncio.sleep(1)
-
-    except KeyboardInterrupt:
-        print("\n🛑 Shutting down...")
-    except Exception as e:
-        print(f"❌ Server error: {e}")
-    finally:
-        # Clean up
-        await bot.close()
-        await server.stop()
-
 if __name__ == "__main__":
-    # Check if aiohttp is available for webhook server
-    try:
-        from aiohttp import web
-        asyncio.run(main())
-    except ImportError:
-        print("❌ aiohttp is required for webhook functionality")
-        print("Install it with: pip install aiohttp")
-        exit(1)
+    main()
@@ -15,6 +15,7 @@ from .webhook import (
     run_webhook,
     setup_webhook,
 )
+from .workers import WebhookSupervisor, run_webhook_workers
 
 __all__ = [
     "WebhookServer",
@@ -22,6 +23,8 @@ __all__ = [
     "remove_webhook",
     "get_webhook_info",
     "run_webhook",
+    "WebhookSupervisor",
+    "run_webhook_workers",
     "download_file",
     "upload_media_group",
     "create_media_group",
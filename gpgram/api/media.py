@@ -8,9 +8,8 @@ import os
 from pathlib import Path
 from typing import Any, BinaryIO
 
-import aiohttp
-
 from ..core.logging import get_logger
+from ..transport import BULK
 
 logger = get_logger(__name__)
 
@@ -42,34 +41,35 @@ async def download_file(
         file_path = file_info["file_path"]
         file_url = f"https://api.telegram.org/file/bot{bot.token}/{file_path}"
 
-        # Download the file
-        async with aiohttp.ClientSession() as session:
-            async with session.get(file_url) as response:
-                if response.status != 200:
-                    logger.error(f"Failed to download file: {response.status}")
-                    return None
-
-                content = await response.read()
-
-                # Return content as bytes if no destination is provided
-                if destination is None:
-                    return content
-
-                # Save to file path
-                if isinstance(destination, (str, Path)):
-                    path = Path(destination)
-                    path.parent.mkdir(parents=True, exist_ok=True)
-                    with open(path, "wb") as f:
-                        f.write(content)
-                    return str(path)
-
-                # Write to file-like object
-                if hasattr(destination, "write"):
-                    destination.write(content)
-                    return None
-
-                logger.error(f"Invalid destination type: {type(destination)}")
-                return None
+        # Download through the capped pool shared with uploads
+        response = await bot.pools.get(
+            BULK, file_url, timeout=bot.timeouts.for_download()
+        )
+        if response.status_code != 200:
+            logger.error(f"Failed to download file: {response.status_code}")
+            return None
+
+        content = response.content
+
+        # Return content as bytes if no destination is provided
+        if destination is None:
+            return content
+
+        # Save to file path
+        if isinstance(destination, (str, Path)):
+            path = Path(destination)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(content)
+            return str(path)
+
+        # Write to file-like object
+        if hasattr(destination, "write"):
+            destination.write(content)
+            return None
+
+        logger.error(f"Invalid destination type: {type(destination)}")
+        return None
     except Exception as e:
         logger.exception(f"Error downloading file: {e}")
         return None
@@ -2,22 +2,45 @@
 Webhook support for Gpgram.
 
 This module provides utilities for setting up and handling webhooks in Telegram bots.
+
+Incoming updates are put on a bounded queue served by a fixed pool of worker
+tasks. When the queue is full the server answers with 429, so Telegram backs
+off and delivers the update again later, and on shutdown the queue is drained
+with a deadline.
+
+In webhook-reply mode the first API call a handler makes is returned in the
+webhook response when it is made within ``reply_timeout`` seconds, saving a
+separate request (see :mod:`gpgram.webhook_reply`).
+
+With an update journal, each update is committed to disk before it is
+acknowledged, and updates left in the journal by a previous run are replayed
+when the server starts. With a backlog policy, stale updates are acknowledged
+without being queued (see :mod:`gpgram.backlog`).
 """
 
 import asyncio
 import json
 import ssl
+from http import HTTPStatus
 from typing import Any
 
 from aiohttp import web
 
+from ..backlog import BacklogPolicy
+from ..codec import JSONCodec, get_codec
 from ..core.bot import Bot
 from ..core.dispatcher import Dispatcher
 from ..core.logging import get_logger
-from ..types.update import Update
+from ..dedup import UpdateDeduplicator
+from ..intake import UpdateIntake, WebhookQueue
+from ..journal import UpdateJournal
+from ..types import Update
 
 logger = get_logger(__name__)
 
+# Header Telegram sends the webhook secret token in
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
 
 class WebhookServer:
     """
@@ -37,6 +60,16 @@ class WebhookServer:
         drop_pending_updates: bool = False,
         allowed_updates: list[str] | None = None,
         custom_routes: list[dict[str, Any]] | None = None,
+        codec: JSONCodec | None = None,
+        workers: int = 8,
+        queue_size: int = 100,
+        drain_timeout: float | None = 10.0,
+        webhook_reply: bool = False,
+        reply_timeout: float = 0.5,
+        reuse_port: bool = False,
+        journal: UpdateJournal | None = None,
+        deduplicate: UpdateDeduplicator | bool = True,
+        backlog: BacklogPolicy | None = None,
     ):
         """
         Initialize the WebhookServer.
@@ -51,6 +84,26 @@ class WebhookServer:
             drop_pending_updates: Whether to drop pending updates when setting the webhook
             allowed_updates: List of update types to receive
             custom_routes: List of custom routes to add to the server
+            codec: JSON codec for decoding updates. Defaults to the bot's codec,
+                or the fastest installed codec.
+            workers: Number of worker tasks processing updates. Updates from
+                the same chat are processed in order by the same worker.
+            queue_size: Maximum number of queued updates per worker; further
+                updates are rejected with 429 until the queue has room
+            drain_timeout: Seconds to wait for queued updates on ``stop()``,
+                or None to wait for all of them
+            webhook_reply: Return the first API call of each update's
+                handlers in the webhook response instead of sending it
+            reply_timeout: Seconds to hold the webhook response open for an
+                API call to return in it
+            reuse_port: Bind with ``SO_REUSEPORT``, so several processes can
+                serve the same port
+            journal: Durable journal that updates are written to before
+                they are acknowledged and replayed from after a crash
+            deduplicate: Filter that drops updates Telegram delivers more
+                than once. True creates one with the default size, False
+                disables it.
+            backlog: Policy that sheds stale updates after downtime
         """
         self.dispatcher = dispatcher
         self.host = host
@@ -61,6 +114,23 @@ class WebhookServer:
         self.drop_pending_updates = drop_pending_updates
         self.allowed_updates = allowed_updates
         self.custom_routes = custom_routes or []
+        if codec is None and dispatcher is not None:
+            codec = getattr(dispatcher.bot, "codec", None)
+        self.codec = codec or get_codec()
+        self.drain_timeout = drain_timeout
+        self.reuse_port = reuse_port
+
+        if deduplicate is True:
+            deduplicate = UpdateDeduplicator()
+        self.intake = UpdateIntake(journal, deduplicate or None, backlog)
+        self.queue = WebhookQueue(
+            self._process_update,
+            self.intake,
+            workers=workers,
+            queue_size=queue_size,
+            webhook_reply=webhook_reply,
+            reply_timeout=reply_timeout,
+        )
 
         self.app = web.Application()
         self.runner = None
@@ -96,36 +166,82 @@ class WebhookServer:
             else:
                 logger.warning(f"Unsupported method {method} for route {path}")
 
-    async def _handle_webhook(self, request: web.Request) -> web.Response:
+    def _authorized(self, request: web.Request) -> bool:
         """
-        Handle webhook requests from Telegram.
+        Verify the secret token of a webhook request, if one is set.
 
         Args:
             request: Web request
 
         Returns:
-            Web response
+            True if the request may be handled
         """
-        # Verify secret token if provided
         if self.secret_token:
-            token_header = request.headers.get("X-Telegram-Bot-Api-Secret-Token")
+            token_header = request.headers.get(SECRET_TOKEN_HEADER)
             if token_header != self.secret_token:
                 logger.warning("Invalid secret token in webhook request")
-                return web.Response(status=403, text="Forbidden")
+                return False
+        return True
 
-        try:
-            # Parse update
-            update_data = await request.json()
-            update = Update.from_dict(update_data)
+    async def _handle_webhook(self, request: web.Request) -> web.Response:
+        """
+        Handle webhook requests from Telegram.
 
-            # Process update
-            asyncio.create_task(self.dispatcher.process_update(update))
+        Args:
+            request: Web request
 
-            return web.Response(status=200)
+        Returns:
+            Web response
+        """
+        if not self._authorized(request):
+            return web.Response(status=403, text="Forbidden")
+
+        try:
+            update_data = self.codec.loads(await request.read())
         except Exception as e:
             logger.exception(f"Error handling webhook request: {e}")
             return web.Response(status=500, text="Internal Server Error")
 
+        return await self._queue_update(request, update_data)
+
+    async def _queue_update(
+        self, request: web.Request, update_data: dict[str, Any]
+    ) -> web.Response:
+        """
+        Queue a decoded update and build the webhook response.
+
+        Args:
+            request: Web request the update was received in
+            update_data: Update data from Telegram
+
+        Returns:
+            Web response
+        """
+        status, body = await self.queue.submit(update_data)
+        if status != 200:
+            # Telegram will deliver the update again
+            headers = {"Retry-After": "1"} if status == 429 else None
+            return web.Response(
+                status=status, text=HTTPStatus(status).phrase, headers=headers
+            )
+        if body is None:
+            return web.Response(status=200)
+        return web.Response(
+            status=200, body=self.codec.dumps(body), content_type="application/json"
+        )
+
+    async def _process_update(self, update_data: dict[str, Any]) -> None:
+        """
+        Parse a queued update and pass it to the dispatcher.
+
+        Args:
+            update_data: Update data from Telegram
+        """
+        try:
+            await self.dispatcher.process_update(Update.from_dict(update_data))
+        finally:
+            self.intake.done(update_data["update_id"])
+
     async def _handle_health_check(self, request: web.Request) -> web.Response:
         """
         Handle health check requests.
@@ -139,26 +255,53 @@ class WebhookServer:
         return web.Response(
             status=200,
             content_type="application/json",
-            text=json.dumps({"status": "ok"}),
+            text=json.dumps({"status": "ok", **self.get_stats()}),
         )
 
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get the update queue statistics.
+
+        Returns:
+            Number of queued, accepted, rejected, duplicate and shed updates
+        """
+        return self.queue.get_stats()
+
     async def start(self) -> None:
         """Start the webhook server."""
+        for update_data in await self.intake.recover():
+            await self._process_update(update_data)
+
+        self.queue.start()
+
         self.runner = web.AppRunner(self.app)
         await self.runner.setup()
 
         self.site = web.TCPSite(
-            self.runner, host=self.host, port=self.port, ssl_context=self.ssl_context
+            self.runner,
+            host=self.host,
+            port=self.port,
+            ssl_context=self.ssl_context,
+            reuse_port=self.reuse_port or None,
         )
 
         await self.site.start()
         logger.info(f"Webhook server started at {self.host}:{self.port}")
 
     async def stop(self) -> None:
-        """Stop the webhook server."""
+        """
+        Stop the webhook server.
+
+        New updates are refused, and the queued ones are processed until
+        ``drain_timeout`` expires.
+        """
+        self.queue.accepting = False
         if self.site:
             await self.site.stop()
 
+        await self.queue.drain(self.drain_timeout)
+        await self.intake.close()
+
         if self.runner:
             await self.runner.cleanup()
 
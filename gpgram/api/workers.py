@@ -0,0 +1,430 @@
+"""
+Multi-process webhook serving for Gpgram.
+
+A single webhook server runs on one event loop and is capped at one CPU core.
+The supervisor in this module starts several worker processes that all bind
+the webhook port with ``SO_REUSEPORT``, so the kernel spreads incoming
+connections across them. Each worker builds its own dispatcher, bot and HTTP
+client from a factory function. Workers that crash are restarted, and on
+shutdown every worker drains its queue before it exits.
+
+Connections are assigned to workers at random, so updates from the same chat
+may be handled by different processes. With ``route_by_chat=True`` a worker
+forwards each update to the worker that owns its chat, over a private
+loopback port, which keeps the updates of a chat in order across processes.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import ssl
+import time
+from collections.abc import Callable
+from multiprocessing.connection import wait
+from typing import Any
+
+import aiohttp
+from aiohttp import web
+
+from ..concurrency import get_chat_id
+from ..core.dispatcher import Dispatcher
+from ..core.logging import get_logger
+from .webhook import SECRET_TOKEN_HEADER, WebhookServer, remove_webhook, setup_webhook
+
+logger = get_logger(__name__)
+
+# Header marking an update forwarded by another worker
+FORWARDED_HEADER = "X-Gpgram-Forwarded"
+
+
+def get_worker_index(update_data: dict[str, Any], workers: int) -> int:
+    """
+    Select the worker that owns an update.
+
+    Chat identifiers are integers, whose hash is the same in every process.
+
+    Args:
+        update_data: Update data from Telegram
+        workers: Number of workers
+
+    Returns:
+        Index of the worker that handles the update's chat
+    """
+    key = get_chat_id(update_data)
+    if key is None:
+        key = update_data.get("update_id", 0)
+    return key % workers
+
+
+class WorkerWebhookServer(WebhookServer):
+    """
+    Webhook server for one of several worker processes.
+
+    The server binds the public port with ``SO_REUSEPORT``. If ``route_port``
+    is set, it also listens on ``127.0.0.1:route_port + index`` and forwards
+    every update that belongs to another worker's chats to that worker.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        index: int,
+        workers: int,
+        route_port: int | None = None,
+        forward_timeout: float = 10.0,
+        **kwargs: Any,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            dispatcher: Dispatcher instance
+            index: Index of this worker
+            workers: Number of workers
+            route_port: First private port used to route updates by chat, or
+                None to handle every update where it arrives
+            forward_timeout: Seconds to wait for another worker to answer a
+                forwarded update
+            **kwargs: Arguments for :class:`WebhookServer`
+        """
+        super().__init__(dispatcher, reuse_port=True, **kwargs)
+        self.index = index
+        self.workers = workers
+        self.route_port = route_port
+        self.forward_timeout = forward_timeout
+        self.forwarded = 0
+        self.private_site = None
+        self._session: aiohttp.ClientSession | None = None
+
+    async def start(self) -> None:
+        """Start the webhook server and the private routing listener."""
+        await super().start()
+        if self.route_port is None:
+            return
+
+        self.private_site = web.TCPSite(
+            self.runner, host="127.0.0.1", port=self.route_port + self.index
+        )
+        await self.private_site.start()
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.forward_timeout)
+        )
+
+    async def stop(self) -> None:
+        """Stop the webhook server and the private routing listener."""
+        if self.private_site:
+            await self.private_site.stop()
+        await super().stop()
+        if self._session:
+            await self._session.close()
+
+    async def _queue_update(
+        self, request: web.Request, update_data: dict[str, Any]
+    ) -> web.Response:
+        """
+        Queue an update here, or forward it to the worker that owns it.
+
+        Args:
+            request: Web request the update was received in
+            update_data: Update data from Telegram
+
+        Returns:
+            Web response
+        """
+        if self.route_port is not None and FORWARDED_HEADER not in request.headers:
+            owner = get_worker_index(update_data, self.workers)
+            if owner != self.index:
+                return await self._forward(owner, request)
+        return await super()._queue_update(request, update_data)
+
+    async def _forward(self, owner: int, request: web.Request) -> web.Response:
+        """
+        Forward a webhook request to another worker and relay its response.
+
+        Args:
+            owner: Index of the worker that owns the update
+            request: Web request to forward
+
+        Returns:
+            The other worker's response
+        """
+        headers = {FORWARDED_HEADER: str(self.index)}
+        for name in (SECRET_TOKEN_HEADER, "Content-Type"):
+            if name in request.headers:
+                headers[name] = request.headers[name]
+        url = f"http://127.0.0.1:{self.route_port + owner}{self.webhook_path}"
+
+        try:
+            async with self._session.post(
+                url, data=await request.read(), headers=headers
+            ) as response:
+                body = await response.read()
+                self.forwarded += 1
+                return web.Response(
+                    status=response.status,
+                    body=body,
+                    content_type=response.content_type,
+                )
+        except (aiohttp.ClientError, TimeoutError) as e:
+            # Telegram will deliver the update again
+            logger.warning(f"Could not forward update to worker {owner}: {e}")
+            return web.Response(status=503, text="Service Unavailable")
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get the update queue and routing statistics.
+
+        Returns:
+            Number of queued, accepted, rejected and forwarded updates
+        """
+        return {**super().get_stats(), "forwarded": self.forwarded}
+
+
+async def _serve_worker(
+    dispatcher_factory: Callable[[], Dispatcher],
+    index: int,
+    workers: int,
+    route_port: int | None,
+    options: dict[str, Any],
+) -> None:
+    """Run a worker's webhook server until it receives SIGINT or SIGTERM."""
+    options = dict(options)
+    ssl_cert_path = options.pop("ssl_cert_path", None)
+    ssl_key_path = options.pop("ssl_key_path", None)
+    if ssl_cert_path and ssl_key_path:
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(ssl_cert_path, ssl_key_path)
+        options["ssl_context"] = ssl_context
+
+    dispatcher = dispatcher_factory()
+    server = WorkerWebhookServer(
+        dispatcher, index=index, workers=workers, route_port=route_port, **options
+    )
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+
+    await server.start()
+    logger.info(f"Webhook worker {index} started (pid {os.getpid()})")
+    try:
+        await stopping.wait()
+    finally:
+        await server.stop()
+        await dispatcher.bot.close()
+
+
+def _run_worker(
+    dispatcher_factory: Callable[[], Dispatcher],
+    index: int,
+    workers: int,
+    route_port: int | None,
+    options: dict[str, Any],
+) -> None:
+    """Entry point of a worker process."""
+    asyncio.run(_serve_worker(dispatcher_factory, index, workers, route_port, options))
+
+
+class WebhookSupervisor:
+    """
+    Supervisor for a set of webhook worker processes.
+
+    Workers are started with the ``spawn`` method, so each one has a fresh
+    interpreter with its own event loop and HTTP client, and the dispatcher
+    factory must be a module-level function.
+    """
+
+    def __init__(
+        self,
+        dispatcher_factory: Callable[[], Dispatcher],
+        workers: int | None = None,
+        route_by_chat: bool = False,
+        route_port: int | None = None,
+        restart_delay: float = 1.0,
+        stop_timeout: float = 15.0,
+        **options: Any,
+    ):
+        """
+        Initialize the supervisor.
+
+        Args:
+            dispatcher_factory: Function that builds the dispatcher, and its
+                bot, in each worker process
+            workers: Number of worker processes. Defaults to the number of
+                CPUs.
+            route_by_chat: Route each update to the worker that owns its chat
+            route_port: First private port for routing; worker ``i`` listens
+                on ``127.0.0.1:route_port + i``. Defaults to the port after
+                the webhook port.
+            restart_delay: Seconds to wait before restarting a crashed worker
+            stop_timeout: Seconds to wait for the workers to drain their
+                queues on shutdown before they are killed
+            **options: Arguments for :class:`WebhookServer`; pass
+                ``ssl_cert_path`` and ``ssl_key_path`` instead of an SSL
+                context, which cannot be sent to another process
+        """
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.dispatcher_factory = dispatcher_factory
+        self.workers = workers or os.cpu_count() or 1
+        if route_by_chat and route_port is None:
+            route_port = options.get("port", 8443) + 1
+        self.route_port = route_port if route_by_chat else None
+        self.restart_delay = restart_delay
+        self.stop_timeout = stop_timeout
+        self.options = options
+        self.restarts = 0
+
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: list[multiprocessing.Process] = []
+        self._stopping = False
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        """Start the worker process with the given index."""
+        process = self._context.Process(
+            target=_run_worker,
+            args=(
+                self.dispatcher_factory,
+                index,
+                self.workers,
+                self.route_port,
+                self.options,
+            ),
+            name=f"gpgram-webhook-{index}",
+        )
+        process.start()
+        return process
+
+    def run(self) -> None:
+        """
+        Start the workers and supervise them until SIGINT or SIGTERM.
+
+        Blocks until every worker has stopped.
+        """
+        self._stopping = False
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: self.stop())
+
+        self._processes = [self._spawn(index) for index in range(self.workers)]
+        logger.info(f"Started {self.workers} webhook workers")
+        try:
+            while not self._stopping:
+                wait([process.sentinel for process in self._processes], timeout=1.0)
+                for index, process in enumerate(self._processes):
+                    if process.exitcode is None or self._stopping:
+                        continue
+                    logger.warning(
+                        f"Webhook worker {index} exited with code "
+                        f"{process.exitcode}, restarting"
+                    )
+                    time.sleep(self.restart_delay)
+                    self._processes[index] = self._spawn(index)
+                    self.restarts += 1
+        finally:
+            self._shutdown()
+
+    def stop(self) -> None:
+        """Ask the supervisor to stop the workers."""
+        self._stopping = True
+
+    def _shutdown(self) -> None:
+        """Stop the workers, killing those that do not stop in time."""
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.stop_timeout
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Killing webhook worker {process.name}")
+                process.kill()
+                process.join()
+        logger.info("Webhook workers stopped")
+
+
+def run_webhook_workers(
+    dispatcher_factory: Callable[[], Dispatcher],
+    webhook_url: str,
+    workers: int | None = None,
+    route_by_chat: bool = False,
+    webhook_path: str = "/webhook",
+    host: str = "0.0.0.0",
+    port: int = 8443,
+    ssl_cert_path: str | None = None,
+    ssl_key_path: str | None = None,
+    secret_token: str | None = None,
+    drop_pending_updates: bool = False,
+    allowed_updates: list[str] | None = None,
+    **options: Any,
+) -> None:
+    """
+    Run a bot with webhook updates served by several worker processes.
+
+    The webhook is registered once, before the workers start, and removed
+    after they stop. Blocks until SIGINT or SIGTERM.
+
+    Args:
+        dispatcher_factory: Module-level function that builds the dispatcher,
+            and its bot, in each process
+        webhook_url: HTTPS URL for the webhook
+        workers: Number of worker processes. Defaults to the number of CPUs.
+        route_by_chat: Route each update to the worker that owns its chat,
+            so the updates of a chat are handled in order
+        webhook_path: Path for the webhook endpoint
+        host: Host to bind the server to
+        port: Port to bind the server to
+        ssl_cert_path: Path to SSL certificate
+        ssl_key_path: Path to SSL private key
+        secret_token: Secret token to validate webhook requests
+        drop_pending_updates: Whether to drop pending updates
+        allowed_updates: List of update types to receive
+        **options: Further arguments for :class:`WebhookSupervisor` and
+            :class:`WebhookServer`
+    """
+
+    async def register() -> bool:
+        bot = dispatcher_factory().bot
+        try:
+            return await setup_webhook(
+                bot=bot,
+                url=webhook_url,
+                certificate=open(ssl_cert_path, "rb").read() if ssl_cert_path else None,
+                allowed_updates=allowed_updates,
+                drop_pending_updates=drop_pending_updates,
+                secret_token=secret_token,
+            )
+        finally:
+            await bot.close()
+
+    async def unregister() -> None:
+        bot = dispatcher_factory().bot
+        try:
+            await remove_webhook(bot)
+        finally:
+            await bot.close()
+
+    if not asyncio.run(register()):
+        logger.error("Failed to set up webhook, exiting")
+        return
+
+    supervisor = WebhookSupervisor(
+        dispatcher_factory,
+        workers=workers,
+        route_by_chat=route_by_chat,
+        webhook_path=webhook_path,
+        host=host,
+        port=port,
+        ssl_cert_path=ssl_cert_path,
+        ssl_key_path=ssl_key_path,
+        secret_token=secret_token,
+        allowed_updates=allowed_updates,
+        **options,
+    )
+    try:
+        supervisor.run()
+    finally:
+        asyncio.run(unregister())
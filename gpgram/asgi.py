@@ -0,0 +1,283 @@
+"""
+ASGI webhook application for Gpgram.
+
+This module turns a :class:`gpgram.Bot` into an ASGI application, so it can
+receive webhook updates behind any ASGI server and middleware::
+
+    from gpgram import Bot
+    from gpgram.asgi import create_asgi_app
+
+    bot = Bot("YOUR_BOT_TOKEN")
+    app = create_asgi_app(bot, secret_token="YOUR_SECRET")
+
+    # uvicorn mybot:app --loop uvloop --http httptools --workers 4
+
+Every request is checked against the secret token, its raw body is decoded
+with the bot's codec, and the update is queued for a fixed pool of worker
+tasks, so Telegram gets its response without waiting for the handlers. When
+the queue is full the application answers with 429 and Telegram delivers the
+update again later. On lifespan shutdown the queue is drained with a
+deadline and the bot is closed.
+
+If the bot has an update journal, each update is committed to it before the
+request is answered, and updates left in it by a previous run are replayed
+when the application starts. If it has a backlog policy, stale updates are answered
+right away without being queued.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+from collections.abc import Awaitable, Callable, MutableMapping
+from http import HTTPStatus
+from typing import Any
+
+from .bot import Bot
+from .intake import WebhookQueue
+
+logger = logging.getLogger(__name__)
+
+Scope = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[MutableMapping[str, Any]]]
+Send = Callable[[MutableMapping[str, Any]], Awaitable[None]]
+
+# Header Telegram sends the webhook secret token in, as ASGI servers pass it
+SECRET_TOKEN_HEADER = b"x-telegram-bot-api-secret-token"
+
+
+async def _respond(
+    send: Send,
+    status: int,
+    body: bytes = b"",
+    content_type: bytes = b"text/plain; charset=utf-8",
+    headers: list[tuple[bytes, bytes]] | None = None,
+) -> None:
+    """Send a complete HTTP response."""
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type),
+                (b"content-length", str(len(body)).encode()),
+                *(headers or ()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class WebhookApp:
+    """
+    ASGI application that receives webhook updates for a bot.
+
+    The update queue is started on lifespan startup, or on the first request
+    if the server does not send lifespan events.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        path: str = "/webhook",
+        secret_token: str | None = None,
+        workers: int = 8,
+        queue_size: int = 100,
+        drain_timeout: float | None = 10.0,
+        webhook_reply: bool = False,
+        reply_timeout: float = 0.5,
+        max_body_size: int = 1 << 20,
+        health_path: str | None = "/health",
+        close_bot: bool = True,
+    ):
+        """
+        Initialize the application.
+
+        Args:
+            bot: Bot that handles the updates
+            path: Path of the webhook endpoint
+            secret_token: Secret token to validate webhook requests
+            workers: Number of worker tasks processing updates. Updates from
+                the same chat are processed in order by the same worker.
+            queue_size: Maximum number of queued updates per worker; further
+                updates are rejected with 429 until the queue has room
+            drain_timeout: Seconds to wait for queued updates on shutdown, or
+                None to wait for all of them
+            webhook_reply: Return the first API call of each update's
+                handlers in the webhook response instead of sending it
+            reply_timeout: Seconds to hold the webhook response open for an
+                API call to return in it
+            max_body_size: Maximum request body size in bytes
+            health_path: Path of the health check endpoint, or None to
+                disable it
+            close_bot: Close the bot on lifespan shutdown
+        """
+        self.bot = bot
+        self.path = path
+        self.secret_token = secret_token.encode() if secret_token else None
+        self.drain_timeout = drain_timeout
+        self.max_body_size = max_body_size
+        self.health_path = health_path
+        self.close_bot = close_bot
+
+        self.queue = WebhookQueue(
+            bot.handle_update,
+            bot.intake,
+            workers=workers,
+            queue_size=queue_size,
+            webhook_reply=webhook_reply,
+            reply_timeout=reply_timeout,
+        )
+        self._started = False
+        self._start_lock = asyncio.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Handle an ASGI connection.
+
+        Args:
+            scope: Connection scope
+            receive: Channel for incoming messages
+            send: Channel for outgoing messages
+        """
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        path = scope["path"]
+        method = scope["method"]
+        if path == self.path:
+            if method != "POST":
+                await _respond(
+                    send, 405, b"Method Not Allowed", headers=[(b"allow", b"POST")]
+                )
+            else:
+                await self._handle_webhook(scope, receive, send)
+        elif path == self.health_path and method in ("GET", "HEAD"):
+            body = json.dumps({"status": "ok", **self.get_stats()}).encode()
+            await _respond(send, 200, body, b"application/json")
+        else:
+            await _respond(send, 404, b"Not Found")
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        """Start and stop the update queue with the server."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def start(self) -> None:
+        """
+        Open the bot's update journal, replay the updates left in it and
+        start the worker tasks that process queued updates.
+        """
+        async with self._start_lock:
+            if self._started:
+                return
+            await self.bot.replay_journal()
+            self.queue.start()
+            self._started = True
+
+    async def shutdown(self) -> None:
+        """
+        Stop accepting updates, process the queued ones until
+        ``drain_timeout`` expires and close the bot.
+        """
+        if self._started:
+            await self.queue.drain(self.drain_timeout)
+        if self.close_bot:
+            await self.bot.close()
+
+    def _authorized(self, scope: Scope) -> bool:
+        """Verify the secret token of a webhook request, if one is set."""
+        if self.secret_token is None:
+            return True
+        for name, value in scope["headers"]:
+            if name == SECRET_TOKEN_HEADER:
+                return hmac.compare_digest(value, self.secret_token)
+        return False
+
+    async def _read_body(self, receive: Receive) -> bytes | None:
+        """Read the request body, or return None if it is too large."""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_size:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    async def _handle_webhook(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Check, decode and queue a webhook update."""
+        if not self._authorized(scope):
+            logger.warning("Invalid secret token in webhook request")
+            await _respond(send, 403, b"Forbidden")
+            return
+
+        if not self._started:
+            await self.start()
+
+        body = await self._read_body(receive)
+        if body is None:
+            await _respond(send, 413, b"Payload Too Large")
+            return
+
+        try:
+            update_data = self.bot.codec.loads(body)
+        except ValueError:
+            update_data = None
+        if not isinstance(update_data, dict):
+            logger.warning("Invalid update in webhook request")
+            await _respond(send, 400, b"Bad Request")
+            return
+
+        status, response = await self.queue.submit(update_data)
+        if status != 200:
+            # Telegram will deliver the update again
+            headers = [(b"retry-after", b"1")] if status == 429 else None
+            await _respond(
+                send, status, HTTPStatus(status).phrase.encode(), headers=headers
+            )
+        elif response is None:
+            await _respond(send, 200)
+        else:
+            await _respond(
+                send, 200, self.bot.codec.dumps(response), b"application/json"
+            )
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get the update queue statistics.
+
+        Returns:
+            Number of queued, accepted, rejected, duplicate and shed updates
+        """
+        return self.queue.get_stats()
+
+
+def create_asgi_app(bot: Bot, **kwargs: Any) -> WebhookApp:
+    """
+    Create an ASGI application that receives webhook updates for a bot.
+
+    Args:
+        bot: Bot that handles the updates
+        **kwargs: Options for :class:`WebhookApp`, e.g. ``secret_token``
+
+    Returns:
+        The ASGI application
+    """
+    return WebhookApp(bot, **kwargs)
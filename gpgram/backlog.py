@@ -0,0 +1,169 @@
+"""
+Backlog shedding for Gpgram.
+
+After an outage Telegram delivers every update that arrived while the bot was
+down, oldest first. Answering hours-old messages one by one delays the fresh
+ones behind them, while ``drop_pending_updates`` throws away everything,
+including button presses and payments that still need an answer.
+
+A :class:`BacklogPolicy` drops the updates that are older than a configured
+age before they are journaled or dispatched, and always keeps the kinds of
+update that must be answered no matter how late they arrive::
+
+    async def apologize(updates):
+        chats = {u["message"]["chat"]["id"] for u in updates if "message" in u}
+        for chat_id in chats:
+            await bot.send_message(chat_id, "Sorry, I was offline for a while.")
+
+    bot = Bot("YOUR_BOT_TOKEN", backlog=BacklogPolicy(300, on_shed=apologize))
+"""
+
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+from .types.lazy import MESSAGE_KINDS, get_update_kind
+
+logger = logging.getLogger(__name__)
+
+# Update kinds that are kept however old they are: a pending callback query
+# leaves a spinner on the button, and payment queries must be answered
+KEEP_UPDATE_TYPES = ("callback_query", "shipping_query", "pre_checkout_query")
+
+# Message fields that mark a message as part of a payment
+_PAYMENT_FIELDS = ("successful_payment", "refunded_payment")
+
+# Update kinds whose payload carries the Unix time it was sent or edited at
+_DATED_KINDS = MESSAGE_KINDS | {
+    "business_message",
+    "edited_business_message",
+    "my_chat_member",
+    "chat_member",
+    "chat_join_request",
+    "message_reaction",
+    "message_reaction_count",
+}
+
+
+class BacklogPolicy:
+    """
+    Policy that sheds updates which are too old to be worth handling.
+
+    An update is shed if its payload is dated more than ``max_age`` seconds
+    ago, edits by their edit date, unless its kind is in ``keep`` or it is a
+    payment message. Updates without a date, such as callback queries and
+    inline queries, are never shed.
+    """
+
+    def __init__(
+        self,
+        max_age: float,
+        keep: Iterable[str] = KEEP_UPDATE_TYPES,
+        on_shed: Callable[[list[dict[str, Any]]], Awaitable[None]] | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize the policy.
+
+        Args:
+            max_age: Age in seconds after which an update is shed
+            keep: Update kinds that are never shed
+            on_shed: Coroutine function called with each batch of shed
+                updates, e.g. to tell the affected chats that their messages
+                were skipped
+            clock: Function returning the current Unix time
+        """
+        if max_age < 0:
+            raise ValueError("max_age must not be negative")
+
+        self.max_age = max_age
+        self.keep = frozenset(keep)
+        self.on_shed = on_shed
+        self.clock = clock
+
+        self.checked = 0
+        self.shed = 0
+        self.shed_by_type: dict[str, int] = {}
+
+    def is_stale(self, update_data: dict[str, Any], now: float | None = None) -> bool:
+        """
+        Check whether an update should be shed.
+
+        Args:
+            update_data: Update data from Telegram
+            now: Current Unix time. Defaults to the policy's clock.
+
+        Returns:
+            True if the update is too old and may be dropped
+        """
+        kind = get_update_kind(update_data)
+        if kind not in _DATED_KINDS or kind in self.keep:
+            return False
+
+        payload = update_data[kind]
+        if kind in MESSAGE_KINDS and any(field in payload for field in _PAYMENT_FIELDS):
+            return False
+
+        # An edit is as recent as the edit, not the original message
+        date = payload.get("edit_date") or payload.get("date")
+        if date is None:
+            return False
+        if now is None:
+            now = self.clock()
+        return now - date > self.max_age
+
+    async def filter(self, updates: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Shed the stale updates of a batch.
+
+        Args:
+            updates: Update data from Telegram
+
+        Returns:
+            The updates to handle, in their original order
+        """
+        if not updates:
+            return updates
+
+        now = self.clock()
+        kept = []
+        shed = []
+        for update_data in updates:
+            if self.is_stale(update_data, now):
+                shed.append(update_data)
+            else:
+                kept.append(update_data)
+
+        self.checked += len(updates)
+        if not shed:
+            return kept
+
+        self.shed += len(shed)
+        for update_data in shed:
+            kind = get_update_kind(update_data)
+            self.shed_by_type[kind] = self.shed_by_type.get(kind, 0) + 1
+        logger.info(
+            f"Shed {len(shed)} updates older than {self.max_age:g}s "
+            f"(up to update {shed[-1]['update_id']})"
+        )
+
+        if self.on_shed is not None:
+            try:
+                await self.on_shed(shed)
+            except Exception:
+                logger.exception("Error in backlog shed callback")
+        return kept
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Get the shedding statistics.
+
+        Returns:
+            Number of checked and shed updates, and of shed updates per kind
+        """
+        return {
+            "checked": self.checked,
+            "shed": self.shed,
+            "shed_by_type": dict(self.shed_by_type),
+        }
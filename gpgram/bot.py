@@ -3,15 +3,69 @@ Gpgram - A modern, clean Telegram Bot API library.
 """
 
 import asyncio
-import re
-from collections.abc import Awaitable, Callable
+import inspect
+from collections.abc import Awaitable, Callable, Iterable
 from typing import Any
 
-import httpx
+from .backlog import BacklogPolicy
+from .codec import JSONCodec, get_codec
+from .concurrency import OffsetTracker, UpdateWorkerPool
+from .dedup import UpdateDeduplicator
+from .dispatch import EXECUTORS, THREAD, HandlerDispatcher, get_handler_name
+from .exceptions import APIError
+from .filters import UpdateInfo, make_filter
+from .intake import UpdateIntake
+from .journal import UpdateJournal
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .routing import CommandRouter, PatternMatcher, parse_command
+from .transport import (
+    JSON_HEADERS,
+    ConnectionPools,
+    Timeouts,
+    get_traffic_class,
+)
+from .types import CallbackQuery, IdentityMap, LazyUpdate, Message, Update
+from .webhook_reply import send_in_webhook_reply
+
+# Update types the bot dispatches to handlers, in the order sent to Telegram
+UPDATE_TYPES = ("message", "callback_query")
+
+
+def _check_executor(executor: str | None) -> None:
+    """Check that a handler executor name is valid."""
+    if executor is not None and executor not in EXECUTORS:
+        raise ValueError(
+            f"Unknown executor {executor!r}, expected one of {', '.join(EXECUTORS)}"
+        )
+
 
-from .types.callback_query import CallbackQuery
-from .types.message import Message
-from .types.update import Update
+def _set_handler_options(
+    func: Callable,
+    timeout: float | None,
+    sequential: bool,
+    executor: str | None,
+) -> None:
+    """Store the execution options of a handler on the handler."""
+    if timeout is not None:
+        func._timeout = timeout
+    if sequential:
+        func._sequential = True
+    # Callable objects with an async __call__ are coroutine functions too
+    is_coroutine = inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(
+        type(func).__call__
+    )
+    if executor is not None and is_coroutine:
+        # An executor would only create the coroutine, never run it
+        raise TypeError(
+            f"Handler {get_handler_name(func)!r} is a coroutine function and "
+            f"cannot run in the {executor} executor"
+        )
+    # Sync handlers must not block the event loop
+    if executor is None and not is_coroutine:
+        executor = THREAD
+    if executor is not None:
+        func._executor = executor
 
 
 class Bot:
@@ -27,30 +81,108 @@ class Bot:
         token: str,
         timeout: float = 30.0,
         api_url: str | None = None,
+        rate_limiter: RateLimiter | bool = True,
+        retry_policy: RetryPolicy | None = None,
+        timeouts: Timeouts | None = None,
+        pools: ConnectionPools | None = None,
+        codec: JSONCodec | None = None,
+        lazy_updates: bool = False,
+        identity_map: IdentityMap | bool = False,
+        concurrent_handlers: bool = False,
+        handler_timeout: float | None = None,
+        thread_pool_size: int | None = None,
+        process_pool_size: int | None = None,
+        journal: UpdateJournal | str | None = None,
+        deduplicate: UpdateDeduplicator | bool = True,
+        backlog: BacklogPolicy | float | None = None,
     ):
         """
         Initialize the bot.
 
         Args:
             token: Telegram bot token
-            timeout: Request timeout in seconds
+            timeout: Timeout for regular API calls in seconds. Ignored if
+                ``timeouts`` is given.
             api_url: Custom API URL (optional)
+            rate_limiter: Outbound rate limiter. True uses the default
+                Telegram limits, False disables rate limiting.
+            retry_policy: Policy deciding which failed requests are retried
+            timeouts: Per-method timeout profiles for long polls, regular
+                calls and file transfers
+            pools: HTTP connection pools for each traffic class
+            codec: JSON codec for requests and responses. Defaults to the
+                fastest installed codec.
+            lazy_updates: Whether handlers receive lazily parsed updates,
+                which only validate the fields that are accessed.
+                ``event.update`` is then a :class:`LazyUpdate` instead of
+                an :class:`Update`.
+            identity_map: Identity map that shares User and Chat instances
+                across updates. True creates one with the default size,
+                False disables it.
+            concurrent_handlers: Run the handlers that match an update in
+                parallel instead of one after another
+            handler_timeout: Default timeout for each handler in seconds
+            thread_pool_size: Number of threads for sync handlers
+            process_pool_size: Number of processes for handlers registered
+                with ``executor="process"``. Defaults to the number of CPUs.
+            journal: Durable journal, or the path of its database, that
+                updates are written to before they are acknowledged and
+                replayed from after a crash
+            deduplicate: Filter that drops updates delivered more than once.
+                True creates one with the default size, False disables it.
+            backlog: Policy that sheds stale updates after downtime, or the
+                age in seconds after which messages are shed. Callback
+                queries and payments are always kept.
         """
         self.token = token
         self.timeout = timeout
         self.api_url = api_url or f"https://api.telegram.org/bot{token}"
 
-        # HTTP client with connection pooling
-        self._client = httpx.AsyncClient(
-            timeout=timeout,
-            limits=httpx.Limits(max_connections=100, max_keepalive_connections=100),
-        )
+        if rate_limiter is True:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter or None
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.timeouts = timeouts or Timeouts(request=timeout)
+        self.codec = codec or get_codec()
+        self.lazy_updates = lazy_updates
+
+        if identity_map is True:
+            identity_map = IdentityMap()
+        # An empty identity map is falsy, so compare with False explicitly
+        self.identity_map = identity_map if identity_map is not False else None
+
+        # Admission of received updates: backlog shedding, de-duplication
+        # and the journal
+        if isinstance(journal, str):
+            journal = UpdateJournal(journal, codec=self.codec)
+        if deduplicate is True:
+            deduplicate = UpdateDeduplicator()
+        if isinstance(backlog, int | float):
+            backlog = BacklogPolicy(backlog)
+        self.intake = UpdateIntake(journal, deduplicate or None, backlog)
+
+        # Separate HTTP connection pools for long polls, API calls and uploads
+        self.pools = pools or ConnectionPools(timeout=timeout)
 
         # Event handlers
-        self._handlers: list[Callable] = []
-        self._command_handlers: dict[str, list[Callable]] = {}
-        self._message_handlers: list[Callable] = []
-        self._callback_handlers: list[Callable] = []
+        self.dispatcher = HandlerDispatcher(
+            concurrent=concurrent_handlers,
+            timeout=handler_timeout,
+            thread_workers=thread_pool_size,
+            process_workers=process_pool_size,
+        )
+        self._commands = CommandRouter()
+        self._message_handlers = PatternMatcher()
+        self._callback_handlers = PatternMatcher()
+
+        # Bot account, fetched with getMe when first needed
+        self._me: dict[str, Any] | None = None
+
+        # Update types with registered handlers, and the webhook registered
+        # with the update types derived from them
+        self._update_types: set[str] = set()
+        self._webhook: dict[str, Any] | None = None
+        self._webhook_task: asyncio.Task | None = None
 
         # Running state
         self._running = False
@@ -72,7 +204,9 @@ class Bot:
                 await self._polling_task
             except asyncio.CancelledError:
                 pass
-        await self._client.aclose()
+        self.dispatcher.shutdown()
+        await self.intake.close()
+        await self.pools.aclose()
 
     async def _make_request(self, method: str, **params) -> dict[str, Any]:
         """
@@ -90,95 +224,284 @@ class Bot:
         # Remove None values
         params = {k: v for k, v in params.items() if v is not None}
 
-        for attempt in range(3):
+        self.retry_policy.record_request(method)
+        attempt = 0
+
+        while True:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(method, params)
+
+            retry_after = None
             try:
-                response = await self._client.post(url, json=params)
-                response.raise_for_status()
-                data = response.json()
+                if not attempt and send_in_webhook_reply(method, params):
+                    # Telegram does not return the result of a call in a
+                    # webhook reply
+                    return None
+
+                response = await self.pools.post(
+                    get_traffic_class(method),
+                    url,
+                    content=self.codec.dumps(params),
+                    headers=JSON_HEADERS,
+                    timeout=self.timeouts.for_request(method, params),
+                )
+                try:
+                    data = self.codec.loads(response.content)
+                except ValueError:
+                    response.raise_for_status()
+                    raise
 
                 if not data.get("ok"):
-                    raise Exception(
-                        f"API Error: {data.get('description', 'Unknown error')}"
+                    raise APIError(
+                        data.get("error_code", response.status_code),
+                        data.get("description", "Unknown error"),
+                        data.get("parameters"),
                     )
 
                 return data["result"]
 
-            except Exception:
-                if attempt == 2:
+            except Exception as e:
+                if isinstance(e, APIError):
+                    retry_after = e.retry_after
+                if not self.retry_policy.should_retry(method, e, attempt):
                     raise
-                await asyncio.sleep(0.5 * (2**attempt))
+            finally:
+                if self.rate_limiter:
+                    await self.rate_limiter.release(method, params, retry_after)
+
+            await asyncio.sleep(self.retry_policy.get_delay(attempt, retry_after))
+            attempt += 1
 
-    def command(self, pattern: str | None = None):
+    def command(
+        self,
+        pattern: str | None = None,
+        chat_types: str | Iterable[str] | None = None,
+        chat_ids: int | Iterable[int] | None = None,
+        user_ids: int | Iterable[int] | None = None,
+        timeout: float | None = None,
+        sequential: bool = False,
+        executor: str | None = None,
+    ):
         """
         Decorator to register a command handler.
 
         Args:
             pattern: Regex pattern for command matching. If None, matches all commands.
+            chat_types: Only handle commands in these chat types, e.g. "private"
+            chat_ids: Only handle commands in these chats
+            user_ids: Only handle commands from these users
+            timeout: Timeout for the handler in seconds
+            sequential: Never run the handler in parallel with other
+                handlers
+            executor: Where the handler runs: None for the event loop (or the
+                thread pool for sync functions), "thread" or "process" for
+                CPU-bound handlers, which receive the raw update data
 
         Returns:
             Decorator function
         """
+        _check_executor(executor)
+        handler_filter = make_filter(
+            chat_types=chat_types, chat_ids=chat_ids, user_ids=user_ids
+        )
 
         def decorator(func: Callable[["Event"], Awaitable[None]]) -> Callable:
-            if pattern is None:
-                # Match all commands
-                self._handlers.append(func)
-            else:
-                # Compile regex pattern
-                compiled_pattern = re.compile(pattern, re.IGNORECASE)
-                self._command_handlers[pattern] = self._command_handlers.get(
-                    pattern, []
-                ) + [func]
+            compiled_pattern = self._commands.add(pattern, func, handler_filter)
+            self._add_update_type("message")
+            if compiled_pattern is not None:
                 # Store pattern for later use
                 func._pattern = compiled_pattern
+            _set_handler_options(func, timeout, sequential, executor)
             return func
 
         return decorator
 
-    def on_message(self, pattern: str | None = None):
+    def on_message(
+        self,
+        pattern: str | None = None,
+        content_types: str | Iterable[str] | None = None,
+        chat_types: str | Iterable[str] | None = None,
+        chat_ids: int | Iterable[int] | None = None,
+        user_ids: int | Iterable[int] | None = None,
+        timeout: float | None = None,
+        sequential: bool = False,
+        executor: str | None = None,
+    ):
         """
         Decorator to register a message handler.
 
         Args:
             pattern: Regex pattern for message matching. If None, matches all messages.
+            content_types: Only handle messages with these content types,
+                e.g. "photo" or ["audio", "voice"]
+            chat_types: Only handle messages in these chat types, e.g. "private"
+            chat_ids: Only handle messages in these chats
+            user_ids: Only handle messages from these users
+            timeout: Timeout for the handler in seconds
+            sequential: Never run the handler in parallel with other
+                handlers
+            executor: Where the handler runs: None for the event loop (or the
+                thread pool for sync functions), "thread" or "process" for
+                CPU-bound handlers, which receive the raw update data
 
         Returns:
             Decorator function
         """
+        _check_executor(executor)
+        handler_filter = make_filter(content_types, chat_types, chat_ids, user_ids)
 
         def decorator(func: Callable[["Event"], Awaitable[None]]) -> Callable:
-            if pattern is None:
-                self._message_handlers.append(func)
-            else:
-                compiled_pattern = re.compile(pattern, re.IGNORECASE)
+            compiled_pattern = self._message_handlers.add(pattern, func, handler_filter)
+            self._add_update_type("message")
+            if compiled_pattern is not None:
                 func._pattern = compiled_pattern
-                self._message_handlers.append(func)
+            _set_handler_options(func, timeout, sequential, executor)
             return func
 
         return decorator
 
-    def on_callback(self, pattern: str | None = None):
+    def on_callback(
+        self,
+        pattern: str | None = None,
+        chat_types: str | Iterable[str] | None = None,
+        chat_ids: int | Iterable[int] | None = None,
+        user_ids: int | Iterable[int] | None = None,
+        timeout: float | None = None,
+        sequential: bool = False,
+        executor: str | None = None,
+    ):
         """
         Decorator to register a callback query handler.
 
         Args:
             pattern: Regex pattern for callback data matching. If None, matches all callbacks.
+            chat_types: Only handle callbacks from messages in these chat types
+            chat_ids: Only handle callbacks from messages in these chats
+            user_ids: Only handle callbacks from these users
+            timeout: Timeout for the handler in seconds
+            sequential: Never run the handler in parallel with other
+                handlers
+            executor: Where the handler runs: None for the event loop (or the
+                thread pool for sync functions), "thread" or "process" for
+                CPU-bound handlers, which receive the raw update data
 
         Returns:
             Decorator function
         """
+        _check_executor(executor)
+        handler_filter = make_filter(
+            chat_types=chat_types, chat_ids=chat_ids, user_ids=user_ids
+        )
 
         def decorator(func: Callable[["Event"], Awaitable[None]]) -> Callable:
-            if pattern is None:
-                self._callback_handlers.append(func)
-            else:
-                compiled_pattern = re.compile(pattern, re.IGNORECASE)
+            compiled_pattern = self._callback_handlers.add(
+                pattern, func, handler_filter
+            )
+            self._add_update_type("callback_query")
+            if compiled_pattern is not None:
                 func._pattern = compiled_pattern
-                self._callback_handlers.append(func)
+            _set_handler_options(func, timeout, sequential, executor)
             return func
 
         return decorator
 
+    @property
+    def allowed_updates(self) -> list[str]:
+        """
+        Update types the registered handlers can handle.
+
+        Sent as ``allowed_updates`` with getUpdates and setWebhook, so
+        Telegram does not send updates that no handler would use. Before any
+        handler is registered, every type the bot dispatches is allowed.
+        """
+        return [t for t in UPDATE_TYPES if t in self._update_types] or list(
+            UPDATE_TYPES
+        )
+
+    def _add_update_type(self, update_type: str) -> None:
+        """Record a handled update type and refresh the webhook if needed."""
+        if update_type in self._update_types:
+            return
+        self._update_types.add(update_type)
+
+        if self._webhook is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # The webhook was registered with the previous update types
+        self._webhook_task = loop.create_task(self.set_webhook(**self._webhook))
+        self._webhook_task.add_done_callback(self._webhook_refreshed)
+
+    @staticmethod
+    def _webhook_refreshed(task: asyncio.Task) -> None:
+        """Report a failed refresh of the webhook's update types."""
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Failed to update the webhook's allowed updates: {task.exception()}")
+
+    @property
+    def journal(self) -> UpdateJournal | None:
+        """Durable journal of the received updates, if any."""
+        return self.intake.journal
+
+    @property
+    def deduplicator(self) -> UpdateDeduplicator | None:
+        """Filter that drops updates received more than once, if any."""
+        return self.intake.deduplicator
+
+    @property
+    def backlog(self) -> BacklogPolicy | None:
+        """Policy that sheds stale updates, if any."""
+        return self.intake.backlog
+
+    async def process_update(self, update_data: dict[str, Any]) -> None:
+        """
+        Process an update received outside of polling, e.g. by a webhook.
+
+        Stale and duplicate updates are dropped, and the update is written to
+        the journal before it is handled. The journal is opened on first use;
+        call :meth:`replay_journal` at startup to also handle the updates left
+        in it by a previous run.
+
+        Args:
+            update_data: Update data from Telegram
+        """
+        for accepted in await self.intake.accept([update_data]):
+            await self.handle_update(accepted)
+
+    async def handle_update(self, update_data: dict[str, Any]) -> None:
+        """
+        Handle an update accepted by :attr:`intake` and mark it done.
+
+        Args:
+            update_data: Update data from Telegram
+        """
+        try:
+            await self._process_update(update_data)
+        finally:
+            self.intake.done(update_data["update_id"])
+
+    async def replay_journal(self) -> int:
+        """
+        Open the journal and handle the updates left in it by a previous run.
+
+        Polling resumes after the last update in the journal. Updates the
+        backlog policy considers too old are removed without being handled,
+        and redeliveries of the replayed updates are dropped as duplicates.
+
+        Returns:
+            Number of replayed updates
+        """
+        if self.journal is None:
+            return 0
+        updates = await self.intake.recover()
+        for update_data in updates:
+            await self.handle_update(update_data)
+        if self._offset is None and self.journal.last_update_id is not None:
+            self._offset = self.journal.last_update_id + 1
+        return len(updates)
+
     async def _process_update(self, update_data: dict[str, Any]) -> None:
         """
         Process a single update.
@@ -186,15 +509,23 @@ class Bot:
         Args:
             update_data: Update data from Telegram
         """
-        update = Update.from_dict(update_data)
-        event = Event(update, self)
+        if self.lazy_updates:
+            update = LazyUpdate(update_data, identity_map=self.identity_map)
+        elif self.identity_map is not None:
+            update = Update.from_dict(self.identity_map.resolve(update_data))
+        else:
+            update = Update.from_dict(update_data)
+        # Route on facts read from the raw data once, so lazy updates stay
+        # unparsed
+        info = UpdateInfo(update_data)
+        event = Event(update, self, info)
 
         # Handle messages
-        if update.message:
+        if update_data.get("message"):
             await self._handle_message(event)
 
         # Handle callback queries
-        elif update.callback_query:
+        elif update_data.get("callback_query"):
             await self._handle_callback(event)
 
     async def _handle_message(self, event: "Event") -> None:
@@ -207,25 +538,23 @@ class Bot:
         text = event.text or ""
 
         # Check command handlers first
-        if text.startswith("/"):
-            # Check specific command patterns
-            for _pattern, handlers in self._command_handlers.items():
-                if hasattr(handlers[0], "_pattern") and handlers[0]._pattern.search(
-                    text
-                ):
-                    for handler in handlers:
-                        await handler(event)
+        command = parse_command(text)
+        if command is not None:
+            name, mention, rest = command
+            if mention is not None:
+                # Ignore commands addressed to other bots in group chats
+                me = await self.get_me()
+                if mention.lower() != (me.get("username") or "").lower():
                     return
+                text = f"/{name}{rest}"
 
-            # Check general command handlers
-            for handler in self._handlers:
-                await handler(event)
+            handlers = self._commands.match(name, text, event.info)
+            await self.dispatcher.dispatch(handlers, event)
             return
 
         # Handle regular messages
-        for handler in self._message_handlers:
-            if not hasattr(handler, "_pattern") or handler._pattern.search(text):
-                await handler(event)
+        handlers = self._message_handlers.match(text, event.info)
+        await self.dispatcher.dispatch(handlers, event)
 
     async def _handle_callback(self, event: "Event") -> None:
         """
@@ -236,9 +565,59 @@ class Bot:
         """
         data = event.callback_data or ""
 
-        for handler in self._callback_handlers:
-            if not hasattr(handler, "_pattern") or handler._pattern.search(data):
-                await handler(event)
+        handlers = self._callback_handlers.match(data, event.info)
+        await self.dispatcher.dispatch(handlers, event)
+
+    def get_handler_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Get the latency statistics of every handler that has run.
+
+        Returns:
+            Statistics keyed by handler name
+        """
+        return self.dispatcher.get_stats()
+
+    def get_dedup_stats(self) -> dict[str, int]:
+        """
+        Get the number of checked and dropped duplicate updates.
+
+        Returns:
+            De-duplication statistics, empty if de-duplication is disabled
+        """
+        if self.deduplicator is None:
+            return {}
+        return self.deduplicator.get_stats()
+
+    def get_backlog_stats(self) -> dict[str, Any]:
+        """
+        Get the number of updates shed by the backlog policy.
+
+        Returns:
+            Shedding statistics, empty if no backlog policy is set
+        """
+        if self.backlog is None:
+            return {}
+        return self.backlog.get_stats()
+
+    def get_executor_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Get the queue depth of the thread and process pools for handlers.
+
+        Returns:
+            Statistics keyed by executor name
+        """
+        return self.dispatcher.get_executor_stats()
+
+    async def get_me(self) -> dict[str, Any]:
+        """
+        Get the bot's account. The result is cached after the first call.
+
+        Returns:
+            The bot's User data
+        """
+        if self._me is None:
+            self._me = await self._make_request("getMe")
+        return self._me
 
     async def send_message(
         self,
@@ -355,11 +734,84 @@ class Bot:
         )
         return True
 
+    async def set_webhook(
+        self,
+        url: str,
+        secret_token: str | None = None,
+        drop_pending_updates: bool | None = None,
+        max_connections: int | None = None,
+        allowed_updates: list[str] | None = None,
+        **kwargs,
+    ) -> bool:
+        """
+        Set the webhook Telegram sends updates to.
+
+        Args:
+            url: HTTPS URL to send updates to
+            secret_token: Secret token sent in every webhook request
+            drop_pending_updates: Whether to drop pending updates
+            max_connections: Maximum number of simultaneous webhook connections
+            allowed_updates: List of update types to receive. Defaults to
+                :attr:`allowed_updates`, and the webhook is then updated
+                when handlers for new update types are registered.
+            **kwargs: Additional parameters
+
+        Returns:
+            True on success
+        """
+        if allowed_updates is None:
+            # Remember the webhook to update it when the handlers change
+            self._webhook = dict(
+                url=url,
+                secret_token=secret_token,
+                max_connections=max_connections,
+                **kwargs,
+            )
+            allowed_updates = self.allowed_updates
+        else:
+            self._webhook = None
+
+        return await self._make_request(
+            "setWebhook",
+            url=url,
+            secret_token=secret_token,
+            drop_pending_updates=drop_pending_updates,
+            max_connections=max_connections,
+            allowed_updates=allowed_updates,
+            **kwargs,
+        )
+
+    async def delete_webhook(self, drop_pending_updates: bool | None = None) -> bool:
+        """
+        Remove the webhook.
+
+        Args:
+            drop_pending_updates: Whether to drop pending updates
+
+        Returns:
+            True on success
+        """
+        self._webhook = None
+        return await self._make_request(
+            "deleteWebhook", drop_pending_updates=drop_pending_updates
+        )
+
+    async def get_webhook_info(self) -> dict[str, Any]:
+        """
+        Get the current webhook status.
+
+        Returns:
+            Webhook information
+        """
+        return await self._make_request("getWebhookInfo")
+
     async def polling(
         self,
         interval: float = 0.5,
         timeout: int = 30,
         drop_pending_updates: bool = False,
+        workers: int = 1,
+        prefetch: int = 0,
     ) -> None:
         """
         Start polling for updates.
@@ -367,27 +819,161 @@ class Bot:
         Args:
             interval: Polling interval in seconds
             timeout: Long polling timeout
-            drop_pending_updates: Whether to drop pending updates
+            drop_pending_updates: Whether to drop pending updates. To drop
+                only the stale ones, set a backlog policy on the bot instead.
+            workers: Number of concurrent update workers. With more than one
+                worker, updates are processed in parallel while each chat's
+                updates keep their order.
+            prefetch: Maximum number of updates fetched ahead of the workers.
+                If set, the next getUpdates call runs while the current batch
+                is being dispatched.
         """
+        await self.replay_journal()
+
         if drop_pending_updates:
             self._offset = -1
             await self._make_request("getUpdates", offset=-1, limit=1, timeout=0)
 
         self._running = True
 
+        if workers > 1 or prefetch:
+            await self._polling_concurrent(interval, timeout, workers, prefetch)
+            return
+
         while self._running:
             try:
                 updates = await self._make_request(
                     "getUpdates",
                     offset=self._offset,
                     timeout=timeout,
-                    allowed_updates=["message", "callback_query"],
+                    allowed_updates=self.allowed_updates,
                 )
 
-                for update_data in updates:
-                    await self._process_update(update_data)
+                for update_data in await self.intake.accept(updates):
+                    try:
+                        await self.handle_update(update_data)
+                    except Exception as e:
+                        # The update is not redelivered: it is already marked
+                        # as received, so move on to the rest of the batch
+                        print(
+                            f"Error processing update {update_data['update_id']}: {e}"
+                        )
                     self._offset = update_data["update_id"] + 1
 
+                if updates:
+                    # Skip the dropped updates at the end of the batch at once
+                    self._offset = updates[-1]["update_id"] + 1
+
+            except Exception as e:
+                print(f"Polling error: {e}")
+                await asyncio.sleep(interval)
+
+    async def _polling_concurrent(
+        self, interval: float, timeout: int, workers: int, prefetch: int
+    ) -> None:
+        """
+        Poll for updates and process them with a pool of workers.
+
+        The offset sent to Telegram is the committed offset, so updates that
+        are still being handled are redelivered and skipped as duplicates. To
+        keep those redeliveries few, the next batch is fetched once at least
+        half of the updates in flight have been committed.
+
+        Args:
+            interval: Polling interval in seconds
+            timeout: Long polling timeout
+            workers: Number of concurrent update workers
+            prefetch: Maximum number of fetched updates buffered ahead of the
+                workers. If 0, the next batch is fetched only after the
+                current one has been handed to the workers.
+        """
+        tracker = OffsetTracker(self._offset)
+
+        async def handle(update_data: dict[str, Any]) -> None:
+            try:
+                await self.handle_update(update_data)
+            finally:
+                tracker.done(update_data["update_id"])
+                self._offset = tracker.offset
+
+        pool = UpdateWorkerPool(handle, workers=workers)
+        pool.start()
+
+        if not prefetch:
+            try:
+                await self._fetch_updates(tracker, pool.submit, interval, timeout)
+            finally:
+                await pool.stop()
+            return
+
+        # Keep the next getUpdates call in flight while the buffered
+        # updates are handed to the workers
+        buffer: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=prefetch)
+
+        async def fetch() -> None:
+            await self._fetch_updates(tracker, buffer.put, interval, timeout)
+            await buffer.put(None)
+
+        fetcher = asyncio.create_task(fetch())
+
+        try:
+            while True:
+                update_data = await buffer.get()
+                if update_data is None:
+                    break
+                await pool.submit(update_data)
+        finally:
+            fetcher.cancel()
+            await asyncio.gather(fetcher, return_exceptions=True)
+            await pool.stop()
+
+    async def _fetch_updates(
+        self,
+        tracker: OffsetTracker,
+        put: Callable[[dict[str, Any]], Awaitable[None]],
+        interval: float,
+        timeout: int,
+    ) -> None:
+        """
+        Fetch new updates until polling stops.
+
+        Args:
+            tracker: Offset tracker for the polling session
+            put: Coroutine function called with each new update
+            interval: Polling interval in seconds
+            timeout: Long polling timeout
+        """
+        while self._running:
+            try:
+                updates = await self._make_request(
+                    "getUpdates",
+                    offset=tracker.offset,
+                    timeout=timeout,
+                    allowed_updates=self.allowed_updates,
+                )
+
+                # Updates still in flight are returned again
+                fresh = [u for u in updates if tracker.is_new(u["update_id"])]
+
+                # Track the updates only once they are accepted, so a failed
+                # batch is fetched again instead of stalling the offset
+                accepted = await self.intake.accept(fresh)
+                for update_data in fresh:
+                    tracker.track(update_data["update_id"])
+                if len(accepted) < len(fresh):
+                    accepted_ids = {u["update_id"] for u in accepted}
+                    for update_data in fresh:
+                        if update_data["update_id"] not in accepted_ids:
+                            tracker.done(update_data["update_id"])
+                    self._offset = tracker.offset
+
+                for update_data in accepted:
+                    await put(update_data)
+
+                # The next poll returns every update still in flight again,
+                # so wait until at least half of them have been committed
+                await tracker.wait_for_in_flight(tracker.in_flight // 2)
+
             except Exception as e:
                 print(f"Polling error: {e}")
                 await asyncio.sleep(interval)
@@ -404,16 +990,24 @@ class Event:
     Event wrapper for Telegram updates.
     """
 
-    def __init__(self, update: Update, bot: Bot):
+    def __init__(
+        self,
+        update: Update | LazyUpdate,
+        bot: Bot,
+        info: UpdateInfo | None = None,
+    ):
         """
         Initialize an event.
 
         Args:
-            update: Telegram update
+            update: Telegram update, parsed or lazy
             bot: Bot instance
+            info: Facts extracted from the raw update, which answer the
+                text, callback data, chat ID and user ID without parsing
         """
         self.update = update
         self.bot = bot
+        self.info = info
 
     @property
     def message(self) -> Message | None:
@@ -428,6 +1022,10 @@ class Event:
     @property
     def text(self) -> str | None:
         """Get the text from the event."""
+        if self.info is not None:
+            return self.info.text
+        if isinstance(self.update, LazyUpdate):
+            return self.update.text
         if self.message:
             return self.message.text
         return None
@@ -484,6 +1082,10 @@ class Event:
     @property
     def callback_data(self) -> str | None:
         """Get the callback data from the event."""
+        if self.info is not None:
+            return self.info.callback_data
+        if isinstance(self.update, LazyUpdate):
+            return self.update.callback_data
         if self.callback_query:
             return self.callback_query.data
         return None
@@ -491,6 +1093,10 @@ class Event:
     @property
     def chat_id(self) -> int | None:
         """Get the chat ID from the event."""
+        if self.info is not None:
+            return self.info.chat_id
+        if isinstance(self.update, LazyUpdate):
+            return self.update.chat_id
         if self.message:
             return self.message.chat.id
         elif self.callback_query and self.callback_query.message:
@@ -500,6 +1106,10 @@ class Event:
     @property
     def user_id(self) -> int | None:
         """Get the user ID from the event."""
+        if self.info is not None:
+            return self.info.user_id
+        if isinstance(self.update, LazyUpdate):
+            return self.update.user_id
         if self.message and self.message.from_user:
             return self.message.from_user.id
         elif self.callback_query and self.callback_query.from_user:
@@ -574,7 +1184,9 @@ class Event:
             raise ValueError("No chat ID available for this event")
 
         message_id = None
-        if self.message:
+        if isinstance(self.update, LazyUpdate):
+            message_id = self.update.message_id
+        elif self.message:
             message_id = self.message.message_id
 
         return await self.send_message(text, reply_to_message_id=message_id, **kwargs)
@@ -0,0 +1,118 @@
+"""
+JSON codecs for Gpgram.
+
+This module provides the JSON encoder and decoder used for API requests,
+responses and webhook updates. It uses orjson or msgspec when one of them is
+installed and falls back to the standard library otherwise. Every codec
+encodes straight to bytes, so request bodies are sent without an
+intermediate string copy.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+
+class JSONCodec:
+    """JSON codec based on the standard library."""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        Encode an object as JSON.
+
+        Args:
+            obj: Object to encode
+
+        Returns:
+            UTF-8 encoded JSON
+        """
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes | str) -> Any:
+        """
+        Decode JSON.
+
+        Args:
+            data: JSON document
+
+        Returns:
+            Decoded object
+
+        Raises:
+            ValueError: If the document is not valid JSON
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """JSON codec based on orjson."""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    """JSON codec based on msgspec."""
+
+    name = "msgspec"
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def loads(self, data: bytes | str) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+
+CODECS: dict[str, type[JSONCodec]] = {"json": JSONCodec}
+if msgspec is not None:
+    CODECS["msgspec"] = MsgspecCodec
+if orjson is not None:
+    CODECS["orjson"] = OrjsonCodec
+
+
+def get_codec(name: str | None = None) -> JSONCodec:
+    """
+    Get a JSON codec.
+
+    Args:
+        name: Codec name ("orjson", "msgspec" or "json"). If None, the fastest
+            installed codec is used.
+
+    Returns:
+        A JSON codec instance
+
+    Raises:
+        ValueError: If the requested codec is not available
+    """
+    if name is None:
+        for name in ("orjson", "msgspec", "json"):
+            if name in CODECS:
+                break
+
+    if name not in CODECS:
+        raise ValueError(f"JSON codec {name!r} is not available")
+
+    return CODECS[name]()
@@ -0,0 +1,269 @@
+"""
+Concurrent update processing for Gpgram.
+
+This module provides a sharded worker pool that processes updates in parallel
+while keeping the updates of each chat in order, plus an offset tracker that
+only commits an update once it has been handled.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .types.lazy import MESSAGE_KINDS, get_update_kind
+
+logger = logging.getLogger(__name__)
+
+
+def get_chat_id(update_data: dict[str, Any]) -> int | None:
+    """
+    Extract the chat ID from raw update data without parsing the update.
+
+    Args:
+        update_data: Update data from Telegram
+
+    Returns:
+        The chat ID, the sender ID for callback queries without a message,
+        or None if the update is not bound to a chat
+    """
+    kind = get_update_kind(update_data)
+    payload = update_data.get(kind) if kind else None
+    if not payload:
+        return None
+
+    if kind in MESSAGE_KINDS:
+        return payload.get("chat", {}).get("id")
+
+    if kind == "callback_query":
+        message = payload.get("message")
+        if message:
+            return message.get("chat", {}).get("id")
+        return payload.get("from", {}).get("id")
+
+    return None
+
+
+class OffsetTracker:
+    """
+    Track in-flight updates and compute the offset that is safe to commit.
+
+    Updates may finish out of order when they are processed concurrently. The
+    committed offset only moves past an update once it and every earlier
+    update have been handled.
+    """
+
+    def __init__(self, offset: int | None = None):
+        """
+        Initialize the tracker.
+
+        Args:
+            offset: Initial committed offset
+        """
+        self.offset = offset
+        self.last_seen: int | None = offset - 1 if offset and offset > 0 else None
+        self._pending: deque[int] = deque()
+        self._done: set[int] = set()
+        self._advanced = asyncio.Event()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of tracked updates that have not been committed yet."""
+        return len(self._pending)
+
+    def is_new(self, update_id: int) -> bool:
+        """
+        Check whether an update has not been tracked yet.
+
+        Args:
+            update_id: Update identifier
+        """
+        return self.last_seen is None or update_id > self.last_seen
+
+    def track(self, update_id: int) -> bool:
+        """
+        Start tracking an update.
+
+        Args:
+            update_id: Update identifier
+
+        Returns:
+            False if the update was already seen, True otherwise
+        """
+        if not self.is_new(update_id):
+            return False
+        self.last_seen = update_id
+        self._pending.append(update_id)
+        return True
+
+    def done(self, update_id: int) -> None:
+        """
+        Mark an update as handled and advance the committed offset if possible.
+
+        Args:
+            update_id: Update identifier
+        """
+        self._done.add(update_id)
+
+        advanced = False
+        while self._pending and self._pending[0] in self._done:
+            committed = self._pending.popleft()
+            self._done.discard(committed)
+            self.offset = committed + 1
+            advanced = True
+
+        if advanced:
+            self._advanced.set()
+
+    async def wait_for_commit(self, offset: int | None) -> None:
+        """
+        Wait until the committed offset moves past the given one.
+
+        Args:
+            offset: Offset to wait past
+        """
+        while self.offset == offset:
+            self._advanced.clear()
+            await self._advanced.wait()
+
+    async def wait_for_in_flight(self, count: int) -> None:
+        """
+        Wait until at most the given number of updates are in flight.
+
+        Args:
+            count: Number of uncommitted updates to wait for
+        """
+        while len(self._pending) > count:
+            self._advanced.clear()
+            await self._advanced.wait()
+
+
+class UpdateWorkerPool:
+    """
+    A bounded pool of worker tasks that processes updates concurrently.
+
+    Updates are sharded by chat ID, so updates from the same chat always go
+    to the same worker and are handled in the order they were submitted.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[dict[str, Any]], Awaitable[None]],
+        workers: int = 8,
+        queue_size: int = 100,
+    ):
+        """
+        Initialize the worker pool.
+
+        Args:
+            handler: Coroutine function called with each update's data
+            workers: Number of worker tasks
+            queue_size: Maximum number of queued updates per worker
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+
+        self._queues: list[asyncio.Queue] = [
+            asyncio.Queue(maxsize=queue_size) for _ in range(workers)
+        ]
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def queued(self) -> int:
+        """Number of updates waiting in the worker queues."""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def start(self) -> None:
+        """Start the worker tasks."""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(queue)) for queue in self._queues
+        ]
+
+    def _shard(self, update_data: dict[str, Any]) -> int:
+        """Select the worker queue for an update."""
+        key = get_chat_id(update_data)
+        if key is None:
+            key = update_data.get("update_id", 0)
+        return hash(key) % self.workers
+
+    async def submit(self, update_data: dict[str, Any]) -> None:
+        """
+        Queue an update for processing.
+
+        Waits while the target worker's queue is full.
+
+        Args:
+            update_data: Update data from Telegram
+        """
+        await self._queues[self._shard(update_data)].put(update_data)
+
+    def try_submit(self, update_data: dict[str, Any]) -> bool:
+        """
+        Queue an update for processing without waiting.
+
+        Args:
+            update_data: Update data from Telegram
+
+        Returns:
+            False if the target worker's queue is full, True otherwise
+        """
+        try:
+            self._queues[self._shard(update_data)].put_nowait(update_data)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        """Process updates from a single queue."""
+        while True:
+            update_data = await queue.get()
+            try:
+                await self.handler(update_data)
+            except Exception as e:
+                logger.exception(
+                    f"Error processing update {update_data.get('update_id')}: {e}"
+                )
+            finally:
+                queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every queued update has been processed."""
+        for queue in self._queues:
+            await queue.join()
+
+    async def drain(self, timeout: float | None = None) -> bool:
+        """
+        Wait for the queued updates to be processed, then stop the workers.
+
+        Args:
+            timeout: Maximum number of seconds to wait, or None to wait for
+                every queued update
+
+        Returns:
+            True if every queued update was processed before the deadline
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                await self.join()
+            drained = True
+        except TimeoutError:
+            logger.warning(
+                "Drain deadline reached, dropping %d queued updates", self.queued
+            )
+            drained = False
+        await self.stop()
+        return drained
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks, dropping any queued updates."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
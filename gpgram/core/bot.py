@@ -9,28 +9,23 @@ from typing import (
     TypeVar,
 )
 
-import httpx
-
-from ..types.message import Message
-from ..types.update import Update
+from ..codec import JSONCodec, get_codec
+from ..exceptions import APIError, BotException
+from ..ratelimit import RateLimiter
+from ..retry import RetryPolicy
+from ..transport import (
+    JSON_HEADERS,
+    ConnectionPools,
+    Timeouts,
+    get_traffic_class,
+)
+from ..types import Message, Update
+from ..webhook_reply import send_in_webhook_reply
 from .logging import get_logger
 
 T = TypeVar("T")
 
-
-class BotException(Exception):
-    """Base exception for Bot errors."""
-
-    pass
-
-
-class APIError(BotException):
-    """Exception raised when the Telegram API returns an error."""
-
-    def __init__(self, error_code: int, description: str):
-        self.error_code = error_code
-        self.description = description
-        super().__init__(f"Telegram API error {error_code}: {description}")
+__all__ = ["APIError", "Bot", "BotException"]
 
 
 class Bot:
@@ -51,6 +46,11 @@ class Bot:
         base_url: str | None = None,
         timeout: float = 30.0,
         connection_pool_size: int = 100,
+        bulk_pool_size: int = 10,
+        rate_limiter: RateLimiter | bool = True,
+        retry_policy: RetryPolicy | None = None,
+        timeouts: Timeouts | None = None,
+        codec: JSONCodec | None = None,
     ):
         """
         Initialize the Bot instance.
@@ -59,8 +59,18 @@ class Bot:
             token: Telegram Bot API token
             parse_mode: Default parse mode for sending messages
             base_url: Custom base URL for Telegram API
-            timeout: Timeout for API requests in seconds
-            connection_pool_size: Size of the connection pool
+            timeout: Timeout for regular API calls in seconds. Ignored if
+                ``timeouts`` is given.
+            connection_pool_size: Size of the connection pool for regular API
+                calls
+            bulk_pool_size: Size of the connection pool for file uploads
+            rate_limiter: Outbound rate limiter. True uses the default
+                Telegram limits, False disables rate limiting.
+            retry_policy: Policy deciding which failed requests are retried
+            timeouts: Per-method timeout profiles for long polls, regular
+                calls and file transfers
+            codec: JSON codec for requests and responses. Defaults to the
+                fastest installed codec.
         """
         self.token = token
         self.parse_mode = parse_mode
@@ -69,13 +79,19 @@ class Bot:
         self.timeout = timeout
         self.logger = get_logger(__name__)
 
-        # Create HTTP client with connection pooling and keep-alive
-        self._client = httpx.AsyncClient(
+        if rate_limiter is True:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter or None
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=3)
+        self.timeouts = timeouts or Timeouts(request=timeout)
+        self.codec = codec or get_codec()
+
+        # Create separate HTTP connection pools with keep-alive for long
+        # polls, regular API calls and file uploads
+        self.pools = ConnectionPools(
             timeout=timeout,
-            limits=httpx.Limits(
-                max_connections=connection_pool_size,
-                max_keepalive_connections=connection_pool_size,
-            ),
+            control_connections=connection_pool_size,
+            bulk_connections=bulk_pool_size,
         )
 
     async def __aenter__(self):
@@ -85,15 +101,15 @@ class Bot:
         await self.close()
 
     async def close(self):
-        """Close the bot's HTTP client session."""
-        await self._client.aclose()
+        """Close the bot's HTTP client sessions."""
+        await self.pools.aclose()
 
     async def _make_request(
         self,
         method: str,
         params: dict[str, Any] | None = None,
         files: dict[str, Any] | None = None,
-        retries: int = 3,
+        retries: int | None = None,
         **kwargs,
     ) -> dict[str, Any]:
         """
@@ -103,6 +119,8 @@ class Bot:
             method: API method name
             params: Parameters for the API method
             files: Files to upload
+            retries: Maximum number of retries for errors the retry policy
+                considers retryable. Defaults to the policy's ``max_retries``.
             **kwargs: Additional parameters to pass to the API method
 
         Returns:
@@ -140,42 +158,69 @@ class Bot:
         # Remove None values
         params = {k: v for k, v in params.items() if v is not None}
 
-        # Use the main client (connection pooling is handled by httpx)
-        client = self._client
+        # Use the pool of the request's traffic class
+        traffic_class = get_traffic_class(method, files)
+
+        self.retry_policy.record_request(method)
+        attempt = 0
+
+        while True:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(method, params)
 
-        for attempt in range(retries + 1):
+            retry_after = None
             try:
+                if not attempt and send_in_webhook_reply(method, params, files):
+                    # Telegram does not return the result of a call in a
+                    # webhook reply
+                    return None
+
+                timeout = self.timeouts.for_request(method, params, files)
                 if files:
-                    response = await client.post(url, data=params, files=files)
+                    response = await self.pools.post(
+                        traffic_class, url, data=params, files=files, timeout=timeout
+                    )
                 else:
-                    response = await client.post(url, json=params)
+                    response = await self.pools.post(
+                        traffic_class,
+                        url,
+                        content=self.codec.dumps(params),
+                        headers=JSON_HEADERS,
+                        timeout=timeout,
+                    )
 
-                response.raise_for_status()
-                result = response.json()
+                try:
+                    result = self.codec.loads(response.content)
+                except ValueError:
+                    response.raise_for_status()
+                    raise
 
                 if not result.get("ok"):
-                    error_code = result.get("error_code", 0)
+                    error_code = result.get("error_code", response.status_code)
                     description = result.get("description", "No description")
                     self.logger.error(f"API error {error_code}: {description}")
-                    raise APIError(error_code, description)
+                    raise APIError(error_code, description, result.get("parameters"))
 
                 return result["result"]
 
-            except (httpx.HTTPError, APIError) as e:
-                if attempt == retries:
-                    self.logger.error(
-                        f"Request failed after {retries + 1} attempts: {e}"
-                    )
+            except Exception as e:
+                if isinstance(e, APIError):
+                    retry_after = e.retry_after
+                if not self.retry_policy.should_retry(method, e, attempt, retries):
+                    if attempt:
+                        self.logger.error(
+                            f"Request failed after {attempt + 1} attempts: {e}"
+                        )
                     raise
                 self.logger.warning(
                     f"Request attempt {attempt + 1} failed: {e}, retrying..."
                 )
-                await asyncio.sleep(0.5 * (2**attempt))  # Exponential backoff
-            except Exception as e:
-                self.logger.error(f"Unexpected error during API request: {e}")
-                if attempt == retries:
-                    raise
-                await asyncio.sleep(0.5 * (2**attempt))
+            finally:
+                if self.rate_limiter:
+                    await self.rate_limiter.release(method, params, retry_after)
+
+            await asyncio.sleep(self.retry_policy.get_delay(attempt, retry_after))
+            attempt += 1
 
     async def get_me(self) -> dict[str, Any]:
         """
@@ -0,0 +1,109 @@
+"""
+Update de-duplication for Gpgram.
+
+Telegram delivers a webhook update again when the response times out or is
+not a 2xx, and overlapping getUpdates sessions can return the same update
+twice. The filter in this module remembers recent update IDs in fixed memory
+so duplicates are dropped before their handlers run again.
+"""
+
+from collections import OrderedDict
+
+
+class UpdateDeduplicator:
+    """
+    Bounded filter for update IDs that have been seen before.
+
+    Update IDs increase monotonically, so recent IDs are kept in a ring of
+    ``window`` slots indexed by ``update_id % window``. An ID that is pushed
+    out of the ring by a newer one moves to an LRU set of ``max_size`` IDs,
+    which catches late redeliveries. Checking an ID is O(1), and memory does
+    not grow with the number of updates.
+
+    IDs older than both the ring and the LRU set are accepted, so an update
+    is never dropped because it was not remembered.
+    """
+
+    __slots__ = ("window", "max_size", "checked", "dropped", "_ring", "_lru")
+
+    def __init__(self, window: int = 4096, max_size: int = 10000):
+        """
+        Initialize the filter.
+
+        Args:
+            window: Number of recent update IDs kept in the ring
+            max_size: Number of older update IDs kept in the LRU set
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+
+        self.window = window
+        self.max_size = max_size
+        self.checked = 0
+        self.dropped = 0
+        self._ring: list[int | None] = [None] * window
+        self._lru: OrderedDict[int, None] = OrderedDict()
+
+    def _remember(self, update_id: int) -> None:
+        """Add an ID to the LRU set."""
+        self._lru[update_id] = None
+        if len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def is_duplicate(self, update_id: int) -> bool:
+        """
+        Check whether an update was seen before, and remember it if not.
+
+        Args:
+            update_id: Update identifier
+
+        Returns:
+            True if the update is a duplicate and should be dropped
+        """
+        self.checked += 1
+        slot = update_id % self.window
+        occupant = self._ring[slot]
+
+        if occupant == update_id:
+            self.dropped += 1
+            return True
+        if update_id in self._lru:
+            self._lru.move_to_end(update_id)
+            self.dropped += 1
+            return True
+
+        if occupant is not None and occupant > update_id:
+            # Older than the ring; remember it with the stragglers
+            self._remember(update_id)
+        else:
+            if occupant is not None:
+                self._remember(occupant)
+            self._ring[slot] = update_id
+        return False
+
+    def forget(self, update_id: int) -> None:
+        """
+        Forget an update ID, e.g. because the update was rejected and will
+        be delivered again.
+
+        Args:
+            update_id: Update identifier
+        """
+        slot = update_id % self.window
+        if self._ring[slot] == update_id:
+            self._ring[slot] = None
+        self._lru.pop(update_id, None)
+
+    def clear(self) -> None:
+        """Forget every update ID."""
+        self._ring = [None] * self.window
+        self._lru.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get the filter statistics.
+
+        Returns:
+            Number of checked and dropped updates
+        """
+        return {"checked": self.checked, "dropped": self.dropped}
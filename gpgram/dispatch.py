@@ -0,0 +1,306 @@
+"""
+Handler execution for Gpgram.
+
+This module runs the handlers that match an update. By default they run one
+after another; in concurrent mode independent handlers run in parallel under
+an ``asyncio.TaskGroup``. Every handler can get a timeout, and the latency of
+every handler is recorded. Sync handlers run in a thread pool and CPU-bound
+handlers can run in a process pool, so they never block the event loop.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Executors for handlers that do not run on the event loop
+THREAD = "thread"
+PROCESS = "process"
+EXECUTORS = (THREAD, PROCESS)
+
+
+def get_handler_name(handler: Callable) -> str:
+    """
+    Get a readable name for a handler.
+
+    Args:
+        handler: Handler function
+
+    Returns:
+        The handler's module and qualified name
+    """
+    module = getattr(handler, "__module__", None)
+    name = getattr(handler, "__qualname__", None) or repr(handler)
+    return f"{module}.{name}" if module else name
+
+
+class HandlerStats:
+    """Latency statistics for a handler."""
+
+    __slots__ = ("calls", "failures", "timeouts", "total_time", "max_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    @property
+    def average_time(self) -> float:
+        """Average handler duration in seconds."""
+        return self.total_time / self.calls if self.calls else 0.0
+
+    def record(self, duration: float) -> None:
+        """
+        Record a finished call.
+
+        Args:
+            duration: Call duration in seconds
+        """
+        self.calls += 1
+        self.total_time += duration
+        if duration > self.max_time:
+            self.max_time = duration
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Convert the statistics to a dictionary.
+
+        Returns:
+            Dictionary representation of the statistics
+        """
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "average_time": self.average_time,
+            "max_time": self.max_time,
+        }
+
+
+class ExecutorStats:
+    """Queue statistics for a handler executor."""
+
+    __slots__ = ("workers", "in_flight", "completed")
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.in_flight = 0
+        self.completed = 0
+
+    @property
+    def queued(self) -> int:
+        """Number of calls waiting for a free worker."""
+        return max(0, self.in_flight - self.workers)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Convert the statistics to a dictionary.
+
+        Returns:
+            Dictionary representation of the statistics
+        """
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+        }
+
+
+class HandlerDispatcher:
+    """
+    Run the handlers that match an update.
+
+    In sequential mode the handlers run one after another and an exception
+    stops the remaining handlers, as before. In concurrent mode independent
+    handlers run in parallel and a failing handler is logged without
+    affecting the others. Handlers registered with ``sequential=True`` act as
+    barriers: they wait for the handlers before them and run on their own.
+
+    A handler that exceeds its timeout is cancelled and logged in both modes.
+
+    Sync handlers run in a thread pool and receive the event; handlers
+    registered with ``executor="process"`` run in a process pool and receive
+    the raw update data, since events cannot be pickled. If such a handler
+    returns a string, it is sent back as a reply from the event loop. If a
+    sync handler returns an awaitable, e.g. because it wraps a coroutine
+    function, the awaitable is awaited on the event loop. A timeout stops
+    waiting for an offloaded handler, but cannot interrupt it.
+    """
+
+    def __init__(
+        self,
+        concurrent: bool = False,
+        timeout: float | None = None,
+        thread_workers: int | None = None,
+        process_workers: int | None = None,
+    ):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            concurrent: Run independent matching handlers in parallel
+            timeout: Default timeout for each handler in seconds, or None for
+                no timeout. Handlers can set their own with ``timeout=``.
+            thread_workers: Size of the thread pool for sync handlers.
+                Defaults to the ``ThreadPoolExecutor`` default.
+            process_workers: Size of the process pool for CPU-bound handlers.
+                Defaults to the number of CPUs.
+        """
+        self.concurrent = concurrent
+        self.timeout = timeout
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.stats: dict[Callable, HandlerStats] = {}
+        self._executors: dict[str, Executor] = {}
+        self.executor_stats: dict[str, ExecutorStats] = {}
+
+    async def dispatch(self, handlers: list[Callable], event: Any) -> None:
+        """
+        Run the handlers for an event.
+
+        Args:
+            handlers: Matching handlers in registration order
+            event: Event passed to every handler
+        """
+        if not self.concurrent or len(handlers) < 2:
+            for handler in handlers:
+                await self.run(handler, event)
+            return
+
+        batch: list[Callable] = []
+        for handler in handlers:
+            if getattr(handler, "_sequential", False):
+                await self._run_batch(batch, event)
+                batch = []
+                await self._run_isolated(handler, event)
+            else:
+                batch.append(handler)
+        await self._run_batch(batch, event)
+
+    async def _run_batch(self, handlers: list[Callable], event: Any) -> None:
+        """Run independent handlers in parallel."""
+        if len(handlers) == 1:
+            await self._run_isolated(handlers[0], event)
+        elif handlers:
+            async with asyncio.TaskGroup() as group:
+                for handler in handlers:
+                    group.create_task(self._run_isolated(handler, event))
+
+    async def _run_isolated(self, handler: Callable, event: Any) -> None:
+        """Run a handler and log its exception instead of raising it."""
+        try:
+            await self.run(handler, event)
+        except Exception:
+            logger.exception("Handler %s failed", get_handler_name(handler))
+
+    async def run(self, handler: Callable, event: Any) -> None:
+        """
+        Run a handler with its timeout and record its latency.
+
+        Args:
+            handler: Handler function
+            event: Event passed to the handler
+        """
+        stats = self.stats.get(handler)
+        if stats is None:
+            stats = self.stats[handler] = HandlerStats()
+
+        timeout = getattr(handler, "_timeout", None) or self.timeout
+        scope = asyncio.timeout(timeout)
+        start = time.perf_counter()
+        try:
+            async with scope:
+                executor = getattr(handler, "_executor", None)
+                if executor is None:
+                    await handler(event)
+                else:
+                    result = await self._run_in_executor(executor, handler, event)
+                    if inspect.isawaitable(result):
+                        # A sync wrapper around a coroutine function
+                        await result
+                    elif isinstance(result, str):
+                        await event.reply(result)
+        except TimeoutError:
+            if not scope.expired():
+                # Raised by the handler itself
+                stats.failures += 1
+                raise
+            stats.timeouts += 1
+            logger.warning(
+                "Handler %s timed out after %g seconds",
+                get_handler_name(handler),
+                timeout,
+            )
+        except Exception:
+            stats.failures += 1
+            raise
+        finally:
+            stats.record(time.perf_counter() - start)
+
+    def _get_executor(self, name: str) -> Executor:
+        """Get an executor, creating it on first use."""
+        executor = self._executors.get(name)
+        if executor is None:
+            if name == PROCESS:
+                workers = self.process_workers or os.cpu_count() or 1
+                executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                # The ThreadPoolExecutor default
+                workers = self.thread_workers or min(32, (os.cpu_count() or 1) + 4)
+                executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="gpgram-handler"
+                )
+            self._executors[name] = executor
+            self.executor_stats[name] = ExecutorStats(workers)
+        return executor
+
+    async def _run_in_executor(self, name: str, handler: Callable, event: Any) -> Any:
+        """Run a handler in the thread or process pool."""
+        executor = self._get_executor(name)
+        stats = self.executor_stats[name]
+        # Events hold the bot and its connections and cannot be pickled
+        argument = event.info.data if name == PROCESS else event
+
+        stats.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, handler, argument)
+        finally:
+            stats.in_flight -= 1
+            stats.completed += 1
+
+    def get_executor_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Get the queue statistics of the handler executors in use.
+
+        Returns:
+            Statistics keyed by executor name ("thread" or "process")
+        """
+        return {name: stats.to_dict() for name, stats in self.executor_stats.items()}
+
+    def shutdown(self) -> None:
+        """Shut down the handler executors without waiting for them."""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors.clear()
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Get the statistics of every handler that has run.
+
+        Returns:
+            Statistics keyed by handler name
+        """
+        return {
+            get_handler_name(handler): stats.to_dict()
+            for handler, stats in self.stats.items()
+        }
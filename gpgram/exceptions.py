@@ -0,0 +1,31 @@
+"""
+Exceptions for Gpgram.
+"""
+
+from typing import Any
+
+
+class BotException(Exception):
+    """Base exception for Bot errors."""
+
+    pass
+
+
+class APIError(BotException):
+    """Exception raised when the Telegram API returns an error."""
+
+    def __init__(
+        self,
+        error_code: int,
+        description: str,
+        parameters: dict[str, Any] | None = None,
+    ):
+        self.error_code = error_code
+        self.description = description
+        self.parameters = parameters or {}
+        super().__init__(f"Telegram API error {error_code}: {description}")
+
+    @property
+    def retry_after(self) -> float | None:
+        """Seconds to wait before repeating the request, for flood errors."""
+        return self.parameters.get("retry_after")
@@ -0,0 +1,246 @@
+"""
+Declarative handler filters for Gpgram.
+
+Handlers can be restricted to content types, chat types, chats and users
+when they are registered. The facts the filters look at are extracted from
+the raw update once, in :class:`UpdateInfo`, and the routers index handlers
+by content type, so only handlers that can accept an update are checked.
+"""
+
+from collections.abc import Iterable
+from typing import Any
+
+from .types.lazy import MESSAGE_KINDS, get_update_kind
+
+# Message content types, in the order they are detected. Animations also
+# carry a document, so they are checked first.
+CONTENT_TYPES = (
+    "text",
+    "animation",
+    "photo",
+    "document",
+    "audio",
+    "video",
+    "video_note",
+    "voice",
+    "sticker",
+    "contact",
+    "dice",
+    "game",
+    "poll",
+    "venue",
+    "location",
+    "invoice",
+    "successful_payment",
+    "new_chat_members",
+    "left_chat_member",
+    "new_chat_title",
+    "new_chat_photo",
+    "pinned_message",
+)
+
+
+class UpdateInfo:
+    """
+    Facts about an update that routing and filters need.
+
+    They are read from the raw update data once per update, so neither the
+    update nor its message has to be parsed to route it.
+
+    Attributes:
+        kind: Name of the field that carries the update, e.g. "message"
+        content_type: Content type of the update's message, e.g. "photo"
+        chat_type: Type of the chat, e.g. "private" or "supergroup"
+        chat_id: Identifier of the chat the update belongs to
+        user_id: Identifier of the user who caused the update
+        text: Text of the update's message
+        callback_data: Data of the callback query
+        data: The raw update data
+    """
+
+    __slots__ = (
+        "data",
+        "kind",
+        "content_type",
+        "chat_type",
+        "chat_id",
+        "user_id",
+        "text",
+        "callback_data",
+    )
+
+    def __init__(self, update_data: dict[str, Any]):
+        """
+        Extract the facts from an update.
+
+        Args:
+            update_data: Update data from Telegram
+        """
+        self.data = update_data
+        self.kind = get_update_kind(update_data)
+        self.content_type: str | None = None
+        self.chat_type: str | None = None
+        self.chat_id: int | None = None
+        self.user_id: int | None = None
+        self.text: str | None = None
+        self.callback_data: str | None = None
+
+        payload = update_data.get(self.kind) if self.kind else None
+        if not isinstance(payload, dict):
+            return
+
+        if self.kind in MESSAGE_KINDS:
+            message = payload
+            self.text = message.get("text")
+            self.content_type = next(
+                (key for key in CONTENT_TYPES if key in message), None
+            )
+        elif self.kind == "callback_query":
+            message = payload.get("message") or {}
+            self.callback_data = payload.get("data")
+        else:
+            message = payload
+
+        chat = message.get("chat")
+        if chat:
+            self.chat_id = chat.get("id")
+            self.chat_type = chat.get("type")
+
+        user = payload.get("from") or payload.get("user")
+        if user:
+            self.user_id = user.get("id")
+
+
+def _to_set(value: Any) -> frozenset | None:
+    """Convert a single value or an iterable of values to a frozenset."""
+    if value is None:
+        return None
+    if isinstance(value, str | int):
+        return frozenset((value,))
+    return frozenset(value)
+
+
+class HandlerFilter:
+    """
+    Conditions an update must meet for a handler to be called.
+
+    Every condition that is set must hold; None means any value is accepted.
+    """
+
+    __slots__ = ("content_types", "chat_types", "chat_ids", "user_ids")
+
+    def __init__(
+        self,
+        content_types: str | Iterable[str] | None = None,
+        chat_types: str | Iterable[str] | None = None,
+        chat_ids: int | Iterable[int] | None = None,
+        user_ids: int | Iterable[int] | None = None,
+    ):
+        """
+        Initialize the filter.
+
+        Args:
+            content_types: Accepted message content types, e.g. "photo"
+            chat_types: Accepted chat types, e.g. "private"
+            chat_ids: Accepted chat identifiers
+            user_ids: Accepted user identifiers
+        """
+        self.content_types = _to_set(content_types)
+        self.chat_types = _to_set(chat_types)
+        self.chat_ids = _to_set(chat_ids)
+        self.user_ids = _to_set(user_ids)
+
+    def __repr__(self) -> str:
+        conditions = ", ".join(
+            f"{name}={sorted(getattr(self, name))!r}"
+            for name in self.__slots__
+            if getattr(self, name) is not None
+        )
+        return f"HandlerFilter({conditions})"
+
+    def matches(self, info: UpdateInfo) -> bool:
+        """
+        Check whether an update meets the conditions.
+
+        Args:
+            info: Facts about the update
+
+        Returns:
+            True if the handler should be called
+        """
+        return (
+            (self.content_types is None or info.content_type in self.content_types)
+            and (self.chat_types is None or info.chat_type in self.chat_types)
+            and (self.chat_ids is None or info.chat_id in self.chat_ids)
+            and (self.user_ids is None or info.user_id in self.user_ids)
+        )
+
+
+def make_filter(
+    content_types: str | Iterable[str] | None = None,
+    chat_types: str | Iterable[str] | None = None,
+    chat_ids: int | Iterable[int] | None = None,
+    user_ids: int | Iterable[int] | None = None,
+) -> HandlerFilter | None:
+    """
+    Create a filter, or None if no condition is set.
+
+    Args:
+        content_types: Accepted message content types, e.g. "photo"
+        chat_types: Accepted chat types, e.g. "private"
+        chat_ids: Accepted chat identifiers
+        user_ids: Accepted user identifiers
+
+    Returns:
+        The filter, or None if every update is accepted
+    """
+    if content_types is chat_types is chat_ids is user_ids is None:
+        return None
+    return HandlerFilter(content_types, chat_types, chat_ids, user_ids)
+
+
+class ContentIndex:
+    """
+    Handler indexes grouped by the content types their filters accept.
+
+    Entries without a content type condition are candidates for every
+    update; the others are only candidates for their content types.
+    """
+
+    __slots__ = ("_any", "_by_type")
+
+    def __init__(self):
+        self._any: list[int] = []
+        self._by_type: dict[str, list[int]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._any or self._by_type)
+
+    def add(self, index: int, handler_filter: HandlerFilter | None) -> None:
+        """
+        Add an entry.
+
+        Args:
+            index: Entry index
+            handler_filter: The entry's filter
+        """
+        if handler_filter is None or handler_filter.content_types is None:
+            self._any.append(index)
+        else:
+            for content_type in handler_filter.content_types:
+                self._by_type.setdefault(content_type, []).append(index)
+
+    def candidates(self, content_type: str | None) -> list[int]:
+        """
+        Get the entries that can accept a content type.
+
+        Args:
+            content_type: Content type of the update, if any
+
+        Returns:
+            Entry indexes, not necessarily in order
+        """
+        indexes = self._by_type.get(content_type) if content_type else None
+        if indexes:
+            return self._any + indexes
+        return self._any
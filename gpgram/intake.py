@@ -0,0 +1,284 @@
+"""
+Update intake for Gpgram.
+
+Every received update goes through the same admission steps before it is
+acknowledged to Telegram, whether it arrives by polling or by webhook:
+updates the backlog policy considers too old are shed, updates that were
+already received are dropped, and the rest are written to the journal.
+:class:`UpdateIntake` implements these steps, and :class:`WebhookQueue`
+puts the admitted webhook updates on a bounded queue served by a fixed pool
+of worker tasks.
+"""
+
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .backlog import BacklogPolicy
+from .concurrency import UpdateWorkerPool
+from .dedup import UpdateDeduplicator
+from .journal import UpdateJournal
+from .webhook_reply import WebhookReply, use_webhook_reply
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateIntake:
+    """
+    Admission of received updates.
+
+    Each accepted update must either be handled and passed to :meth:`done`,
+    or passed to :meth:`reject` if Telegram will deliver it again.
+    """
+
+    def __init__(
+        self,
+        journal: UpdateJournal | None = None,
+        deduplicator: UpdateDeduplicator | None = None,
+        backlog: BacklogPolicy | None = None,
+    ):
+        """
+        Initialize the intake.
+
+        Args:
+            journal: Durable journal that accepted updates are written to
+            deduplicator: Filter that drops updates received more than once
+            backlog: Policy that sheds stale updates
+        """
+        self.journal = journal
+        self.deduplicator = deduplicator
+        self.backlog = backlog
+
+    async def accept(self, updates: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Admit received updates before they are acknowledged.
+
+        The journal is opened on first use if it is not open yet.
+
+        Args:
+            updates: Update data from Telegram
+
+        Returns:
+            The accepted updates, in their original order
+        """
+        if self.backlog is not None:
+            updates = await self.backlog.filter(updates)
+        if self.deduplicator is not None:
+            # Duplicates are dropped before the journal, so a redelivery of a
+            # handled update is never written to it again
+            updates = [
+                update_data
+                for update_data in updates
+                if not self.deduplicator.is_duplicate(update_data["update_id"])
+            ]
+        if self.journal is not None and updates:
+            try:
+                if not self.journal.is_open:
+                    # The journal was not replayed, e.g. by a webhook server
+                    # that only calls Bot.process_update
+                    await self.journal.open()
+                await self.journal.append_many(updates)
+            except BaseException:
+                # Not accepted after all, so the redelivery must get through
+                if self.deduplicator is not None:
+                    for update_data in updates:
+                        self.deduplicator.forget(update_data["update_id"])
+                raise
+        return updates
+
+    def reject(self, update_id: int) -> None:
+        """
+        Give up an accepted update that Telegram will deliver again.
+
+        Args:
+            update_id: Update identifier
+        """
+        if self.deduplicator is not None:
+            self.deduplicator.forget(update_id)
+        if self.journal is not None:
+            self.journal.done(update_id)
+
+    def done(self, update_id: int) -> None:
+        """
+        Mark an accepted update as handled.
+
+        Args:
+            update_id: Update identifier
+        """
+        if self.journal is not None:
+            self.journal.done(update_id)
+
+    async def recover(self) -> list[dict[str, Any]]:
+        """
+        Open the journal and get the updates left in it by a previous run.
+
+        Stale updates are removed from the journal, and the others are
+        remembered as received, so Telegram's redeliveries of them are
+        dropped.
+
+        Returns:
+            The updates to handle, in update order
+        """
+        if self.journal is None:
+            return []
+        await self.journal.open()
+        pending = await self.journal.pending()
+        updates = pending
+        if self.backlog is not None:
+            updates = await self.backlog.filter(pending)
+        if len(updates) < len(pending):
+            kept_ids = {update_data["update_id"] for update_data in updates}
+            for update_data in pending:
+                if update_data["update_id"] not in kept_ids:
+                    self.journal.done(update_data["update_id"])
+        if self.deduplicator is not None:
+            for update_data in updates:
+                self.deduplicator.is_duplicate(update_data["update_id"])
+        return updates
+
+    async def close(self) -> None:
+        """Commit the pending journal writes and close the journal."""
+        if self.journal is not None:
+            await self.journal.close()
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get the admission statistics.
+
+        Returns:
+            Number of duplicate and shed updates
+        """
+        return {
+            "duplicates": self.deduplicator.dropped if self.deduplicator else 0,
+            "shed": self.backlog.shed if self.backlog else 0,
+        }
+
+
+class WebhookQueue:
+    """
+    Bounded queue between a webhook endpoint and the update handlers.
+
+    Updates are admitted by an :class:`UpdateIntake` and queued for a fixed
+    pool of worker tasks, so Telegram gets its response without waiting for
+    the handlers. When the queue is full the update is rejected with 429 and
+    Telegram delivers it again later.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[dict[str, Any]], Awaitable[None]],
+        intake: UpdateIntake,
+        workers: int = 8,
+        queue_size: int = 100,
+        webhook_reply: bool = False,
+        reply_timeout: float = 0.5,
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            handler: Coroutine function that handles an update and marks it
+                done in the intake
+            intake: Admission of the received updates
+            workers: Number of worker tasks processing updates. Updates from
+                the same chat are processed in order by the same worker.
+            queue_size: Maximum number of queued updates per worker
+            webhook_reply: Return the first API call of each update's
+                handlers in the webhook response instead of sending it
+            reply_timeout: Seconds to hold the webhook response open for an
+                API call to return in it
+        """
+        self.handler = handler
+        self.intake = intake
+        self.webhook_reply = webhook_reply
+        self.reply_timeout = reply_timeout
+        self.pool = UpdateWorkerPool(
+            self._process_update, workers=workers, queue_size=queue_size
+        )
+        self.accepted = 0
+        self.rejected = 0
+        self.accepting = False
+        self._replies: dict[Any, WebhookReply] = {}
+
+    def start(self) -> None:
+        """Start the worker tasks and accept updates."""
+        self.pool.start()
+        self.accepting = True
+
+    async def drain(self, timeout: float | None) -> None:
+        """
+        Stop accepting updates and process the queued ones.
+
+        Args:
+            timeout: Seconds to wait for the queued updates, or None to wait
+                for all of them
+        """
+        self.accepting = False
+        await self.pool.drain(timeout)
+
+    async def submit(
+        self, update_data: dict[str, Any]
+    ) -> tuple[int, dict[str, Any] | None]:
+        """
+        Admit and queue a webhook update.
+
+        Args:
+            update_data: Update data from Telegram
+
+        Returns:
+            The HTTP status of the webhook response, and the API call to
+            return in its body, if any
+        """
+        if not self.accepting:
+            # Shutting down; Telegram will deliver the update again
+            self.rejected += 1
+            return 503, None
+
+        if not await self.intake.accept([update_data]):
+            # Stale or already received; acknowledge so Telegram moves on
+            return 200, None
+
+        update_id = update_data.get("update_id")
+        reply = None
+        if self.webhook_reply:
+            reply = self._replies[update_id] = WebhookReply()
+
+        if not self.pool.try_submit(update_data):
+            # Telegram will deliver the update again
+            self.intake.reject(update_id)
+            self._replies.pop(update_id, None)
+            self.rejected += 1
+            logger.warning(f"Update queue full, rejecting update {update_id}")
+            return 429, None
+
+        self.accepted += 1
+        if reply is None:
+            return 200, None
+
+        body = await reply.wait(self.reply_timeout)
+        # The update may still be queued; its calls must not wait for us
+        self._replies.pop(update_id, None)
+        return 200, body
+
+    async def _process_update(self, update_data: dict[str, Any]) -> None:
+        """Pass a queued update to the handler."""
+        reply = self._replies.pop(update_data.get("update_id"), None)
+        if reply is None:
+            await self.handler(update_data)
+            return
+        with use_webhook_reply(reply):
+            await self.handler(update_data)
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get the queue statistics.
+
+        Returns:
+            Number of queued, accepted, rejected, duplicate and shed updates
+        """
+        return {
+            "queued": self.pool.queued,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            **self.intake.get_stats(),
+        }
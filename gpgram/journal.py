@@ -0,0 +1,266 @@
+"""
+Durable update journal for Gpgram.
+
+Updates are written to an SQLite database in WAL mode before they are
+acknowledged to Telegram, and removed once their handlers have finished. If
+the process dies, the updates that were still in the journal are replayed on
+the next start, so every acknowledged update is handled at least once.
+
+Writes are group-committed: appends and completions that arrive while a
+commit is running are written together in the next transaction, so the cost
+of each fsync is shared by every update in the batch.
+"""
+
+import asyncio
+import logging
+import sqlite3
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from .codec import JSONCodec, get_codec
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS updates (
+    update_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_NOT_OPEN = "The update journal is not open"
+
+_SAVE_LAST_UPDATE_ID = """
+INSERT INTO state (key, value) VALUES ('last_update_id', ?)
+ON CONFLICT (key) DO UPDATE SET value = max(value, excluded.value)
+"""
+
+
+class UpdateJournal:
+    """
+    Append-only journal of the updates that have not been handled yet.
+
+    Call :meth:`append` (or :meth:`append_many`) before acknowledging an
+    update and :meth:`done` once it has been handled. Completions are written
+    with the next commit; an update whose completion was not written yet
+    when the process died is handled again.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        synchronous: str = "FULL",
+        commit_delay: float = 0.0,
+        codec: JSONCodec | None = None,
+    ):
+        """
+        Initialize the journal.
+
+        Args:
+            path: Path of the SQLite database
+            synchronous: SQLite ``synchronous`` setting. "FULL" survives power
+                loss; "NORMAL" is faster and still survives process crashes.
+            commit_delay: Seconds to wait for more writes before each commit.
+                Writes that arrive during a commit are always batched.
+            codec: JSON codec for the stored updates. Defaults to the fastest
+                installed codec.
+        """
+        self.path = Path(path)
+        self.synchronous = synchronous
+        self.commit_delay = commit_delay
+        self.codec = codec or get_codec()
+        self.last_update_id: int | None = None
+
+        self.appended = 0
+        self.completed = 0
+        self.commits = 0
+
+        self._conn: sqlite3.Connection | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._writer: asyncio.Task | None = None
+        self._appends: list[tuple[int, bytes]] = []
+        self._done: list[int] = []
+        self._waiters: list[asyncio.Future] = []
+        self._wakeup = asyncio.Event()
+        self._open_lock = asyncio.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the journal has been opened."""
+        return self._conn is not None
+
+    async def open(self) -> None:
+        """Open the database and start the writer task."""
+        async with self._open_lock:
+            if self._conn is not None:
+                return
+            # SQLite connections are used from the single thread that made them
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="gpgram-journal"
+            )
+            self._conn = await self._run(self._connect)
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connect to the database and create the tables."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.executescript(_SCHEMA)
+        row = conn.execute(
+            "SELECT value FROM state WHERE key = 'last_update_id'"
+        ).fetchone()
+        self.last_update_id = row[0] if row else None
+        return conn
+
+    async def _run(self, func: Any, *args: Any) -> Any:
+        """Run a database call on the journal thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def append(self, update_data: dict[str, Any]) -> None:
+        """
+        Write an update to the journal.
+
+        Returns once the update has been committed.
+
+        Args:
+            update_data: Update data from Telegram
+        """
+        await self.append_many((update_data,))
+
+    async def append_many(self, updates: Iterable[dict[str, Any]]) -> None:
+        """
+        Write a batch of updates to the journal.
+
+        Returns once the updates have been committed.
+
+        Args:
+            updates: Update data from Telegram
+        """
+        if self._conn is None:
+            raise RuntimeError(_NOT_OPEN)
+        entries = [
+            (update_data["update_id"], self.codec.dumps(update_data))
+            for update_data in updates
+        ]
+        if not entries:
+            return
+        for update_id, _ in entries:
+            if self.last_update_id is None or update_id > self.last_update_id:
+                self.last_update_id = update_id
+        self._appends.extend(entries)
+        await self.flush()
+
+    def done(self, update_id: int) -> None:
+        """
+        Mark an update as handled.
+
+        The update is removed from the journal with the next commit.
+
+        Args:
+            update_id: Update identifier
+        """
+        self._done.append(update_id)
+        self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Wait until every pending write has been committed."""
+        if self._conn is None:
+            raise RuntimeError(_NOT_OPEN)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._wakeup.set()
+        await waiter
+
+    async def _write_loop(self) -> None:
+        """Commit the pending writes in batches."""
+        while True:
+            await self._wakeup.wait()
+            if self.commit_delay:
+                await asyncio.sleep(self.commit_delay)
+            self._wakeup.clear()
+
+            appends, self._appends = self._appends, []
+            done, self._done = self._done, []
+            waiters, self._waiters = self._waiters, []
+            try:
+                if appends or done:
+                    await self._run(self._commit, appends, done)
+            except Exception as e:
+                logger.exception("Error writing the update journal")
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            else:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+
+    def _commit(self, appends: list[tuple[int, bytes]], done: list[int]) -> None:
+        """Write a batch of appends and completions in one transaction."""
+        with self._conn:
+            if appends:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO updates (update_id, data) VALUES (?, ?)",
+                    appends,
+                )
+                self._conn.execute(
+                    _SAVE_LAST_UPDATE_ID,
+                    (max(update_id for update_id, _ in appends),),
+                )
+            if done:
+                self._conn.executemany(
+                    "DELETE FROM updates WHERE update_id = ?",
+                    [(update_id,) for update_id in done],
+                )
+        self.appended += len(appends)
+        self.completed += len(done)
+        self.commits += 1
+
+    async def pending(self) -> list[dict[str, Any]]:
+        """
+        Get the updates that have not been handled yet.
+
+        Returns:
+            Update data in update order
+        """
+        rows = await self._run(
+            lambda: self._conn.execute(
+                "SELECT data FROM updates ORDER BY update_id"
+            ).fetchall()
+        )
+        return [self.codec.loads(data) for (data,) in rows]
+
+    async def close(self) -> None:
+        """Commit the pending writes and close the database."""
+        if self._conn is None:
+            return
+        await self.flush()
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        await self._run(self._conn.close)
+        self._executor.shutdown()
+        self._conn = None
+        self._executor = None
+        self._writer = None
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get the journal statistics.
+
+        Returns:
+            Number of updates written and completed, and of commits
+        """
+        return {
+            "appended": self.appended,
+            "completed": self.completed,
+            "commits": self.commits,
+        }
@@ -0,0 +1,324 @@
+"""
+Outbound rate limiting for Gpgram.
+
+This module provides a scheduler that keeps outgoing messages within
+Telegram's send limits: about 30 messages per second overall, one message per
+second in a private chat and 20 messages per minute in a group. Requests over
+the limit wait for their turn instead of failing with 429 errors. When
+Telegram still answers with a 429 error, the affected scope is paused for the
+requested time and the number of concurrent sends is reduced. Reads and
+other calls that do not send a message are not limited.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any
+
+# Methods that send a message and are subject to the send limits. Other
+# calls, such as reads and chat actions, are not limited.
+SEND_METHODS = frozenset(
+    {
+        "sendMessage",
+        "sendPhoto",
+        "sendAudio",
+        "sendDocument",
+        "sendVideo",
+        "sendAnimation",
+        "sendVoice",
+        "sendVideoNote",
+        "sendPaidMedia",
+        "sendMediaGroup",
+        "sendLocation",
+        "sendVenue",
+        "sendContact",
+        "sendPoll",
+        "sendDice",
+        "sendSticker",
+        "sendInvoice",
+        "sendGame",
+        "copyMessage",
+        "copyMessages",
+        "forwardMessage",
+        "forwardMessages",
+    }
+)
+
+
+class TokenBucket:
+    """
+    A token bucket that hands out time slots to callers.
+
+    Each acquisition reserves the next free slot, so concurrent callers are
+    queued in FIFO order rather than racing for tokens.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        """
+        Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size). Defaults to one
+                second worth of tokens, but at least one token.
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last update."""
+        if now > self.updated:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+    def reserve(self, now: float | None = None) -> float:
+        """
+        Take a token, borrowing from the future if none is available.
+
+        Args:
+            now: Current monotonic time
+
+        Returns:
+            Seconds to wait before the reserved slot starts
+        """
+        if now is None:
+            now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def pause(self, seconds: float, now: float | None = None) -> None:
+        """
+        Stop handing out slots for a while.
+
+        The bucket is drained by the paused time, so reservations made during
+        the pause are spread out at the normal rate once it ends.
+
+        Args:
+            seconds: Pause duration in seconds
+            now: Current monotonic time
+        """
+        if now is None:
+            now = time.monotonic()
+        self._refill(now)
+        self.paused_until = max(self.paused_until, now + seconds)
+        # The next reservation starts exactly when the pause ends
+        self.tokens = min(self.tokens, 0.0) + 1.0 - seconds * self.rate
+
+    def is_idle(self, now: float | None = None) -> bool:
+        """
+        Check whether the bucket is full, i.e. equivalent to a fresh bucket.
+
+        Args:
+            now: Current monotonic time
+        """
+        if now is None:
+            now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+    async def wait(self) -> None:
+        """Reserve a slot and sleep until it starts."""
+        delay = self.reserve()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            # The bucket may have been paused while we were sleeping
+            delay = self.paused_until - time.monotonic()
+
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency limit with additive increase, multiplicative decrease.
+
+    The limit grows by about one slot per window of successful requests and
+    is cut sharply whenever Telegram reports flood control, which keeps the
+    number of concurrent sends close to what Telegram accepts.
+    """
+
+    def __init__(
+        self,
+        initial: float = 8.0,
+        minimum: float = 1.0,
+        maximum: float = 64.0,
+        decrease_factor: float = 0.5,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            initial: Initial concurrency limit
+            minimum: Lowest concurrency limit
+            maximum: Highest concurrency limit
+            decrease_factor: Factor applied to the limit on a flood error
+        """
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        """Wait for a free concurrency slot."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, throttled: bool = False) -> None:
+        """
+        Free a concurrency slot and adjust the limit.
+
+        Args:
+            throttled: Whether the request was rejected by flood control
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class RateLimiter:
+    """
+    Global and per-chat outbound request scheduler.
+
+    Every request that sends a message takes a slot from its chat's bucket
+    and then from the global bucket. Chat buckets are evicted once they are
+    idle, so memory only grows with the number of recently active chats.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        private_chat_rate: float = 1.0,
+        group_chat_rate: float = 20 / 60,
+        limited_methods: set[str] | frozenset[str] = SEND_METHODS,
+        concurrency: AIMDLimiter | None = None,
+    ):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            global_rate: Maximum requests per second across all chats
+            private_chat_rate: Maximum requests per second to a private chat
+            group_chat_rate: Maximum requests per second to a group or channel
+            limited_methods: API methods that go through the limiter
+            concurrency: Adaptive limit on concurrent limited requests
+        """
+        self.global_rate = global_rate
+        self.private_chat_rate = private_chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.limited_methods = frozenset(limited_methods)
+        self.concurrency = concurrency or AIMDLimiter()
+
+        self._global = TokenBucket(global_rate)
+        self._chats: OrderedDict[int | str, TokenBucket] = OrderedDict()
+
+    def is_limited(self, method: str) -> bool:
+        """
+        Check whether requests to a method go through the limiter.
+
+        Args:
+            method: API method name
+        """
+        return method in self.limited_methods
+
+    def _chat_rate(self, chat_id: int | str) -> float:
+        """Get the send rate for a chat based on its identifier."""
+        # Private chats have positive identifiers; groups, supergroups and
+        # channels have negative identifiers or @usernames
+        if isinstance(chat_id, int) and chat_id > 0:
+            return self.private_chat_rate
+        return self.group_chat_rate
+
+    def _chat_bucket(self, chat_id: int | str, now: float) -> TokenBucket:
+        """Get or create the bucket for a chat, evicting idle buckets."""
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self._chat_rate(chat_id))
+            self._chats[chat_id] = bucket
+        else:
+            self._chats.move_to_end(chat_id)
+
+        # Buckets are ordered by last use, so the idle ones are at the front
+        while len(self._chats) > 1:
+            oldest_id, oldest = next(iter(self._chats.items()))
+            if oldest_id == chat_id or not oldest.is_idle(now):
+                break
+            del self._chats[oldest_id]
+
+        return bucket
+
+    @property
+    def tracked_chats(self) -> int:
+        """Number of chats that currently have a bucket."""
+        return len(self._chats)
+
+    async def acquire(self, method: str, params: dict[str, Any]) -> None:
+        """
+        Wait until a request may be sent.
+
+        Every call for a limited method must be paired with a call to
+        :meth:`release` once the response has been received.
+
+        Args:
+            method: API method name
+            params: Request parameters
+        """
+        if not self.is_limited(method):
+            return
+
+        chat_id = params.get("chat_id")
+        if chat_id is not None:
+            await self._chat_bucket(chat_id, time.monotonic()).wait()
+
+        await self._global.wait()
+        await self.concurrency.acquire()
+
+    async def release(
+        self,
+        method: str,
+        params: dict[str, Any],
+        retry_after: float | None = None,
+    ) -> None:
+        """
+        Report the outcome of a request sent after :meth:`acquire`.
+
+        Args:
+            method: API method name
+            params: Request parameters
+            retry_after: Seconds Telegram asked to wait if the request hit
+                flood control
+        """
+        if not self.is_limited(method):
+            return
+
+        if retry_after is not None:
+            self.pause(params.get("chat_id"), retry_after)
+
+        await self.concurrency.release(throttled=retry_after is not None)
+
+    def pause(self, chat_id: int | str | None, seconds: float) -> None:
+        """
+        Pause sending to a chat, or to every chat if no chat is given.
+
+        Args:
+            chat_id: Chat to pause, or None for the global scope
+            seconds: Pause duration in seconds
+        """
+        now = time.monotonic()
+        if chat_id is None:
+            self._global.pause(seconds, now)
+        else:
+            self._chat_bucket(chat_id, now).pause(seconds, now)
@@ -0,0 +1,217 @@
+"""
+Retry policy for Gpgram.
+
+This module decides which failed requests are worth repeating. Errors that
+can never succeed fail fast, errors raised before the request reached
+Telegram are always retried, and errors that leave it unknown whether
+Telegram acted on the request are only retried for idempotent methods, so a
+slow ``sendMessage`` does not turn into a duplicate message. A per-method
+retry budget stops retries from amplifying an outage.
+"""
+
+import time
+
+import httpx
+
+from .exceptions import APIError
+
+# Method name prefixes of requests that can be repeated safely
+IDEMPOTENT_PREFIXES = ("get", "set", "edit")
+
+
+class RetryBudget:
+    """
+    Limit retries to a fraction of the requests made.
+
+    Each request deposits ``ratio`` tokens and each retry withdraws one. A
+    small steady refill keeps low-traffic methods able to retry at all.
+    """
+
+    __slots__ = ("ratio", "min_per_second", "capacity", "tokens", "updated")
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_per_second: float = 1.0,
+        capacity: float = 10.0,
+    ):
+        """
+        Initialize the budget.
+
+        Args:
+            ratio: Retries allowed per request
+            min_per_second: Retries allowed per second regardless of traffic
+            capacity: Maximum number of saved up retries
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last update."""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.min_per_second
+        )
+        self.updated = now
+
+    def deposit(self) -> None:
+        """Record a request."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Take a retry from the budget.
+
+        Returns:
+            True if the retry is allowed
+        """
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RetryPolicy:
+    """
+    Classify request errors and decide whether to retry them.
+
+    Subclass and override :meth:`is_retryable` or :meth:`is_idempotent` to
+    customize the classification.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        retry_unsafe: bool = False,
+        budget_ratio: float = 0.2,
+        budget_min_per_second: float = 1.0,
+    ):
+        """
+        Initialize the retry policy.
+
+        Args:
+            max_retries: Maximum number of retries per request
+            backoff: Base delay for exponential backoff in seconds
+            max_backoff: Maximum backoff delay in seconds
+            retry_unsafe: Whether to retry non-idempotent methods after errors
+                that leave it unknown whether Telegram received the request,
+                such as read timeouts. Retrying may send duplicate messages.
+            budget_ratio: Retries allowed per request, for each method
+            budget_min_per_second: Retries per second always allowed, for
+                each method
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_unsafe = retry_unsafe
+        self.budget_ratio = budget_ratio
+        self.budget_min_per_second = budget_min_per_second
+
+        self._budgets: dict[str, RetryBudget] = {}
+
+    def _budget(self, method: str) -> RetryBudget:
+        """Get the retry budget for a method."""
+        budget = self._budgets.get(method)
+        if budget is None:
+            budget = RetryBudget(self.budget_ratio, self.budget_min_per_second)
+            self._budgets[method] = budget
+        return budget
+
+    def is_idempotent(self, method: str) -> bool:
+        """
+        Check whether repeating a request to a method is harmless.
+
+        Args:
+            method: API method name
+        """
+        return method.startswith(IDEMPOTENT_PREFIXES)
+
+    def is_retryable(self, method: str, error: Exception) -> bool:
+        """
+        Check whether an error may go away on a retry.
+
+        Args:
+            method: API method name
+            error: Error raised by the request
+
+        Returns:
+            True if the request should be retried
+        """
+        # The request never reached Telegram
+        if isinstance(
+            error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+        ):
+            return True
+
+        if isinstance(error, APIError):
+            status = error.error_code
+        elif isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+        elif isinstance(error, httpx.TransportError):
+            # Timed out or dropped after sending, Telegram may have acted
+            return self.retry_unsafe or self.is_idempotent(method)
+        else:
+            return False
+
+        if status == 429:
+            return True
+        if status >= 500:
+            return self.retry_unsafe or self.is_idempotent(method)
+        # Other 4xx errors can never succeed
+        return False
+
+    def record_request(self, method: str) -> None:
+        """
+        Record a new request, adding to the method's retry budget.
+
+        Args:
+            method: API method name
+        """
+        self._budget(method).deposit()
+
+    def should_retry(
+        self,
+        method: str,
+        error: Exception,
+        attempt: int,
+        max_retries: int | None = None,
+    ) -> bool:
+        """
+        Decide whether to retry a failed request.
+
+        Args:
+            method: API method name
+            error: Error raised by the request
+            attempt: Number of retries made so far
+            max_retries: Override for the maximum number of retries
+
+        Returns:
+            True if the request should be retried
+        """
+        if max_retries is None:
+            max_retries = self.max_retries
+        if attempt >= max_retries or not self.is_retryable(method, error):
+            return False
+        return self._budget(method).withdraw()
+
+    def get_delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """
+        Get the delay before a retry.
+
+        Args:
+            attempt: Number of retries made so far
+            retry_after: Delay requested by Telegram's flood control
+
+        Returns:
+            Delay in seconds
+        """
+        if retry_after is not None:
+            return retry_after
+        return min(self.max_backoff, self.backoff * (2**attempt))
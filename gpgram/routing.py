@@ -0,0 +1,282 @@
+"""
+Handler routing for Gpgram.
+
+This module provides the command router and the pattern matchers used by the
+simple Bot. Commands registered by name are looked up in a dictionary, so
+dispatch cost does not grow with the number of commands; commands registered
+with a regular expression are only tried when no name matches. Message and
+callback patterns are combined into a single expression that finds every
+matching handler in one pass. Handler filters are applied along the way, and
+handlers are indexed by the content types they accept.
+"""
+
+import re
+from collections.abc import Callable
+
+from .filters import ContentIndex, HandlerFilter, UpdateInfo
+
+# A registered handler with its filter
+Route = tuple[Callable, HandlerFilter | None]
+
+# A registered pattern with its handler and filter
+PatternEntry = tuple[re.Pattern | None, Callable, HandlerFilter | None]
+
+# Patterns that are a command name or an alternation of names, e.g. "hi|hello"
+_NAMES_PATTERN = re.compile(r"\w+(?:\|\w+)*")
+
+
+def parse_command(text: str) -> tuple[str, str | None, str] | None:
+    """
+    Split a command message into its parts.
+
+    Args:
+        text: Message text, e.g. "/start@MyBot payload"
+
+    Returns:
+        The lowercased command name, the bot username it is addressed to (if
+        any) and the rest of the text, or None if the text is not a command
+    """
+    if not text.startswith("/"):
+        return None
+
+    end = 1
+    length = len(text)
+    while end < length and not text[end].isspace():
+        end += 1
+
+    name, _, mention = text[1:end].partition("@")
+    return name.lower(), mention or None, text[end:]
+
+
+def _accepted(routes: list[Route], info: UpdateInfo | None) -> list[Callable]:
+    """Get the handlers of the routes whose filters accept an update."""
+    return [
+        handler
+        for handler, handler_filter in routes
+        if handler_filter is None or (info is not None and handler_filter.matches(info))
+    ]
+
+
+class CommandRouter:
+    """
+    Routing table for command handlers.
+
+    Patterns that are plain command names, or alternations of names such as
+    ``"hi|hello"``, are registered in a dictionary keyed by name. Other
+    patterns are regular expressions searched against the message text, in
+    registration order, when no name matches. Handlers registered without a
+    pattern are used when no other handler accepts the command.
+    """
+
+    def __init__(self):
+        self._names: dict[str, list[Route]] = {}
+        self._patterns: dict[str, tuple[re.Pattern, list[Route]]] = {}
+        self._fallback: list[Route] = []
+
+    def __len__(self) -> int:
+        return len(self._names) + len(self._patterns)
+
+    def add(
+        self,
+        pattern: str | None,
+        handler: Callable,
+        handler_filter: HandlerFilter | None = None,
+    ) -> re.Pattern | None:
+        """
+        Register a command handler.
+
+        Args:
+            pattern: Command name, alternation of names or regex pattern. If
+                None, the handler accepts every command.
+            handler: Handler function
+            handler_filter: Conditions the update must meet
+
+        Returns:
+            The compiled pattern, if any
+        """
+        route = (handler, handler_filter)
+        if pattern is None:
+            self._fallback.append(route)
+            return None
+
+        if _NAMES_PATTERN.fullmatch(pattern):
+            for name in pattern.lower().split("|"):
+                self._names.setdefault(name, []).append(route)
+            return re.compile(pattern, re.IGNORECASE)
+
+        entry = self._patterns.get(pattern)
+        if entry is None:
+            entry = (re.compile(pattern, re.IGNORECASE), [])
+            self._patterns[pattern] = entry
+        entry[1].append(route)
+        return entry[0]
+
+    def match(
+        self, name: str, text: str, info: UpdateInfo | None = None
+    ) -> list[Callable]:
+        """
+        Find the handlers for a command.
+
+        Args:
+            name: Lowercased command name
+            text: Message text with any bot username removed
+            info: Facts about the update, for the handler filters
+
+        Returns:
+            The handlers of the first matching command whose filters accept
+            the update, or an empty list
+        """
+        routes = self._names.get(name)
+        if routes is not None:
+            handlers = _accepted(routes, info)
+            if handlers:
+                return handlers
+
+        for compiled, routes in self._patterns.values():
+            if compiled.search(text):
+                handlers = _accepted(routes, info)
+                if handlers:
+                    return handlers
+
+        return _accepted(self._fallback, info)
+
+
+# Patterns that are a literal keyword or an alternation of literal keywords
+_LITERALS_PATTERN = re.compile(r"[^.^$*+?{}\[\]\\|()]+(?:\|[^.^$*+?{}\[\]\\|()]+)*")
+
+
+class PatternMatcher:
+    """
+    Single-pass matcher for message and callback handlers.
+
+    Every handler whose pattern is found in the text and whose filter accepts
+    the update is called, in registration order. Patterns that are literal
+    keywords, or alternations of keywords such as ``"thanks|thank you"``, are
+    compiled into one alternation that finds every keyword in the text in a
+    single scan, so the cost of matching barely grows with the number of
+    keyword handlers. Handlers without a pattern and handlers with other
+    regular expressions are indexed by the content types they accept, so
+    only candidates for the update are checked. The indexes are rebuilt
+    lazily after handlers are added.
+    """
+
+    def __init__(self):
+        self._entries: list[PatternEntry] = []
+        self._keywords: re.Pattern | None = None
+        self._keyword_handlers: dict[str, set[int]] = {}
+        self._separate = ContentIndex()
+        self._always = ContentIndex()
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def handlers(self) -> list[Callable]:
+        """The registered handlers in registration order."""
+        return [handler for _, handler, _ in self._entries]
+
+    def add(
+        self,
+        pattern: str | None,
+        handler: Callable,
+        handler_filter: HandlerFilter | None = None,
+    ) -> re.Pattern | None:
+        """
+        Register a handler.
+
+        Args:
+            pattern: Regex pattern, or None to match everything
+            handler: Handler function
+            handler_filter: Conditions the update must meet
+
+        Returns:
+            The compiled pattern, if any
+        """
+        compiled = re.compile(pattern, re.IGNORECASE) if pattern is not None else None
+        self._entries.append((compiled, handler, handler_filter))
+        self._dirty = True
+        return compiled
+
+    def _build(self) -> None:
+        """Compile the keyword alternation and index the handlers."""
+        keywords: dict[str, set[int]] = {}
+        self._separate = ContentIndex()
+        self._always = ContentIndex()
+        for index, (compiled, _, handler_filter) in enumerate(self._entries):
+            if compiled is None:
+                self._always.add(index, handler_filter)
+            elif _LITERALS_PATTERN.fullmatch(compiled.pattern):
+                for keyword in compiled.pattern.lower().split("|"):
+                    keywords.setdefault(keyword, set()).add(index)
+            else:
+                self._separate.add(index, handler_filter)
+
+        # The alternation reports the longest keyword found at each position;
+        # every shorter keyword found there is a prefix of it, so each keyword
+        # also maps to the handlers of its prefixes
+        self._keyword_handlers = {}
+        for keyword in keywords:
+            indexes = set()
+            for end in range(1, len(keyword) + 1):
+                indexes |= keywords.get(keyword[:end], set())
+            self._keyword_handlers[keyword] = indexes
+
+        if keywords:
+            ordered = sorted(keywords, key=len, reverse=True)
+            alternation = "|".join(re.escape(keyword) for keyword in ordered)
+            self._keywords = re.compile(f"(?=({alternation}))", re.IGNORECASE)
+        else:
+            self._keywords = None
+        self._dirty = False
+
+    def match(self, text: str, info: UpdateInfo | None = None) -> list[Callable]:
+        """
+        Find the handlers whose pattern is found in the text.
+
+        Args:
+            text: Message text or callback data
+            info: Facts about the update, for the handler filters
+
+        Returns:
+            The matching handlers in registration order
+        """
+        if self._dirty:
+            self._build()
+
+        content_type = info.content_type if info is not None else None
+        matched = set(self._always.candidates(content_type))
+        if self._keywords is not None:
+            for found in set(self._keywords.findall(text)):
+                indexes = self._keyword_handlers.get(found.lower())
+                if indexes is None:
+                    # Case folding beyond lower(), e.g. "K" (Kelvin sign)
+                    indexes = self._search_keywords(text)
+                matched |= indexes
+
+        entries = self._entries
+        for index in self._separate.candidates(content_type):
+            compiled, _, handler_filter = entries[index]
+            if (
+                handler_filter is None
+                or (info is not None and handler_filter.matches(info))
+            ) and compiled.search(text):
+                matched.add(index)
+
+        handlers = []
+        for index in sorted(matched):
+            _, handler, handler_filter = entries[index]
+            if handler_filter is None or (
+                info is not None and handler_filter.matches(info)
+            ):
+                handlers.append(handler)
+        return handlers
+
+    def _search_keywords(self, text: str) -> set[int]:
+        """Search every keyword pattern on its own."""
+        return {
+            index
+            for indexes in self._keyword_handlers.values()
+            for index in indexes
+            if self._entries[index][0].search(text)
+        }
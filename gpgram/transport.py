@@ -0,0 +1,286 @@
+"""
+HTTP transport settings for Gpgram.
+
+This module classifies Bot API methods by the kind of traffic they produce
+and provides the timeouts and connection pools used for each kind: long polls
+wait for Telegram to answer, small JSON calls should fail fast, and file
+transfers need time. Each kind of traffic gets its own connection pool, so a
+burst of uploads cannot starve latency-sensitive calls.
+"""
+
+import time
+from typing import Any
+
+import httpx
+
+# Methods that upload files as multipart form data
+UPLOAD_METHODS = frozenset(
+    {
+        "sendPhoto",
+        "sendAudio",
+        "sendDocument",
+        "sendVideo",
+        "sendAnimation",
+        "sendVoice",
+        "sendVideoNote",
+        "sendSticker",
+        "sendMediaGroup",
+        "uploadStickerFile",
+        "setChatPhoto",
+    }
+)
+
+# Headers for requests with a pre-encoded JSON body
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Traffic classes
+LONG_POLL = "long_poll"
+CONTROL = "control"
+BULK = "bulk"
+
+
+def get_traffic_class(method: str, files: dict[str, Any] | None = None) -> str:
+    """
+    Get the traffic class of an API request.
+
+    Args:
+        method: API method name
+        files: Files to upload
+
+    Returns:
+        LONG_POLL for getUpdates, BULK for file uploads and CONTROL otherwise
+    """
+    if method == "getUpdates":
+        return LONG_POLL
+    if files or method in UPLOAD_METHODS:
+        return BULK
+    return CONTROL
+
+
+class Timeouts:
+    """
+    Per-method timeout profiles.
+
+    ``getUpdates`` gets a read timeout of the long poll timeout plus some
+    slack, so an idle long poll never races the client. File uploads and
+    downloads get long timeouts, everything else gets short ones.
+    """
+
+    def __init__(
+        self,
+        request: float = 10.0,
+        upload: float = 120.0,
+        download: float = 120.0,
+        long_poll_slack: float = 10.0,
+        connect: float = 5.0,
+    ):
+        """
+        Initialize the timeout profiles.
+
+        Args:
+            request: Timeout for regular API calls in seconds
+            upload: Timeout for file uploads in seconds
+            download: Timeout for file downloads in seconds
+            long_poll_slack: Seconds added to the long poll timeout of
+                getUpdates to get its read timeout
+            connect: Connect timeout for every request in seconds
+        """
+        self.request = request
+        self.upload = upload
+        self.download = download
+        self.long_poll_slack = long_poll_slack
+        self.connect = connect
+
+        self._request = httpx.Timeout(request, connect=connect)
+        self._upload = httpx.Timeout(upload, connect=connect)
+        self._download = httpx.Timeout(download, connect=connect)
+        self._long_poll: dict[int, httpx.Timeout] = {}
+
+    def for_request(
+        self,
+        method: str,
+        params: dict[str, Any],
+        files: dict[str, Any] | None = None,
+    ) -> httpx.Timeout:
+        """
+        Get the timeout for an API request.
+
+        Args:
+            method: API method name
+            params: Request parameters
+            files: Files to upload
+
+        Returns:
+            Timeout for the request
+        """
+        traffic_class = get_traffic_class(method, files)
+        if traffic_class == LONG_POLL:
+            poll_timeout = params.get("timeout") or 0
+            timeout = self._long_poll.get(poll_timeout)
+            if timeout is None:
+                timeout = httpx.Timeout(
+                    self.request,
+                    connect=self.connect,
+                    read=poll_timeout + self.long_poll_slack,
+                )
+                self._long_poll[poll_timeout] = timeout
+            return timeout
+
+        if traffic_class == BULK:
+            return self._upload
+        return self._request
+
+    def for_download(self) -> httpx.Timeout:
+        """Get the timeout for a file download."""
+        return self._download
+
+
+class TrafficStats:
+    """Request statistics for a traffic class."""
+
+    __slots__ = ("requests", "failures", "in_flight", "total_time")
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.total_time = 0.0
+
+    @property
+    def average_time(self) -> float:
+        """Average request duration in seconds."""
+        return self.total_time / self.requests if self.requests else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Convert the statistics to a dictionary.
+
+        Returns:
+            Dictionary representation of the statistics
+        """
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "average_time": self.average_time,
+        }
+
+
+class ConnectionPools:
+    """
+    Separate HTTP connection pools for each traffic class.
+
+    The long poll gets a dedicated connection, small JSON calls share a large
+    latency-sensitive pool, and uploads and file downloads share a capped
+    bulk pool.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        control_connections: int = 100,
+        bulk_connections: int = 10,
+    ):
+        """
+        Initialize the connection pools.
+
+        Args:
+            timeout: Default timeout for requests in seconds
+            control_connections: Size of the pool for regular API calls
+            bulk_connections: Size of the pool for file uploads and downloads
+        """
+        sizes = {
+            LONG_POLL: 1,
+            CONTROL: control_connections,
+            BULK: bulk_connections,
+        }
+        self._clients = {
+            traffic_class: httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=size, max_keepalive_connections=size
+                ),
+            )
+            for traffic_class, size in sizes.items()
+        }
+        self.stats = {traffic_class: TrafficStats() for traffic_class in sizes}
+
+    def get_client(self, traffic_class: str) -> httpx.AsyncClient:
+        """
+        Get the HTTP client of a traffic class.
+
+        Args:
+            traffic_class: LONG_POLL, CONTROL or BULK
+        """
+        return self._clients[traffic_class]
+
+    async def request(
+        self, traffic_class: str, method: str, url: str, **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request through the pool of a traffic class.
+
+        Args:
+            traffic_class: LONG_POLL, CONTROL or BULK
+            method: HTTP method
+            url: Request URL
+            **kwargs: Additional arguments for ``httpx.AsyncClient.request``
+
+        Returns:
+            HTTP response
+        """
+        stats = self.stats[traffic_class]
+        stats.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return await self._clients[traffic_class].request(method, url, **kwargs)
+        except Exception:
+            stats.failures += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.requests += 1
+            stats.total_time += time.perf_counter() - start
+
+    async def post(self, traffic_class: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a POST request through the pool of a traffic class.
+
+        Args:
+            traffic_class: LONG_POLL, CONTROL or BULK
+            url: Request URL
+            **kwargs: Additional arguments for ``httpx.AsyncClient.request``
+
+        Returns:
+            HTTP response
+        """
+        return await self.request(traffic_class, "POST", url, **kwargs)
+
+    async def get(self, traffic_class: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a GET request through the pool of a traffic class, e.g. to
+        download a file.
+
+        Args:
+            traffic_class: LONG_POLL, CONTROL or BULK
+            url: Request URL
+            **kwargs: Additional arguments for ``httpx.AsyncClient.request``
+
+        Returns:
+            HTTP response
+        """
+        return await self.request(traffic_class, "GET", url, **kwargs)
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Get the statistics of every traffic class.
+
+        Returns:
+            Statistics keyed by traffic class
+        """
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
+
+    async def aclose(self) -> None:
+        """Close every HTTP client."""
+        for client in self._clients.values():
+            await client.aclose()
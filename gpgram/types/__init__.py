@@ -1,11 +1,37 @@
 """
 Telegram API types.
+
+The types are pydantic models by default. Set the ``GPGRAM_TYPES_BACKEND``
+environment variable to ``msgspec`` before importing gpgram to use the
+lighter msgspec-based types from :mod:`gpgram.types.structs` instead.
 """
 
-from .callback_query import CallbackQuery
-from .chat import Chat
-from .message import Message
-from .update import Update
-from .user import User
+import os
+
+BACKEND = os.environ.get("GPGRAM_TYPES_BACKEND", "pydantic").lower()
+
+if BACKEND == "msgspec":
+    from .structs import CallbackQuery, Chat, Message, Update, User
+elif BACKEND == "pydantic":
+    from .callback_query import CallbackQuery
+    from .chat import Chat
+    from .message import Message
+    from .update import Update
+    from .user import User
+else:
+    raise ValueError(
+        f"Unknown types backend {BACKEND!r}, expected 'pydantic' or 'msgspec'"
+    )
+
+from .identity import IdentityMap  # noqa: E402
+from .lazy import LazyUpdate  # noqa: E402
 
-__all__ = ["Update", "Message", "User", "Chat", "CallbackQuery"]
+__all__ = [
+    "Update",
+    "LazyUpdate",
+    "IdentityMap",
+    "Message",
+    "User",
+    "Chat",
+    "CallbackQuery",
+]
@@ -0,0 +1,273 @@
+"""
+Identity map for Telegram users and chats.
+"""
+
+import sys
+import time
+from collections import OrderedDict
+from typing import Any
+
+from . import Chat, User
+from .lazy import MESSAGE_KINDS
+
+# Message fields that hold a user or a chat
+_USER_FIELDS = ("from", "forward_from", "via_bot")
+_CHAT_FIELDS = ("chat", "forward_from_chat")
+
+# Message fields that hold another message
+_MESSAGE_FIELDS = ("reply_to_message", "pinned_message")
+
+# String fields whose values repeat across many users and chats
+INTERNED_FIELDS = frozenset(
+    {"type", "language_code", "username", "first_name", "last_name", "title"}
+)
+
+
+def _intern_strings(data: dict[str, Any]) -> dict[str, Any]:
+    """Copy a payload with its repeated strings interned."""
+    return {
+        key: (
+            sys.intern(value)
+            if key in INTERNED_FIELDS and type(value) is str
+            else value
+        )
+        for key, value in data.items()
+    }
+
+
+def _refresh(obj: Any, new: Any) -> None:
+    """Copy the field values of a fresh object into a cached one."""
+    fields = getattr(type(obj), "__struct_fields__", None) or type(obj).model_fields
+    for name in fields:
+        setattr(obj, name, getattr(new, name))
+
+
+class _Entry:
+    """A cached object with the payload it was built from."""
+
+    __slots__ = ("obj", "data", "expires")
+
+    def __init__(self, obj: Any, data: dict[str, Any], expires: float):
+        self.obj = obj
+        self.data = data
+        self.expires = expires
+
+
+class IdentityMap:
+    """
+    Shared User and Chat instances across updates.
+
+    Most traffic comes from a small set of active users and chats. Instead of
+    building new User and Chat objects for every update, the identity map
+    keeps one instance per ID and refreshes it when its data changes, so
+    updates from the same user share the same object. Repeated strings such
+    as chat types and language codes are interned.
+
+    Entries are evicted when the map is over ``max_size`` (least recently
+    used first) or after ``ttl`` seconds without being seen.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl: float | None = None,
+    ):
+        """
+        Initialize the identity map.
+
+        Args:
+            max_size: Maximum number of users and of chats to keep
+            ttl: Seconds after which an entry that has not been seen again is
+                rebuilt, or None to keep entries until they are evicted
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._users: OrderedDict[int, _Entry] = OrderedDict()
+        self._chats: OrderedDict[int, _Entry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._users) + len(self._chats)
+
+    def _resolve(
+        self,
+        entries: OrderedDict[int, _Entry],
+        model: type,
+        data: dict[str, Any],
+    ) -> Any:
+        """Get the shared instance for a user or chat payload."""
+        key = data.get("id")
+        if key is None:
+            return data
+
+        now = time.monotonic()
+        entry = entries.get(key)
+        if entry is not None and entry.expires > now:
+            entries.move_to_end(key)
+            if self.ttl is not None:
+                entry.expires = now + self.ttl
+            if entry.data is not data and entry.data != data:
+                # The user or chat changed, e.g. a new username
+                new = model.from_dict(_intern_strings(data))
+                _refresh(entry.obj, new)
+                entry.data = data
+            self.hits += 1
+            return entry.obj
+
+        self.misses += 1
+        obj = model.from_dict(_intern_strings(data))
+        expires = now + self.ttl if self.ttl is not None else float("inf")
+        entries[key] = _Entry(obj, data, expires)
+        entries.move_to_end(key)
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+        return obj
+
+    def resolve_user(self, data: dict[str, Any]) -> Any:
+        """
+        Get the shared User instance for a user payload.
+
+        Args:
+            data: User data from Telegram
+
+        Returns:
+            The User, refreshed with the payload's data
+        """
+        return self._resolve(self._users, User, data)
+
+    def resolve_chat(self, data: dict[str, Any]) -> Any:
+        """
+        Get the shared Chat instance for a chat payload.
+
+        Args:
+            data: Chat data from Telegram
+
+        Returns:
+            The Chat, refreshed with the payload's data
+        """
+        return self._resolve(self._chats, Chat, data)
+
+    def resolve_message(self, data: dict[str, Any]) -> dict[str, Any]:
+        """
+        Replace the users and chats of a message payload with shared instances.
+
+        The payload is not modified; a shallow copy is returned.
+
+        Args:
+            data: Message data from Telegram
+
+        Returns:
+            Message data to build a Message from
+        """
+        data = dict(data)
+        for key in _USER_FIELDS:
+            value = data.get(key)
+            if type(value) is dict:
+                data[key] = self.resolve_user(value)
+        for key in _CHAT_FIELDS:
+            value = data.get(key)
+            if type(value) is dict:
+                data[key] = self.resolve_chat(value)
+        for key in _MESSAGE_FIELDS:
+            value = data.get(key)
+            if type(value) is dict:
+                data[key] = self.resolve_message(value)
+        return data
+
+    def resolve_callback_query(self, data: dict[str, Any]) -> dict[str, Any]:
+        """
+        Replace the users and chats of a callback query with shared instances.
+
+        Args:
+            data: Callback query data from Telegram
+
+        Returns:
+            Callback query data to build a CallbackQuery from
+        """
+        data = dict(data)
+        if type(data.get("from")) is dict:
+            data["from"] = self.resolve_user(data["from"])
+        if type(data.get("message")) is dict:
+            data["message"] = self.resolve_message(data["message"])
+        return data
+
+    def resolve_field(self, kind: str, data: Any) -> Any:
+        """
+        Resolve the payload of an update field.
+
+        Args:
+            kind: Update field name, e.g. "message" or "callback_query"
+            data: Field data from Telegram
+
+        Returns:
+            Field data to build the field's type from
+        """
+        if type(data) is not dict:
+            return data
+        if kind in MESSAGE_KINDS:
+            return self.resolve_message(data)
+        if kind == "callback_query":
+            return self.resolve_callback_query(data)
+        return data
+
+    def resolve(self, update_data: dict[str, Any]) -> dict[str, Any]:
+        """
+        Replace the users and chats of an update with shared instances.
+
+        The update data is not modified; a shallow copy is returned.
+
+        Args:
+            update_data: Update data from Telegram
+
+        Returns:
+            Update data to build an Update from
+        """
+        return {
+            kind: self.resolve_field(kind, value) for kind, value in update_data.items()
+        }
+
+    def get_user(self, user_id: int) -> Any | None:
+        """
+        Get a known user.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            The last seen User with this ID, if it is still cached
+        """
+        entry = self._users.get(user_id)
+        return entry.obj if entry is not None else None
+
+    def get_chat(self, chat_id: int) -> Any | None:
+        """
+        Get a known chat.
+
+        Args:
+            chat_id: Chat identifier
+
+        Returns:
+            The last seen Chat with this ID, if it is still cached
+        """
+        entry = self._chats.get(chat_id)
+        return entry.obj if entry is not None else None
+
+    def clear(self) -> None:
+        """Forget every user and chat."""
+        self._users.clear()
+        self._chats.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get the identity map statistics.
+
+        Returns:
+            Number of cached users and chats, hits and misses
+        """
+        return {
+            "users": len(self._users),
+            "chats": len(self._chats),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
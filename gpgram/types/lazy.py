@@ -0,0 +1,225 @@
+"""
+Lazy Update type for Telegram API.
+"""
+
+from typing import TYPE_CHECKING, Any, Optional
+
+from . import CallbackQuery, Chat, Message, Update, User
+
+if TYPE_CHECKING:
+    from .identity import IdentityMap
+
+# Update kinds that carry a message
+MESSAGE_KINDS = frozenset(
+    {"message", "edited_message", "channel_post", "edited_channel_post"}
+)
+
+# Models used to materialize the fields of an update
+FIELD_MODELS: dict[str, type] = {
+    "message": Message,
+    "edited_message": Message,
+    "channel_post": Message,
+    "edited_channel_post": Message,
+    "callback_query": CallbackQuery,
+}
+
+# Field names of the Update type of the selected backend
+UPDATE_FIELDS = frozenset(
+    getattr(Update, "__struct_fields__", None) or Update.model_fields
+)
+
+
+def get_update_kind(data: dict[str, Any]) -> str | None:
+    """
+    Get the kind of an update without parsing it.
+
+    Args:
+        data: Update data from Telegram
+
+    Returns:
+        Name of the field that carries the update, e.g. "message", or None
+        if the update carries nothing
+    """
+    return next((key for key in data if key != "update_id"), None)
+
+
+class LazyUpdate:
+    """
+    An incoming update that is parsed on access.
+
+    Only the update ID, the update kind and the chat and user IDs are decoded
+    up front, which is all that routing needs. Every other field is validated
+    the first time it is accessed and then cached. The attributes and
+    properties of :class:`Update` are available with the same names.
+
+    Attributes:
+        update_id: The update's unique identifier
+        kind: Name of the field that carries the update, e.g. "message"
+        chat_id: Identifier of the chat the update belongs to, if any
+        user_id: Identifier of the user who caused the update, if any
+    """
+
+    __slots__ = (
+        "update_id",
+        "kind",
+        "chat_id",
+        "user_id",
+        "_data",
+        "_cache",
+        "_identity_map",
+    )
+
+    def __init__(
+        self,
+        data: dict[str, Any],
+        identity_map: "IdentityMap | None" = None,
+    ):
+        """
+        Initialize the update.
+
+        Args:
+            data: Update data from Telegram
+            identity_map: Identity map that provides shared User and Chat
+                instances when fields are materialized
+        """
+        self._data = data
+        self._cache: dict[str, Any] = {}
+        self._identity_map = identity_map
+        self.update_id: int = data["update_id"]
+        self.kind = get_update_kind(data)
+
+        payload = data.get(self.kind) if self.kind else None
+        self.chat_id: int | None = None
+        self.user_id: int | None = None
+
+        if payload:
+            if self.kind == "callback_query":
+                chat = (payload.get("message") or {}).get("chat")
+            else:
+                chat = payload.get("chat")
+            user = payload.get("from") or payload.get("user")
+
+            if chat:
+                self.chat_id = chat.get("id")
+            if user:
+                self.user_id = user.get("id")
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "LazyUpdate":
+        """
+        Create a lazy update from a dictionary.
+
+        Args:
+            data: Update data from Telegram
+
+        Returns:
+            A LazyUpdate instance
+        """
+        if data is None:
+            return None
+
+        return cls(data)
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in UPDATE_FIELDS:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+
+        value = self._data.get(name)
+        model = FIELD_MODELS.get(name)
+        if value is not None and model is not None:
+            if self._identity_map is not None:
+                value = self._identity_map.resolve_field(name, value)
+            value = model.from_dict(value)
+
+        self._cache[name] = value
+        return value
+
+    def __repr__(self) -> str:
+        return f"LazyUpdate(update_id={self.update_id}, kind={self.kind!r})"
+
+    @property
+    def text(self) -> str | None:
+        """Get the text of the update's message without parsing it."""
+        if self.kind in MESSAGE_KINDS:
+            return self._data[self.kind].get("text")
+        return None
+
+    @property
+    def message_id(self) -> int | None:
+        """Get the identifier of the update's message without parsing it."""
+        if self.kind in MESSAGE_KINDS:
+            return self._data[self.kind].get("message_id")
+        return None
+
+    @property
+    def callback_data(self) -> str | None:
+        """Get the callback query data without parsing the query."""
+        if self.kind == "callback_query":
+            return self._data["callback_query"].get("data")
+        return None
+
+    @property
+    def effective_message(self) -> Message | None:
+        """
+        Get the effective message from the update.
+
+        Returns:
+            The update's message, if it carries one
+        """
+        if self.kind in MESSAGE_KINDS:
+            return getattr(self, self.kind)
+        return None
+
+    @property
+    def effective_chat(self) -> Optional["Chat"]:
+        """
+        Get the effective chat from the update.
+
+        Returns:
+            The chat from the effective message
+        """
+        message = self.effective_message
+        if message:
+            return message.chat
+        return None
+
+    @property
+    def effective_user(self) -> Optional["User"]:
+        """
+        Get the effective user from the update.
+
+        Returns:
+            The user from the effective message
+        """
+        message = self.effective_message
+        if message:
+            return message.from_user
+        return None
+
+    def to_update(self) -> Update:
+        """
+        Parse the full update.
+
+        Returns:
+            The full Update
+        """
+        data = self._data
+        if self._identity_map is not None:
+            data = self._identity_map.resolve(data)
+        return Update.from_dict(data)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Convert the update to a dictionary, like :meth:`Update.to_dict`.
+
+        Returns:
+            Dictionary representation of the update
+        """
+        return self.to_update().to_dict()
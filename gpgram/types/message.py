@@ -200,3 +200,8 @@ class Message(TelegramObject):
     def get_args(self) -> list[str]:
         """Get the command arguments (alias for args property)."""
         return self.args
+
+
+# Resolve the forward reference to Message in Chat.pinned_message, so chats can
+# be validated on their own
+Chat.model_rebuild()
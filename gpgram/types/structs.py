@@ -0,0 +1,249 @@
+"""
+msgspec-based Telegram API types.
+
+These types mirror the pydantic models in :mod:`gpgram.types` with the same
+attribute names, properties, methods and ``from_dict``/``to_dict`` API, but
+are built on ``msgspec.Struct``. Structs store their fields in slots instead
+of a per-instance dictionary and drop unknown fields instead of keeping them
+as extra data, so each object takes a fraction of the memory and decoding is
+several times faster.
+
+Select them for the whole library with ``GPGRAM_TYPES_BACKEND=msgspec``, or
+import them from this module directly. msgspec must be installed
+(``pip install gpgram[msgspec]``).
+"""
+
+from datetime import datetime
+from typing import Any, TypeVar
+
+import msgspec
+
+# The pydantic models, whose properties and methods the structs share
+from .chat import Chat as _Chat
+from .message import Message as _Message
+from .update import Update as _Update
+from .user import User as _User
+
+T = TypeVar("T", bound="TelegramStruct")
+
+
+def _to_builtins(value: Any) -> Any:
+    """Convert nested structs to dictionaries, as ``model_dump`` does."""
+    if isinstance(value, TelegramStruct):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_to_builtins(item) for item in value]
+    return value
+
+
+class TelegramStruct(msgspec.Struct, kw_only=True, omit_defaults=True):
+    """
+    Base class for all msgspec-based Telegram API types.
+
+    This class provides methods for converting between Python objects and
+    JSON-serializable dictionaries.
+    """
+
+    @classmethod
+    def from_dict(cls: type[T], data: dict[str, Any]) -> T:
+        """
+        Create an instance of the class from a dictionary.
+
+        Args:
+            data: Dictionary containing the object's data
+
+        Returns:
+            An instance of the class
+        """
+        if data is None:
+            return None
+
+        return msgspec.convert(data, cls, strict=False)
+
+    @classmethod
+    def from_json(cls: type[T], data: bytes | str) -> T:
+        """
+        Decode an instance straight from JSON, without building dictionaries.
+
+        Args:
+            data: JSON document
+
+        Returns:
+            An instance of the class
+
+        Raises:
+            ValueError: If the document is not valid JSON for the type
+        """
+        try:
+            return msgspec.json.decode(data, type=cls, strict=False)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Convert the object to a dictionary.
+
+        Returns:
+            Dictionary representation of the object
+        """
+        result = {}
+        for name in self.__struct_fields__:
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = _to_builtins(value)
+        return result
+
+
+class User(TelegramStruct):
+    """This object represents a Telegram user or bot."""
+
+    id: int
+    is_bot: bool
+    first_name: str
+    last_name: str | None = None
+    username: str | None = None
+    language_code: str | None = None
+    is_premium: bool | None = None
+    added_to_attachment_menu: bool | None = None
+    can_join_groups: bool | None = None
+    can_read_all_group_messages: bool | None = None
+    supports_inline_queries: bool | None = None
+
+    full_name = _User.full_name
+    mention = _User.mention
+
+
+class Chat(TelegramStruct):
+    """This object represents a chat."""
+
+    id: int
+    type: str
+    title: str | None = None
+    username: str | None = None
+    first_name: str | None = None
+    last_name: str | None = None
+    photo: dict[str, Any] | None = None
+    bio: str | None = None
+    description: str | None = None
+    invite_link: str | None = None
+    pinned_message: "Message | None" = None
+    permissions: dict[str, Any] | None = None
+    slow_mode_delay: int | None = None
+    message_auto_delete_time: int | None = None
+    has_protected_content: bool | None = None
+    sticker_set_name: str | None = None
+    can_set_sticker_set: bool | None = None
+    linked_chat_id: int | None = None
+    location: dict[str, Any] | None = None
+
+    full_name = _Chat.full_name
+    is_private = _Chat.is_private
+    is_group = _Chat.is_group
+    is_supergroup = _Chat.is_supergroup
+    is_channel = _Chat.is_channel
+
+
+class Message(TelegramStruct):
+    """This object represents a message."""
+
+    message_id: int
+    date: datetime
+    chat: Chat
+    from_user: User | None = msgspec.field(default=None, name="from")
+    text: str | None = None
+    entities: list[dict[str, Any]] | None = None
+    animation: dict[str, Any] | None = None
+    audio: dict[str, Any] | None = None
+    document: dict[str, Any] | None = None
+    photo: list[dict[str, Any]] | None = None
+    sticker: dict[str, Any] | None = None
+    video: dict[str, Any] | None = None
+    video_note: dict[str, Any] | None = None
+    voice: dict[str, Any] | None = None
+    caption: str | None = None
+    caption_entities: list[dict[str, Any]] | None = None
+    contact: dict[str, Any] | None = None
+    dice: dict[str, Any] | None = None
+    game: dict[str, Any] | None = None
+    poll: dict[str, Any] | None = None
+    venue: dict[str, Any] | None = None
+    location: dict[str, Any] | None = None
+    new_chat_members: list[dict[str, Any]] | None = None
+    left_chat_member: dict[str, Any] | None = None
+    new_chat_title: str | None = None
+    new_chat_photo: list[dict[str, Any]] | None = None
+    delete_chat_photo: bool | None = None
+    group_chat_created: bool | None = None
+    supergroup_chat_created: bool | None = None
+    channel_chat_created: bool | None = None
+    message_auto_delete_timer_changed: dict[str, Any] | None = None
+    migrate_to_chat_id: int | None = None
+    migrate_from_chat_id: int | None = None
+    pinned_message: "Message | None" = None
+    invoice: dict[str, Any] | None = None
+    successful_payment: dict[str, Any] | None = None
+    connected_website: str | None = None
+    passport_data: dict[str, Any] | None = None
+    proximity_alert_triggered: dict[str, Any] | None = None
+    voice_chat_scheduled: dict[str, Any] | None = None
+    voice_chat_started: dict[str, Any] | None = None
+    voice_chat_ended: dict[str, Any] | None = None
+    voice_chat_participants_invited: dict[str, Any] | None = None
+    reply_to_message: "Message | None" = None
+    via_bot: User | None = None
+    forward_from: User | None = None
+    forward_from_chat: Chat | None = None
+    forward_from_message_id: int | None = None
+    forward_signature: str | None = None
+    forward_sender_name: str | None = None
+    forward_date: datetime | None = None
+    is_automatic_forward: bool | None = None
+    reply_markup: dict[str, Any] | None = None
+
+    reply = _Message.reply
+    edit_text = _Message.edit_text
+    delete = _Message.delete
+    is_command = _Message.is_command
+    command = _Message.command
+    args = _Message.args
+    get_command = _Message.get_command
+    get_args = _Message.get_args
+
+
+class CallbackQuery(TelegramStruct):
+    """
+    This object represents an incoming callback query from a callback button
+    in an inline keyboard.
+    """
+
+    id: str
+    from_user: User = msgspec.field(name="from")
+    chat_instance: str
+    message: Message | None = None
+    inline_message_id: str | None = None
+    data: str | None = None
+    game_short_name: str | None = None
+
+
+class Update(TelegramStruct):
+    """This object represents an incoming update."""
+
+    update_id: int
+    message: Message | None = None
+    edited_message: Message | None = None
+    channel_post: Message | None = None
+    edited_channel_post: Message | None = None
+    callback_query: CallbackQuery | None = None
+    inline_query: Any | None = None
+    chosen_inline_result: Any | None = None
+    shipping_query: Any | None = None
+    pre_checkout_query: Any | None = None
+    poll: Any | None = None
+    poll_answer: Any | None = None
+    my_chat_member: Any | None = None
+    chat_member: Any | None = None
+    chat_join_request: Any | None = None
+
+    effective_message = _Update.effective_message
+    effective_chat = _Update.effective_chat
+    effective_user = _Update.effective_user
@@ -0,0 +1,128 @@
+"""
+Webhook replies for Gpgram.
+
+Telegram accepts one Bot API call in the body of the response to a webhook
+request. In webhook-reply mode, the first API call a handler makes while the
+webhook request is still open is returned in that response instead of being
+sent as a separate HTTP request, which saves a round trip and an outbound
+connection per update. Later calls, and calls made after the reply budget
+has expired, are sent as usual.
+
+Telegram does not report the result of a call made this way, so the API
+method returns None to the handler.
+"""
+
+import asyncio
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+# Methods whose result the caller needs can never be sent in a reply
+_READ_PREFIX = "get"
+
+_current_reply: ContextVar["WebhookReply | None"] = ContextVar(
+    "gpgram_webhook_reply", default=None
+)
+
+
+class WebhookReply:
+    """
+    The pending response to a webhook request.
+
+    The first eligible API call claims the response; once it is claimed,
+    closed or sent, every other call goes through the HTTP client.
+    """
+
+    __slots__ = ("_future",)
+
+    def __init__(self):
+        self._future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def open(self) -> bool:
+        """Whether an API call can still be sent in the response."""
+        return not self._future.done()
+
+    def claim(self, method: str, params: dict[str, Any]) -> bool:
+        """
+        Send an API call in the response.
+
+        Args:
+            method: API method name
+            params: Method parameters
+
+        Returns:
+            True if the call will be sent in the response
+        """
+        if self._future.done():
+            return False
+        self._future.set_result({"method": method, **params})
+        return True
+
+    def close(self) -> None:
+        """Respond without an API call."""
+        if not self._future.done():
+            self._future.set_result(None)
+
+    async def wait(self, timeout: float | None) -> dict[str, Any] | None:
+        """
+        Wait for an API call to send in the response.
+
+        Args:
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            The response body with the method and its parameters, or None if
+            no call was made in time
+        """
+        try:
+            await asyncio.wait_for(asyncio.shield(self._future), timeout)
+        except TimeoutError:
+            self.close()
+        return self._future.result()
+
+
+@contextmanager
+def use_webhook_reply(reply: WebhookReply) -> Iterator[WebhookReply]:
+    """
+    Send the first API call made in this context in a webhook response.
+
+    The reply is closed when the context exits, so the response is sent as
+    soon as the update has been handled.
+
+    Args:
+        reply: The pending webhook response
+    """
+    token = _current_reply.set(reply)
+    try:
+        yield reply
+    finally:
+        _current_reply.reset(token)
+        reply.close()
+
+
+def send_in_webhook_reply(
+    method: str,
+    params: dict[str, Any],
+    files: dict[str, Any] | None = None,
+) -> bool:
+    """
+    Send an API call in the current webhook response, if possible.
+
+    Calls in a reply count towards Telegram's flood limits like any other, so
+    call this only once the call has its rate limiter slot; if the reply is
+    not available, the same slot is used to send the call as usual.
+
+    Args:
+        method: API method name
+        params: Method parameters
+        files: Files to upload; calls with files are never sent in a reply
+
+    Returns:
+        True if the call was sent in the response and must not be sent again
+    """
+    reply = _current_reply.get()
+    if reply is None or files or method.startswith(_READ_PREFIX):
+        return False
+    return reply.claim(method, params)
@@ -0,0 +1,141 @@
+"""Tests for the ASGI webhook application."""
+
+import asyncio
+import json
+
+import pytest
+
+from gpgram.asgi import create_asgi_app
+from gpgram.bot import Bot
+from gpgram.journal import UpdateJournal
+
+TOKEN = "123:abc"
+
+
+def message_update(update_id, text="hi"):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "A"},
+            "text": text,
+        },
+    }
+
+
+async def request(app, method="POST", path="/webhook", body=b"", headers=()):
+    """Send a request to the application and collect the response."""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": list(headers),
+    }
+    await app(scope, receive, send)
+    start, response = sent
+    return start["status"], response["body"]
+
+
+async def lifespan(app, *events):
+    """Send lifespan events to the application."""
+    messages = [{"type": f"lifespan.{event}"} for event in events]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    await app({"type": "lifespan"}, receive, send)
+    return sent
+
+
+@pytest.mark.asyncio
+async def test_updates_are_handled_without_lifespan(tmp_path):
+    handled = asyncio.Queue()
+    bot = Bot(TOKEN, journal=str(tmp_path / "journal.db"))
+
+    @bot.on_message()
+    async def handler(event):
+        await handled.put(event.text)
+
+    app = create_asgi_app(bot)
+    body = json.dumps(message_update(1, "hello")).encode()
+    assert await request(app, body=body) == (200, b"")
+    assert await asyncio.wait_for(handled.get(), 1) == "hello"
+
+    await app.shutdown()
+    journal = UpdateJournal(tmp_path / "journal.db")
+    await journal.open()
+    try:
+        assert await journal.pending() == []
+    finally:
+        await journal.close()
+
+
+@pytest.mark.asyncio
+async def test_lifespan_replays_the_journal_and_drains(tmp_path):
+    path = tmp_path / "journal.db"
+    journal = UpdateJournal(path)
+    await journal.open()
+    await journal.append_many([message_update(1, "left over")])
+    await journal.close()
+
+    handled = []
+    bot = Bot(TOKEN, journal=str(path))
+
+    @bot.on_message()
+    async def handler(event):
+        await asyncio.sleep(0.01)
+        handled.append(event.text)
+
+    app = create_asgi_app(bot)
+    sent = await asyncio.wait_for(lifespan(app, "startup", "shutdown"), 2)
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert handled == ["left over"]
+
+
+@pytest.mark.asyncio
+async def test_secret_token():
+    async with Bot(TOKEN) as bot:
+        app = create_asgi_app(bot, secret_token="secret", close_bot=False)
+        body = json.dumps(message_update(1)).encode()
+
+        status, _ = await request(app, body=body)
+        assert status == 403
+        headers = [(b"x-telegram-bot-api-secret-token", b"wrong")]
+        status, _ = await request(app, body=body, headers=headers)
+        assert status == 403
+        headers = [(b"x-telegram-bot-api-secret-token", b"secret")]
+        status, _ = await request(app, body=body, headers=headers)
+        assert status == 200
+        await app.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_invalid_requests():
+    async with Bot(TOKEN) as bot:
+        app = create_asgi_app(bot, max_body_size=1000, close_bot=False)
+
+        assert (await request(app, body=b"{not json"))[0] == 400
+        assert (await request(app, body=b"[1, 2]"))[0] == 400
+        assert (await request(app, body=b" " * 2000))[0] == 413
+        assert (await request(app, method="GET"))[0] == 405
+        assert (await request(app, path="/other"))[0] == 404
+
+        status, body = await request(app, method="GET", path="/health")
+        assert status == 200
+        assert json.loads(body)["status"] == "ok"
+        await app.shutdown()
@@ -0,0 +1,87 @@
+"""Tests for backlog shedding."""
+
+import pytest
+
+from gpgram.backlog import BacklogPolicy
+
+NOW = 1_000_000
+
+
+def message(update_id, date, kind="message", **fields):
+    return {
+        "update_id": update_id,
+        kind: {"message_id": update_id, "date": date, "chat": {"id": 1}, **fields},
+    }
+
+
+def test_sheds_old_messages():
+    policy = BacklogPolicy(60, clock=lambda: NOW)
+    assert policy.is_stale(message(1, NOW - 61))
+    assert not policy.is_stale(message(2, NOW - 60))
+    assert policy.is_stale(message(3, NOW - 61, kind="channel_post"))
+    assert policy.is_stale({"update_id": 4, "chat_join_request": {"date": NOW - 61}})
+
+
+def test_edits_are_dated_by_the_edit():
+    policy = BacklogPolicy(60, clock=lambda: NOW)
+    old = NOW - 3600
+    assert not policy.is_stale(
+        message(1, old, kind="edited_message", edit_date=NOW - 1)
+    )
+    assert policy.is_stale(message(2, old, kind="edited_message", edit_date=old))
+
+
+def test_keeps_updates_that_need_an_answer():
+    policy = BacklogPolicy(60, clock=lambda: NOW)
+    old = NOW - 3600
+    assert not policy.is_stale(
+        {"update_id": 1, "callback_query": {"id": "1", "message": {"date": old}}}
+    )
+    assert not policy.is_stale({"update_id": 2, "inline_query": {"id": "2"}})
+    assert not policy.is_stale(message(3, old, successful_payment={}))
+    assert not policy.is_stale(message(4, old, refunded_payment={}))
+
+
+def test_keep_overrides_kinds():
+    policy = BacklogPolicy(60, keep=("message",), clock=lambda: NOW)
+    assert not policy.is_stale(message(1, NOW - 3600))
+    assert policy.is_stale(message(2, NOW - 3600, kind="channel_post"))
+
+
+@pytest.mark.asyncio
+async def test_filter_reports_shed_updates():
+    shed_batches = []
+
+    async def on_shed(updates):
+        shed_batches.append([update_data["update_id"] for update_data in updates])
+
+    policy = BacklogPolicy(60, on_shed=on_shed, clock=lambda: NOW)
+    updates = [
+        message(1, NOW - 3600),
+        message(2, NOW),
+        message(3, NOW - 3600, kind="edited_message"),
+    ]
+    kept = await policy.filter(updates)
+
+    assert [update_data["update_id"] for update_data in kept] == [2]
+    assert shed_batches == [[1, 3]]
+    assert policy.get_stats() == {
+        "checked": 3,
+        "shed": 2,
+        "shed_by_type": {"message": 1, "edited_message": 1},
+    }
+
+
+@pytest.mark.asyncio
+async def test_callback_errors_do_not_fail_the_batch():
+    async def on_shed(updates):
+        raise RuntimeError("boom")
+
+    policy = BacklogPolicy(60, on_shed=on_shed, clock=lambda: NOW)
+    kept = await policy.filter([message(1, NOW - 3600), message(2, NOW)])
+    assert [update_data["update_id"] for update_data in kept] == [2]
+
+
+def test_max_age_must_not_be_negative():
+    with pytest.raises(ValueError):
+        BacklogPolicy(-1)
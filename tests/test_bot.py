@@ -0,0 +1,336 @@
+"""Tests for the simple Bot with a stubbed Bot API."""
+
+import asyncio
+
+import pytest
+
+from gpgram.backlog import BacklogPolicy
+from gpgram.bot import Bot
+from gpgram.journal import UpdateJournal
+
+TOKEN = "123:abc"
+
+
+class FakeTelegram:
+    """
+    Stand-in for the Bot API, installed as the bot's ``_make_request``.
+
+    getUpdates serves the updates from the requested offset on and stops
+    polling once every update has been confirmed.
+    """
+
+    def __init__(self, bot, updates=()):
+        self.bot = bot
+        self.updates = list(updates)
+        self.calls = []
+        bot._make_request = self
+
+    async def __call__(self, method, **params):
+        self.calls.append((method, params))
+        if method == "getUpdates":
+            offset = params.get("offset") or 0
+            batch = [u for u in self.updates if u["update_id"] >= offset]
+            if not batch:
+                self.bot._running = False
+            return batch[: params.get("limit", 100)]
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bot", "username": "MyBot"}
+        return {"message_id": 1}
+
+    def offsets(self):
+        """Offsets sent with getUpdates, in order."""
+        return [
+            params.get("offset")
+            for method, params in self.calls
+            if method == "getUpdates"
+        ]
+
+
+def message_update(update_id, text="hi", chat_id=1, date=0):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": date,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "A"},
+            "text": text,
+        },
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [1, 4])
+async def test_failing_handler_does_not_lose_the_batch(tmp_path, workers):
+    handled = []
+    path = tmp_path / "journal.db"
+
+    async with Bot(TOKEN, journal=str(path)) as bot:
+
+        @bot.on_message()
+        async def handler(event):
+            update_id = event.update.update_id
+            handled.append(update_id)
+            if update_id == 2:
+                raise RuntimeError("boom")
+
+        api = FakeTelegram(bot, [message_update(i, chat_id=i) for i in range(1, 5)])
+        await bot.polling(workers=workers)
+
+    assert sorted(handled) == [1, 2, 3, 4]
+    assert api.offsets()[-1] == 5
+
+    journal = UpdateJournal(path)
+    await journal.open()
+    try:
+        assert await journal.pending() == []
+    finally:
+        await journal.close()
+
+
+class FlakyJournal(UpdateJournal):
+    """Journal whose first write fails."""
+
+    failures = 1
+
+    async def append_many(self, updates):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        await super().append_many(updates)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [1, 4])
+async def test_failed_journal_write_is_fetched_again(tmp_path, workers):
+    handled = []
+
+    async with Bot(TOKEN, journal=FlakyJournal(tmp_path / "journal.db")) as bot:
+
+        @bot.on_message()
+        async def handler(event):
+            handled.append(event.update.update_id)
+
+        FakeTelegram(bot, [message_update(i, chat_id=i) for i in range(1, 4)])
+        await asyncio.wait_for(bot.polling(interval=0, workers=workers), 5)
+
+    assert sorted(handled) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_process_update_opens_the_journal(tmp_path):
+    handled = []
+    path = tmp_path / "journal.db"
+
+    async with Bot(TOKEN, journal=str(path)) as bot:
+
+        @bot.on_message()
+        async def handler(event):
+            handled.append(event.update.update_id)
+
+        await bot.process_update(message_update(1))
+        # Telegram delivers the update again
+        await bot.process_update(message_update(1))
+
+    assert handled == [1]
+    journal = UpdateJournal(path)
+    await journal.open()
+    try:
+        assert await journal.pending() == []
+        assert journal.last_update_id == 1
+    finally:
+        await journal.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prefetch", [0, 10])
+async def test_concurrent_polling_keeps_chat_order(prefetch):
+    handled = []
+
+    async with Bot(TOKEN) as bot:
+
+        @bot.on_message()
+        async def handler(event):
+            update_id = event.update.update_id
+            # Later updates finish first unless they are handled in order
+            await asyncio.sleep(0.01 / update_id)
+            handled.append(update_id)
+
+        updates = [message_update(i, chat_id=i % 3 + 1) for i in range(1, 31)]
+        api = FakeTelegram(bot, updates)
+        await bot.polling(workers=4, prefetch=prefetch)
+
+    assert sorted(handled) == list(range(1, 31))
+    for chat in range(3):
+        chat_updates = [i for i in handled if i % 3 == chat]
+        assert chat_updates == sorted(chat_updates)
+    assert api.offsets()[-1] == 31
+
+
+@pytest.mark.asyncio
+async def test_concurrent_polling_refetches_sparingly():
+    async with Bot(TOKEN) as bot:
+
+        @bot.on_message()
+        async def handler(event):
+            await asyncio.sleep(0.01)
+
+        updates = [message_update(i, chat_id=i % 7 + 1) for i in range(1, 51)]
+        api = FakeTelegram(bot, updates)
+        await bot.polling(workers=4)
+
+    # Each poll returns the updates in flight again, so polls wait until
+    # half of them are done instead of polling after every update
+    assert len(api.offsets()) <= 8
+
+
+@pytest.mark.asyncio
+async def test_prefetch_with_one_worker_keeps_order():
+    handled = []
+
+    async with Bot(TOKEN) as bot:
+
+        @bot.on_message()
+        async def handler(event):
+            handled.append(event.update.update_id)
+
+        updates = [message_update(i, chat_id=i) for i in range(1, 21)]
+        api = FakeTelegram(bot, updates)
+        await bot.polling(workers=1, prefetch=5)
+
+    assert handled == list(range(1, 21))
+    assert api.offsets()[-1] == 21
+
+
+@pytest.mark.asyncio
+async def test_allowed_updates_follow_the_handlers():
+    async with Bot(TOKEN) as bot:
+        assert bot.allowed_updates == ["message", "callback_query"]
+
+        @bot.on_callback()
+        async def on_button(event):
+            pass
+
+        api = FakeTelegram(bot)
+        await bot.polling()
+        assert api.calls[0][1]["allowed_updates"] == ["callback_query"]
+
+        await bot.set_webhook("https://example.org/hook")
+
+        @bot.command("start")
+        async def start(event):
+            pass
+
+        await bot._webhook_task
+        set_webhook = [params for method, params in api.calls if method == "setWebhook"]
+        assert [params["allowed_updates"] for params in set_webhook] == [
+            ["callback_query"],
+            ["message", "callback_query"],
+        ]
+
+
+@pytest.mark.asyncio
+async def test_failed_webhook_refresh_is_reported(capsys):
+    async with Bot(TOKEN) as bot:
+        api = FakeTelegram(bot)
+        await bot.set_webhook("https://example.org/hook")
+
+        async def fail(method, **params):
+            raise RuntimeError("network down")
+
+        bot._make_request = fail
+
+        @bot.on_message()
+        async def handler(event):
+            pass
+
+        await asyncio.gather(bot._webhook_task, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    assert "network down" in capsys.readouterr().out
+    assert len(api.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_commands_addressed_to_other_bots_are_ignored():
+    handled = []
+
+    async with Bot(TOKEN) as bot:
+
+        @bot.command("start")
+        async def start(event):
+            handled.append(event.text)
+
+        texts = ["/start@MyBot now", "/start@OtherBot", "/START@mybot", "/start"]
+        updates = [message_update(i, text) for i, text in enumerate(texts, 1)]
+        api = FakeTelegram(bot, updates)
+        await bot.polling()
+
+    assert handled == ["/start@MyBot now", "/START@mybot", "/start"]
+    # The bot's username is fetched once
+    assert [method for method, _ in api.calls].count("getMe") == 1
+
+
+@pytest.mark.asyncio
+async def test_message_handlers_filter_by_content_type_and_chat():
+    handled = []
+
+    async with Bot(TOKEN) as bot:
+
+        @bot.on_message(content_types="photo")
+        async def photo(event):
+            handled.append(("photo", event.update.update_id))
+
+        @bot.on_message(content_types=["text"], chat_types="group")
+        async def group_text(event):
+            handled.append(("group_text", event.update.update_id))
+
+        @bot.on_message()
+        async def anything(event):
+            handled.append(("anything", event.update.update_id))
+
+        photo_update = message_update(2)
+        del photo_update["message"]["text"]
+        photo_update["message"]["photo"] = [
+            {"file_id": "a", "file_unique_id": "a", "width": 1, "height": 1}
+        ]
+        group_update = message_update(3, chat_id=-5)
+        group_update["message"]["chat"]["type"] = "group"
+
+        FakeTelegram(bot, [message_update(1), photo_update, group_update])
+        await bot.polling()
+
+    assert handled == [
+        ("anything", 1),
+        ("photo", 2),
+        ("anything", 2),
+        ("group_text", 3),
+        ("anything", 3),
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [1, 4])
+async def test_polling_sheds_stale_updates(workers):
+    handled = []
+    shed = []
+
+    async def on_shed(updates):
+        shed.extend(update["update_id"] for update in updates)
+
+    backlog = BacklogPolicy(60, on_shed=on_shed, clock=lambda: 1000)
+    async with Bot(TOKEN, backlog=backlog) as bot:
+
+        @bot.on_message()
+        async def handler(event):
+            handled.append(event.update.update_id)
+
+        updates = [message_update(i, chat_id=i, date=900 + i * 10) for i in range(1, 7)]
+        api = FakeTelegram(bot, updates)
+        await bot.polling(workers=workers)
+
+    # Messages older than a minute are skipped, but still confirmed
+    assert shed == [1, 2, 3]
+    assert sorted(handled) == [4, 5, 6]
+    assert api.offsets()[-1] == 7
+    assert bot.get_backlog_stats()["shed"] == 3
@@ -0,0 +1,43 @@
+"""Tests for the JSON codecs."""
+
+import pytest
+
+from gpgram.codec import CODECS, get_codec
+
+DOCUMENT = {
+    "update_id": 1,
+    "message": {"text": "héllo ✓", "entities": [], "date": 0, "pinned": None},
+    "ok": True,
+}
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_round_trip(name):
+    codec = get_codec(name)
+    encoded = codec.dumps(DOCUMENT)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == DOCUMENT
+    assert codec.loads(encoded.decode()) == DOCUMENT
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_invalid_json_raises_value_error(name):
+    with pytest.raises(ValueError):
+        get_codec(name).loads(b"<html>Bad Gateway</html>")
+
+
+def test_codecs_are_interchangeable():
+    encoded = {name: get_codec(name).dumps(DOCUMENT) for name in CODECS}
+    for name in CODECS:
+        for data in encoded.values():
+            assert get_codec(name).loads(data) == DOCUMENT
+
+
+def test_default_is_the_fastest_installed():
+    expected = next(name for name in ("orjson", "msgspec", "json") if name in CODECS)
+    assert get_codec().name == expected
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("yaml")
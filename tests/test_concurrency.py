@@ -0,0 +1,148 @@
+"""Tests for the offset tracker and the update worker pool."""
+
+import asyncio
+
+import pytest
+
+from gpgram.concurrency import OffsetTracker, UpdateWorkerPool, get_chat_id
+
+
+def message_update(update_id, chat_id):
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "chat": {"id": chat_id}, "date": 0},
+    }
+
+
+def test_get_chat_id():
+    assert get_chat_id(message_update(1, 42)) == 42
+    assert get_chat_id({"update_id": 2, "callback_query": {"from": {"id": 7}}}) == 7
+    assert get_chat_id({"update_id": 3, "inline_query": {"from": {"id": 7}}}) is None
+
+
+def test_offset_commits_in_order():
+    tracker = OffsetTracker()
+    for update_id in (10, 11, 12):
+        assert tracker.track(update_id)
+
+    tracker.done(10)
+    assert tracker.offset == 11
+    assert tracker.in_flight == 2
+
+
+def test_offset_waits_for_earlier_updates():
+    tracker = OffsetTracker()
+    for update_id in (10, 11, 12):
+        tracker.track(update_id)
+
+    tracker.done(12)
+    tracker.done(11)
+    assert tracker.offset is None
+    assert tracker.in_flight == 3
+
+    tracker.done(10)
+    assert tracker.offset == 13
+    assert tracker.in_flight == 0
+
+
+def test_offset_ignores_seen_updates():
+    tracker = OffsetTracker(offset=10)
+    assert not tracker.track(9)
+    assert tracker.track(10)
+    assert not tracker.track(10)
+
+
+@pytest.mark.asyncio
+async def test_wait_for_commit():
+    tracker = OffsetTracker()
+    tracker.track(1)
+    waiter = asyncio.create_task(tracker.wait_for_commit(None))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    tracker.done(1)
+    await asyncio.wait_for(waiter, 1)
+
+
+@pytest.mark.asyncio
+async def test_pool_keeps_chat_order():
+    handled = []
+
+    async def handler(update_data):
+        # Later updates finish first unless they are processed in order
+        await asyncio.sleep(0.01 / update_data["update_id"])
+        handled.append(update_data["update_id"])
+
+    pool = UpdateWorkerPool(handler, workers=4)
+    pool.start()
+    for update_id in range(1, 21):
+        await pool.submit(message_update(update_id, update_id % 3))
+    assert await pool.drain(5)
+
+    assert sorted(handled) == list(range(1, 21))
+    for chat_id in range(3):
+        chat = [update_id for update_id in handled if update_id % 3 == chat_id]
+        assert chat == sorted(chat)
+
+
+@pytest.mark.asyncio
+async def test_pool_try_submit_when_full():
+    release = asyncio.Event()
+
+    async def handler(update_data):
+        await release.wait()
+
+    pool = UpdateWorkerPool(handler, workers=1, queue_size=1)
+    pool.start()
+    assert pool.try_submit(message_update(1, 1))
+    await asyncio.sleep(0)  # The worker takes the first update
+    assert pool.try_submit(message_update(2, 1))
+    assert not pool.try_submit(message_update(3, 1))
+    assert pool.queued == 1
+
+    release.set()
+    assert await pool.drain(1)
+
+
+@pytest.mark.asyncio
+async def test_pool_handler_errors_do_not_stop_workers():
+    handled = []
+
+    async def handler(update_data):
+        if update_data["update_id"] == 1:
+            raise RuntimeError("boom")
+        handled.append(update_data["update_id"])
+
+    pool = UpdateWorkerPool(handler, workers=1)
+    pool.start()
+    await pool.submit(message_update(1, 1))
+    await pool.submit(message_update(2, 1))
+    assert await pool.drain(1)
+    assert handled == [2]
+
+
+@pytest.mark.asyncio
+async def test_pool_drain_deadline():
+    async def handler(update_data):
+        await asyncio.sleep(10)
+
+    pool = UpdateWorkerPool(handler, workers=1)
+    pool.start()
+    await pool.submit(message_update(1, 1))
+    await pool.submit(message_update(2, 1))
+    assert not await pool.drain(0.05)
+
+
+@pytest.mark.asyncio
+async def test_wait_for_in_flight():
+    tracker = OffsetTracker()
+    for update_id in (1, 2, 3, 4):
+        tracker.track(update_id)
+    waiter = asyncio.create_task(tracker.wait_for_in_flight(2))
+    tracker.done(2)
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    tracker.done(1)
+    await asyncio.wait_for(waiter, 1)
+    assert tracker.in_flight == 2
@@ -0,0 +1,53 @@
+"""Tests for the update deduplicator."""
+
+import pytest
+
+from gpgram.dedup import UpdateDeduplicator
+
+
+def test_drops_repeated_ids():
+    dedup = UpdateDeduplicator()
+    assert not dedup.is_duplicate(1)
+    assert not dedup.is_duplicate(2)
+    assert dedup.is_duplicate(1)
+    assert dedup.get_stats() == {"checked": 3, "dropped": 1}
+
+
+def test_remembers_ids_pushed_out_of_the_ring():
+    dedup = UpdateDeduplicator(window=4, max_size=10)
+    for update_id in range(10):
+        assert not dedup.is_duplicate(update_id)
+    for update_id in range(10):
+        assert dedup.is_duplicate(update_id)
+
+
+def test_late_ids_are_remembered():
+    dedup = UpdateDeduplicator(window=4, max_size=10)
+    assert not dedup.is_duplicate(9)
+    assert not dedup.is_duplicate(5)
+    assert dedup.is_duplicate(5)
+    assert dedup.is_duplicate(9)
+
+
+def test_forgotten_ids_are_accepted_again():
+    dedup = UpdateDeduplicator(window=4)
+    assert not dedup.is_duplicate(1)
+    dedup.forget(1)
+    assert not dedup.is_duplicate(1)
+
+    dedup.clear()
+    assert not dedup.is_duplicate(1)
+
+
+def test_memory_is_bounded():
+    dedup = UpdateDeduplicator(window=2, max_size=3)
+    for update_id in range(100):
+        dedup.is_duplicate(update_id)
+    assert len(dedup._lru) == 3
+    # Too old to be remembered, so it is accepted rather than dropped
+    assert not dedup.is_duplicate(0)
+
+
+def test_window_must_be_positive():
+    with pytest.raises(ValueError):
+        UpdateDeduplicator(window=0)
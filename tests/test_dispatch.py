@@ -0,0 +1,200 @@
+"""Tests for handler execution."""
+
+import asyncio
+import threading
+
+import pytest
+
+from gpgram.bot import Bot
+from gpgram.dispatch import get_handler_name
+
+TOKEN = "123:abc"
+
+
+def message_update(text, update_id=1):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "A"},
+            "text": text,
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_handlers_run_in_parallel():
+    started = asyncio.Event()
+    order = []
+
+    async with Bot(TOKEN, concurrent_handlers=True) as bot:
+
+        @bot.on_message()
+        async def waiter(event):
+            # Deadlocks unless the second handler runs at the same time
+            await asyncio.wait_for(started.wait(), 1)
+            order.append("waiter")
+
+        @bot.on_message()
+        async def starter(event):
+            started.set()
+            order.append("starter")
+
+        await bot._process_update(message_update("hi"))
+
+    assert order == ["starter", "waiter"]
+
+
+@pytest.mark.asyncio
+async def test_sequential_handlers_are_barriers():
+    order = []
+
+    async with Bot(TOKEN, concurrent_handlers=True) as bot:
+
+        @bot.on_message()
+        async def slow(event):
+            await asyncio.sleep(0.02)
+            order.append("slow")
+
+        @bot.on_message(sequential=True)
+        async def barrier(event):
+            order.append("barrier")
+
+        @bot.on_message()
+        async def last(event):
+            order.append("last")
+
+        await bot._process_update(message_update("hi"))
+
+    assert order == ["slow", "barrier", "last"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_failures_are_isolated(caplog):
+    handled = []
+
+    async with Bot(TOKEN, concurrent_handlers=True) as bot:
+
+        @bot.on_message()
+        async def failing(event):
+            raise RuntimeError("boom")
+
+        @bot.on_message()
+        async def handler(event):
+            await asyncio.sleep(0.01)
+            handled.append(event.text)
+
+        await bot._process_update(message_update("hi"))
+        stats = bot.get_handler_stats()
+
+    assert handled == ["hi"]
+    assert "failed" in caplog.text
+    assert stats[get_handler_name(failing)]["failures"] == 1
+    assert stats[get_handler_name(handler)]["calls"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrent", [False, True])
+async def test_slow_handlers_are_cancelled(caplog, concurrent):
+    handled = []
+
+    async with Bot(TOKEN, concurrent_handlers=concurrent) as bot:
+
+        @bot.on_message(timeout=0.01)
+        async def slow(event):
+            await asyncio.sleep(1)
+            handled.append("slow")
+
+        @bot.on_message()
+        async def fast(event):
+            handled.append("fast")
+
+        await bot._process_update(message_update("hi"))
+        stats = bot.get_handler_stats()
+
+    assert handled == ["fast"]
+    assert "timed out" in caplog.text
+    assert stats[get_handler_name(slow)]["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_default_handler_timeout():
+    async with Bot(TOKEN, handler_timeout=0.01) as bot:
+
+        @bot.on_message()
+        async def slow(event):
+            await asyncio.sleep(1)
+
+        await asyncio.wait_for(bot._process_update(message_update("hi")), 0.5)
+        stats = bot.get_handler_stats()
+
+    assert stats[get_handler_name(slow)]["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sync_handlers_run_in_the_thread_pool():
+    threads = []
+
+    async with Bot(TOKEN) as bot:
+
+        @bot.on_message()
+        def handler(event):
+            threads.append(threading.current_thread().name)
+
+        await bot._process_update(message_update("hi"))
+
+    assert len(threads) == 1
+    assert threads[0].startswith("gpgram-handler")
+
+
+@pytest.mark.asyncio
+async def test_async_callable_objects_run_on_the_loop():
+    class Handler:
+        def __init__(self):
+            self.texts = []
+
+        async def __call__(self, event):
+            self.texts.append(event.text)
+
+    handler = Handler()
+    async with Bot(TOKEN) as bot:
+        bot.on_message()(handler)
+        await bot._process_update(message_update("hi"))
+
+    assert not hasattr(handler, "_executor")
+    assert handler.texts == ["hi"]
+
+
+@pytest.mark.asyncio
+async def test_sync_wrappers_of_coroutine_functions_are_awaited():
+    texts = []
+
+    async def greet(event):
+        texts.append(event.text)
+
+    async with Bot(TOKEN) as bot:
+
+        @bot.on_message()
+        def wrapper(event):
+            return greet(event)
+
+        await bot._process_update(message_update("hi"))
+
+    assert texts == ["hi"]
+
+
+def test_coroutine_handlers_reject_executors():
+    class Handler:
+        async def __call__(self, event):
+            pass
+
+    async def handler(event):
+        pass
+
+    bot = Bot(TOKEN)
+    with pytest.raises(TypeError):
+        bot.on_message(executor="thread")(handler)
+    with pytest.raises(TypeError):
+        bot.command("start", executor="process")(Handler())
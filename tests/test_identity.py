@@ -0,0 +1,103 @@
+"""Tests for the User and Chat identity map."""
+
+import pytest
+
+from gpgram.bot import Bot
+from gpgram.types import IdentityMap, Update
+
+
+def message_update(update_id, user_id=1, username="alice"):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {
+                "id": user_id,
+                "is_bot": False,
+                "first_name": "A",
+                "username": username,
+            },
+            "text": "hi",
+        },
+    }
+
+
+def build(identity_map, data):
+    return Update.from_dict(identity_map.resolve(data))
+
+
+def test_updates_share_users_and_chats():
+    identity_map = IdentityMap()
+    first = build(identity_map, message_update(1))
+    second = build(identity_map, message_update(2))
+
+    assert first.message.from_user is second.message.from_user
+    assert first.message.chat is second.message.chat
+    assert identity_map.get_stats() == {
+        "users": 1,
+        "chats": 1,
+        "hits": 2,
+        "misses": 2,
+    }
+
+
+def test_changed_user_is_refreshed():
+    identity_map = IdentityMap()
+    first = build(identity_map, message_update(1, username="alice"))
+    second = build(identity_map, message_update(2, username="bob"))
+
+    assert second.message.from_user is first.message.from_user
+    assert first.message.from_user.username == "bob"
+    assert identity_map.get_user(1).username == "bob"
+
+
+def test_resolve_does_not_modify_the_payload():
+    identity_map = IdentityMap()
+    data = message_update(1)
+    build(identity_map, data)
+
+    assert type(data["message"]["from"]) is dict
+
+
+def test_least_recently_used_entries_are_evicted():
+    identity_map = IdentityMap(max_size=2)
+    for user_id in (1, 2, 1, 3):
+        build(identity_map, message_update(user_id, user_id=user_id))
+
+    assert identity_map.get_user(2) is None
+    assert identity_map.get_user(1) is not None
+    assert identity_map.get_chat(3) is not None
+    assert len(identity_map) == 4
+
+
+def test_expired_entries_are_rebuilt():
+    identity_map = IdentityMap(ttl=0)
+    first = build(identity_map, message_update(1))
+    second = build(identity_map, message_update(2))
+
+    assert first.message.from_user is not second.message.from_user
+    assert identity_map.hits == 0
+
+
+def test_clear():
+    identity_map = IdentityMap()
+    build(identity_map, message_update(1))
+    identity_map.clear()
+
+    assert len(identity_map) == 0
+    assert identity_map.get_chat(1) is None
+
+
+@pytest.mark.asyncio
+async def test_bot_keeps_an_empty_identity_map():
+    identity_map = IdentityMap()
+    async with Bot("123:abc", identity_map=identity_map) as bot:
+        assert bot.identity_map is identity_map
+
+    async with Bot("123:abc", identity_map=True) as bot:
+        assert isinstance(bot.identity_map, IdentityMap)
+
+    async with Bot("123:abc") as bot:
+        assert bot.identity_map is None
@@ -0,0 +1,154 @@
+"""Tests for update intake and the webhook queue."""
+
+import asyncio
+
+import pytest
+
+from gpgram.backlog import BacklogPolicy
+from gpgram.dedup import UpdateDeduplicator
+from gpgram.intake import UpdateIntake, WebhookQueue
+from gpgram.journal import UpdateJournal
+
+
+def update(update_id, chat_id=1, date=None):
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "chat": {"id": chat_id}, "date": date},
+    }
+
+
+@pytest.mark.asyncio
+async def test_duplicates_are_not_journaled(tmp_path):
+    journal = UpdateJournal(tmp_path / "journal.db")
+    intake = UpdateIntake(journal, UpdateDeduplicator())
+    await journal.open()
+    try:
+        assert await intake.accept([update(1)]) == [update(1)]
+        intake.done(1)
+        # Telegram delivers the handled update again
+        assert await intake.accept([update(1)]) == []
+        await journal.flush()
+        assert await journal.pending() == []
+        assert intake.get_stats() == {"duplicates": 1, "shed": 0}
+    finally:
+        await intake.close()
+
+
+@pytest.mark.asyncio
+async def test_rejected_updates_are_accepted_again(tmp_path):
+    journal = UpdateJournal(tmp_path / "journal.db")
+    intake = UpdateIntake(journal, UpdateDeduplicator())
+    await journal.open()
+    try:
+        await intake.accept([update(1)])
+        intake.reject(1)
+        assert await intake.accept([update(1)]) == [update(1)]
+    finally:
+        await intake.close()
+
+
+@pytest.mark.asyncio
+async def test_recover_sheds_stale_and_remembers_the_rest(tmp_path):
+    path = tmp_path / "journal.db"
+    journal = UpdateJournal(path)
+    await journal.open()
+    await journal.append_many([update(1, date=0), update(2, date=1000)])
+    await journal.close()
+
+    backlog = BacklogPolicy(60, clock=lambda: 1000)
+    intake = UpdateIntake(UpdateJournal(path), UpdateDeduplicator(), backlog)
+    try:
+        assert await intake.recover() == [update(2, date=1000)]
+        # The redelivery of a recovered update is dropped
+        assert await intake.accept([update(2, date=1000)]) == []
+        intake.done(2)
+        await intake.journal.flush()
+        assert await intake.journal.pending() == []
+    finally:
+        await intake.close()
+
+
+@pytest.mark.asyncio
+async def test_webhook_queue_responses():
+    release = asyncio.Event()
+    handled = []
+
+    async def handler(update_data):
+        await release.wait()
+        handled.append(update_data["update_id"])
+
+    intake = UpdateIntake(deduplicator=UpdateDeduplicator())
+    queue = WebhookQueue(handler, intake, workers=1, queue_size=1)
+    assert await queue.submit(update(1)) == (503, None)
+
+    queue.start()
+    assert await queue.submit(update(1)) == (200, None)
+    await asyncio.sleep(0)  # The worker takes the first update
+    assert await queue.submit(update(2)) == (200, None)
+    assert await queue.submit(update(3)) == (429, None)
+    assert await queue.submit(update(2)) == (200, None)
+
+    release.set()
+    await queue.drain(1)
+    # The rejected update was forgotten, so its redelivery is not a duplicate
+    assert not intake.deduplicator.is_duplicate(3)
+    assert handled == [1, 2]
+    assert queue.get_stats() == {
+        "queued": 0,
+        "accepted": 2,
+        "rejected": 2,
+        "duplicates": 1,
+        "shed": 0,
+    }
+
+
+class FailingJournal(UpdateJournal):
+    async def append_many(self, updates):
+        raise OSError("disk full")
+
+
+@pytest.mark.asyncio
+async def test_failed_appends_are_not_remembered(tmp_path):
+    intake = UpdateIntake(FailingJournal(tmp_path / "journal.db"), UpdateDeduplicator())
+    with pytest.raises(OSError):
+        await intake.accept([update(1)])
+    # The redelivery is accepted, not dropped as a duplicate
+    intake.journal = None
+    assert await intake.accept([update(1)]) == [update(1)]
+
+
+@pytest.mark.asyncio
+async def test_webhook_queue_drain_processes_queued_updates():
+    handled = []
+
+    async def handler(update_data):
+        await asyncio.sleep(0.01)
+        handled.append(update_data["update_id"])
+
+    queue = WebhookQueue(handler, UpdateIntake(), workers=2)
+    queue.start()
+    for update_id in range(1, 6):
+        assert await queue.submit(update(update_id, chat_id=update_id)) == (200, None)
+
+    await queue.drain(1)
+    assert sorted(handled) == [1, 2, 3, 4, 5]
+    # Updates that arrive while shutting down are delivered again later
+    assert await queue.submit(update(6)) == (503, None)
+
+
+@pytest.mark.asyncio
+async def test_webhook_queue_drain_deadline():
+    handled = []
+
+    async def handler(update_data):
+        await asyncio.sleep(1)
+        handled.append(update_data["update_id"])
+
+    queue = WebhookQueue(handler, UpdateIntake(), workers=1)
+    queue.start()
+    await queue.submit(update(1))
+    await queue.submit(update(2))
+
+    await asyncio.wait_for(queue.drain(0.01), 0.5)
+    assert handled == []
+    assert queue.pool._tasks == []
@@ -0,0 +1,79 @@
+"""Tests for the update journal."""
+
+import pytest
+
+from gpgram.journal import UpdateJournal
+
+
+def update(update_id):
+    return {"update_id": update_id, "message": {"message_id": update_id, "text": "hi"}}
+
+
+@pytest.mark.asyncio
+async def test_pending_updates_survive_a_restart(tmp_path):
+    path = tmp_path / "journal.db"
+    journal = UpdateJournal(path)
+    await journal.open()
+    await journal.append_many([update(1), update(2), update(3)])
+    journal.done(2)
+    await journal.close()
+
+    journal = UpdateJournal(path)
+    await journal.open()
+    try:
+        assert await journal.pending() == [update(1), update(3)]
+        assert journal.last_update_id == 3
+    finally:
+        await journal.close()
+
+
+@pytest.mark.asyncio
+async def test_appended_updates_survive_a_crash(tmp_path):
+    path = tmp_path / "journal.db"
+    crashed = UpdateJournal(path)
+    await crashed.open()
+    # The process dies before the update is handled
+    await crashed.append(update(5))
+
+    journal = UpdateJournal(path)
+    await journal.open()
+    try:
+        assert await journal.pending() == [update(5)]
+        assert journal.last_update_id == 5
+    finally:
+        await journal.close()
+        await crashed.close()
+
+
+@pytest.mark.asyncio
+async def test_last_update_id_outlives_handled_updates(tmp_path):
+    path = tmp_path / "journal.db"
+    journal = UpdateJournal(path)
+    await journal.open()
+    await journal.append_many([update(7), update(4)])
+    journal.done(7)
+    journal.done(4)
+    await journal.close()
+
+    journal = UpdateJournal(path)
+    await journal.open()
+    try:
+        assert await journal.pending() == []
+        assert journal.last_update_id == 7
+    finally:
+        await journal.close()
+
+
+@pytest.mark.asyncio
+async def test_append_requires_open_journal(tmp_path):
+    journal = UpdateJournal(tmp_path / "journal.db")
+    with pytest.raises(RuntimeError):
+        await journal.append(update(1))
+    assert journal.last_update_id is None
+
+    await journal.open()
+    try:
+        await journal.flush()
+        assert await journal.pending() == []
+    finally:
+        await journal.close()
@@ -0,0 +1,83 @@
+"""Tests for lazily parsed updates."""
+
+import pytest
+
+from gpgram.bot import Bot
+from gpgram.types import LazyUpdate, Update
+from gpgram.types.lazy import get_update_kind
+
+USER = {"id": 7, "is_bot": False, "first_name": "Ada", "username": "ada"}
+CHAT = {"id": -100, "type": "supergroup", "title": "Group"}
+MESSAGE = {"message_id": 5, "date": 1700000000, "chat": CHAT, "from": USER}
+
+UPDATES = [
+    {"update_id": 1, "message": {**MESSAGE, "text": "hello"}},
+    {"update_id": 2, "edited_message": {**MESSAGE, "text": "edit", "edit_date": 1}},
+    {
+        "update_id": 3,
+        "callback_query": {
+            "id": "42",
+            "from": USER,
+            "chat_instance": "1",
+            "message": {**MESSAGE, "text": "pick one"},
+            "data": "yes",
+        },
+    },
+]
+
+
+def test_get_update_kind():
+    assert [get_update_kind(data) for data in UPDATES] == [
+        "message",
+        "edited_message",
+        "callback_query",
+    ]
+    assert get_update_kind({"update_id": 1}) is None
+
+
+@pytest.mark.parametrize("data", UPDATES)
+def test_lazy_update_matches_update(data):
+    lazy = LazyUpdate(data)
+    update = Update.from_dict(data)
+
+    assert lazy.update_id == update.update_id
+    assert lazy.message == update.message
+    assert lazy.callback_query == update.callback_query
+    assert lazy.effective_chat == update.effective_chat
+    assert lazy.to_dict() == update.to_dict()
+
+
+def test_routing_fields_are_read_without_parsing():
+    lazy = LazyUpdate(UPDATES[2])
+    assert lazy.kind == "callback_query"
+    assert lazy.chat_id == -100
+    assert lazy.user_id == 7
+    assert lazy.callback_data == "yes"
+    assert lazy.text is None
+    assert lazy._cache == {}
+
+
+def test_fields_are_parsed_once():
+    lazy = LazyUpdate(UPDATES[0])
+    assert lazy.message is lazy.message
+    assert lazy.message.text == "hello"
+    assert not hasattr(lazy, "no_such_field")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "lazy_updates, expected", [(False, Update), (True, LazyUpdate)]
+)
+async def test_bot_update_type(lazy_updates, expected):
+    updates = []
+
+    async with Bot("123:abc", lazy_updates=lazy_updates) as bot:
+
+        @bot.on_message()
+        async def handler(event):
+            updates.append(event.update)
+
+        await bot._process_update(UPDATES[0])
+
+    assert type(updates[0]) is expected
+    assert updates[0].message.text == "hello"
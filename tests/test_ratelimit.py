@@ -0,0 +1,94 @@
+"""Tests for outbound rate limiting."""
+
+import asyncio
+
+import pytest
+
+from gpgram.ratelimit import AIMDLimiter, RateLimiter, TokenBucket
+
+
+def test_bucket_allows_a_burst():
+    bucket = TokenBucket(rate=2, capacity=3)
+    now = bucket.updated
+    assert [bucket.reserve(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+
+
+def test_bucket_queues_reservations_over_the_limit():
+    bucket = TokenBucket(rate=2, capacity=1)
+    now = bucket.updated
+    assert bucket.reserve(now) == 0.0
+    assert bucket.reserve(now) == pytest.approx(0.5)
+    assert bucket.reserve(now) == pytest.approx(1.0)
+
+
+def test_bucket_refills_over_time():
+    bucket = TokenBucket(rate=1)
+    now = bucket.updated
+    assert bucket.reserve(now) == 0.0
+    assert not bucket.is_idle(now)
+    assert bucket.reserve(now + 1) == 0.0
+    assert bucket.is_idle(now + 2)
+
+
+def test_bucket_pause():
+    bucket = TokenBucket(rate=1)
+    now = bucket.updated
+    bucket.pause(5, now)
+    assert bucket.reserve(now) == pytest.approx(5)
+    # The next reservation is spread out at the normal rate
+    assert bucket.reserve(now) == pytest.approx(6)
+    assert not bucket.is_idle(now + 5)
+
+
+@pytest.mark.asyncio
+async def test_aimd_limits_concurrency():
+    limiter = AIMDLimiter(initial=2)
+    await limiter.acquire()
+    await limiter.acquire()
+
+    third = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not third.done()
+
+    await limiter.release()
+    await asyncio.wait_for(third, 1)
+    assert limiter.in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_aimd_adjusts_limit():
+    limiter = AIMDLimiter(initial=8, minimum=2, maximum=9)
+    await limiter.acquire()
+    await limiter.release()
+    assert limiter.limit == pytest.approx(8.125)
+
+    for _ in range(3):
+        await limiter.acquire()
+        await limiter.release(throttled=True)
+    assert limiter.limit == 2
+
+    for _ in range(100):
+        await limiter.acquire()
+        await limiter.release()
+    assert limiter.limit == 9
+
+
+def test_only_sends_are_limited():
+    limiter = RateLimiter()
+    assert limiter.is_limited("sendMessage")
+    assert limiter.is_limited("copyMessage")
+    assert not limiter.is_limited("getChatMember")
+    assert not limiter.is_limited("sendChatAction")
+
+
+@pytest.mark.asyncio
+async def test_reads_do_not_wait_for_the_chat_bucket():
+    limiter = RateLimiter()
+    params = {"chat_id": -100}
+    await limiter.acquire("sendMessage", params)
+    await limiter.release("sendMessage", params)
+
+    # The group bucket is now empty for three seconds
+    await asyncio.wait_for(limiter.acquire("getChatMember", params), 0.1)
+    await asyncio.wait_for(limiter.acquire("sendChatAction", params), 0.1)
+    assert limiter.tracked_chats == 1
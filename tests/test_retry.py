@@ -0,0 +1,67 @@
+"""Tests for the retry policy."""
+
+import httpx
+import pytest
+
+from gpgram.exceptions import APIError
+from gpgram.retry import RetryPolicy
+
+REQUEST = httpx.Request("POST", "https://api.telegram.org/bot123/sendMessage")
+
+
+def status_error(status):
+    response = httpx.Response(status, request=REQUEST)
+    return httpx.HTTPStatusError("error", request=REQUEST, response=response)
+
+
+@pytest.mark.parametrize("method", ["sendMessage", "getChat"])
+@pytest.mark.parametrize(
+    "error",
+    [
+        httpx.ConnectError("refused"),
+        httpx.ConnectTimeout("timeout"),
+        httpx.PoolTimeout("timeout"),
+        APIError(429, "Too Many Requests", {"retry_after": 3}),
+        status_error(429),
+    ],
+)
+def test_always_retryable(method, error):
+    assert RetryPolicy().is_retryable(method, error)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        httpx.ReadTimeout("timeout"),
+        APIError(502, "Bad Gateway"),
+        status_error(500),
+    ],
+)
+def test_retryable_if_idempotent(error):
+    policy = RetryPolicy()
+    assert policy.is_retryable("getChat", error)
+    assert not policy.is_retryable("sendMessage", error)
+    assert RetryPolicy(retry_unsafe=True).is_retryable("sendMessage", error)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [APIError(400, "Bad Request"), status_error(403), ValueError("bad")],
+)
+def test_never_retryable(error):
+    policy = RetryPolicy(retry_unsafe=True)
+    assert not policy.is_retryable("getChat", error)
+
+
+def test_should_retry_respects_max_retries():
+    policy = RetryPolicy(max_retries=2)
+    error = httpx.ConnectError("refused")
+    assert policy.should_retry("getMe", error, 0)
+    assert not policy.should_retry("getMe", error, 2)
+    assert policy.should_retry("getMe", error, 2, max_retries=3)
+
+
+def test_get_delay():
+    policy = RetryPolicy(backoff=0.5, max_backoff=3)
+    assert [policy.get_delay(attempt) for attempt in range(4)] == [0.5, 1, 2, 3]
+    assert policy.get_delay(0, retry_after=7) == 7
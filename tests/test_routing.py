@@ -0,0 +1,124 @@
+"""Tests for the command router and the pattern matcher."""
+
+from gpgram.filters import HandlerFilter, UpdateInfo
+from gpgram.routing import CommandRouter, PatternMatcher, parse_command
+
+
+def handler(name):
+    def func():
+        pass
+
+    func.__name__ = name
+    return func
+
+
+def private_message(**fields):
+    return UpdateInfo(
+        {
+            "update_id": 1,
+            "message": {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": 1, "type": "private"},
+                **fields,
+            },
+        }
+    )
+
+
+def test_parse_command():
+    assert parse_command("/Start@MyBot payload") == ("start", "MyBot", " payload")
+    assert parse_command("/help") == ("help", None, "")
+    assert parse_command("help") is None
+
+
+def test_command_names_match_exactly():
+    router = CommandRouter()
+    help_handler = handler("help")
+    router.add("help", help_handler)
+
+    assert router.match("help", "/help") == [help_handler]
+    assert router.match("helpme", "/helpme") == []
+    assert router.match("xhelp", "/xhelp") == []
+    assert router.match("start", "/start help") == []
+
+
+def test_command_alternation_and_case():
+    router = CommandRouter()
+    greet = handler("greet")
+    router.add("Hi|hello", greet)
+
+    assert router.match("hi", "/HI") == [greet]
+    assert router.match("hello", "/hello") == [greet]
+    assert len(router) == 2
+
+
+def test_command_names_take_precedence():
+    router = CommandRouter()
+    prefix = handler("prefix")
+    exact = handler("exact")
+    fallback = handler("fallback")
+    router.add(r"help\w*", prefix)
+    router.add("help", exact)
+    router.add(None, fallback)
+
+    assert router.match("help", "/help") == [exact]
+    assert router.match("helpme", "/helpme") == [prefix]
+    assert router.match("start", "/start") == [fallback]
+
+
+def test_command_filters():
+    router = CommandRouter()
+    group = handler("group")
+    private = handler("private")
+    router.add("start", group, HandlerFilter(chat_types="group"))
+    router.add("start", private, HandlerFilter(chat_types="private"))
+
+    assert router.match("start", "/start", private_message(text="/start")) == [private]
+    assert router.match("start", "/start") == []
+
+
+def test_pattern_matcher_finds_every_match_in_order():
+    matcher = PatternMatcher()
+    thanks = handler("thanks")
+    thank_you = handler("thank_you")
+    digits = handler("digits")
+    catch_all = handler("catch_all")
+    matcher.add("thanks|thank you", thanks)
+    matcher.add("thank", thank_you)
+    matcher.add(r"\d+", digits)
+    matcher.add(None, catch_all)
+
+    assert matcher.match("Thanks for order 42") == [
+        thanks,
+        thank_you,
+        digits,
+        catch_all,
+    ]
+    assert matcher.match("nothing here") == [catch_all]
+    assert matcher.handlers == [thanks, thank_you, digits, catch_all]
+
+
+def test_pattern_matcher_rebuilds_after_add():
+    matcher = PatternMatcher()
+    hello = handler("hello")
+    matcher.add("hello", hello)
+    assert matcher.match("hello") == [hello]
+
+    bye = handler("bye")
+    matcher.add("bye", bye)
+    assert matcher.match("hello and bye") == [hello, bye]
+
+
+def test_pattern_matcher_filters():
+    matcher = PatternMatcher()
+    photos = handler("photos")
+    texts = handler("texts")
+    matcher.add(None, photos, HandlerFilter(content_types="photo"))
+    matcher.add("hi", texts, HandlerFilter(chat_types="private"))
+
+    info = private_message(text="hi")
+    assert matcher.match("hi", info) == [texts]
+    assert matcher.match("hi") == []
+    photo = private_message(photo=[{"file_id": "x"}])
+    assert matcher.match("", photo) == [photos]
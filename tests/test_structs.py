@@ -0,0 +1,57 @@
+"""Tests for the msgspec-based type backend."""
+
+import json
+
+import pytest
+
+from gpgram import types
+
+structs = pytest.importorskip("gpgram.types.structs")
+
+USER = {"id": 7, "is_bot": False, "first_name": "Ada", "username": "ada"}
+CHAT = {"id": -100, "type": "supergroup", "title": "Group"}
+MESSAGE = {"message_id": 5, "date": 1700000000, "chat": CHAT, "from": USER}
+
+UPDATES = [
+    {"update_id": 1, "message": {**MESSAGE, "text": "hello"}},
+    {
+        "update_id": 3,
+        "callback_query": {
+            "id": "42",
+            "from": USER,
+            "chat_instance": "1",
+            "message": {**MESSAGE, "text": "pick one"},
+            "data": "yes",
+        },
+    },
+]
+
+
+def as_dict(value):
+    return value.to_dict() if value is not None else None
+
+
+@pytest.mark.parametrize("data", UPDATES)
+def test_structs_match_the_pydantic_types(data):
+    struct = structs.Update.from_dict(data)
+    model = types.Update.from_dict(data)
+
+    assert struct.to_dict() == model.to_dict()
+    for name in ("effective_message", "effective_chat", "effective_user"):
+        assert as_dict(getattr(struct, name)) == as_dict(getattr(model, name))
+
+
+@pytest.mark.parametrize("data", UPDATES)
+def test_from_json(data):
+    encoded = json.dumps(data).encode()
+    assert structs.Update.from_json(encoded) == structs.Update.from_dict(data)
+
+
+def test_invalid_json_raises_value_error():
+    with pytest.raises(ValueError):
+        structs.Update.from_json(b'{"update_id": "one"}')
+
+
+def test_structs_have_no_instance_dict():
+    user = structs.User.from_dict(USER)
+    assert not hasattr(user, "__dict__")
@@ -0,0 +1,70 @@
+"""Tests for the HTTP transport settings."""
+
+import httpx
+import pytest
+
+from gpgram.bot import Bot
+from gpgram.transport import (
+    BULK,
+    CONTROL,
+    LONG_POLL,
+    ConnectionPools,
+    Timeouts,
+    get_traffic_class,
+)
+
+
+def test_traffic_classes():
+    assert get_traffic_class("getUpdates") == LONG_POLL
+    assert get_traffic_class("sendMessage") == CONTROL
+    assert get_traffic_class("sendPhoto") == BULK
+    assert get_traffic_class("editMessageMedia", files={"photo": b""}) == BULK
+
+
+def test_timeout_profiles():
+    timeouts = Timeouts(request=5, upload=60, long_poll_slack=10, connect=2)
+
+    assert timeouts.for_request("sendMessage", {}) == httpx.Timeout(5, connect=2)
+    assert timeouts.for_request("sendPhoto", {}) == httpx.Timeout(60, connect=2)
+    long_poll = timeouts.for_request("getUpdates", {"timeout": 30})
+    assert long_poll.read == 40
+    assert long_poll.connect == 2
+    assert timeouts.for_download() == httpx.Timeout(120, connect=2)
+
+
+@pytest.mark.asyncio
+async def test_bot_timeout_applies_to_regular_calls():
+    async with Bot("123:abc", timeout=60) as bot:
+        assert bot.timeouts.for_request("sendMessage", {}).read == 60
+
+    timeouts = Timeouts(request=3)
+    async with Bot("123:abc", timeout=60, timeouts=timeouts) as bot:
+        assert bot.timeouts is timeouts
+
+
+@pytest.mark.asyncio
+async def test_pools_record_requests_per_class():
+    requests = []
+
+    def respond(request):
+        requests.append((request.method, request.url.path))
+        return httpx.Response(200, content=b"file")
+
+    pools = ConnectionPools()
+    for traffic_class in (CONTROL, BULK):
+        await pools.get_client(traffic_class).aclose()
+        pools._clients[traffic_class] = httpx.AsyncClient(
+            transport=httpx.MockTransport(respond)
+        )
+    try:
+        await pools.post(CONTROL, "https://example.org/sendMessage", json={})
+        response = await pools.get(BULK, "https://example.org/file/a.jpg")
+    finally:
+        await pools.aclose()
+
+    assert response.content == b"file"
+    assert requests == [("POST", "/sendMessage"), ("GET", "/file/a.jpg")]
+    stats = pools.get_stats()
+    assert stats[CONTROL]["requests"] == 1
+    assert stats[BULK]["requests"] == 1
+    assert stats[LONG_POLL]["requests"] == 0
@@ -0,0 +1,50 @@
+"""Tests for constructing Telegram types from update data."""
+
+from datetime import UTC, datetime
+
+import pytest
+
+from gpgram.types import Update
+
+DATA = {
+    "update_id": 1,
+    "message": {
+        "message_id": 5,
+        "date": 1700000000,
+        "chat": {"id": 1, "type": "private", "first_name": "Ada"},
+        "from": {"id": 1, "is_bot": False, "first_name": "Ada"},
+        "text": "hi",
+        "link_preview_options": {"is_disabled": True},
+    },
+}
+
+
+def test_update_from_dict():
+    update = Update.from_dict(DATA)
+    message = update.message
+
+    assert message.from_user.first_name == "Ada"
+    assert message.chat.id == 1
+    assert message.date == datetime.fromtimestamp(1700000000, UTC)
+    # Fields the types do not declare yet are kept
+    assert message.link_preview_options == {"is_disabled": True}
+    assert update.effective_user is message.from_user
+
+
+def test_update_to_dict_drops_unset_fields():
+    data = Update.from_dict(DATA).to_dict()
+    assert "callback_query" not in data
+    assert "last_name" not in data["message"]["from_user"]
+    assert data["message"]["text"] == "hi"
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"update_id": "one"},
+        {"update_id": 1, "message": {"message_id": 5, "date": 0}},
+    ],
+)
+def test_invalid_data_is_rejected(data):
+    with pytest.raises(ValueError):
+        Update.from_dict(data)
@@ -0,0 +1,82 @@
+"""Tests for webhook-reply mode."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from gpgram.bot import Bot
+from gpgram.ratelimit import RateLimiter
+from gpgram.webhook_reply import WebhookReply, use_webhook_reply
+
+TOKEN = "123:abc"
+
+
+class CountingLimiter(RateLimiter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.acquired = 0
+
+    async def acquire(self, method, params):
+        self.acquired += 1
+        await super().acquire(method, params)
+
+
+def stub_http(bot):
+    """Answer every HTTP request of the bot with a sent message."""
+    sent = []
+
+    async def post(traffic_class, url, **kwargs):
+        sent.append(url.rsplit("/", 1)[-1])
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": 1}})
+
+    bot.pools.post = post
+    return sent
+
+
+@pytest.mark.asyncio
+async def test_first_call_is_sent_in_the_reply():
+    limiter = CountingLimiter()
+    async with Bot(TOKEN, rate_limiter=limiter) as bot:
+        sent = stub_http(bot)
+        reply = WebhookReply()
+        with use_webhook_reply(reply):
+            assert await bot._make_request("sendMessage", chat_id=1, text="a") is None
+            assert await bot._make_request("sendMessage", chat_id=1, text="b")
+
+    assert await reply.wait(0) == {"method": "sendMessage", "chat_id": 1, "text": "a"}
+    assert sent == ["sendMessage"]
+    assert limiter.acquired == 2
+
+
+@pytest.mark.asyncio
+async def test_reads_are_never_sent_in_the_reply():
+    async with Bot(TOKEN) as bot:
+        sent = stub_http(bot)
+        reply = WebhookReply()
+        with use_webhook_reply(reply):
+            assert await bot._make_request("getChat", chat_id=1)
+            assert reply.open
+
+    assert sent == ["getChat"]
+
+
+@pytest.mark.asyncio
+async def test_expired_reply_uses_the_same_rate_limiter_slot():
+    limiter = CountingLimiter()
+    async with Bot(TOKEN, rate_limiter=limiter) as bot:
+        sent = stub_http(bot)
+        # The next call to the chat waits for its slot
+        limiter.pause(1, 0.05)
+
+        reply = WebhookReply()
+        with use_webhook_reply(reply):
+            call = asyncio.create_task(
+                bot._make_request("sendMessage", chat_id=1, text="a")
+            )
+            # The webhook response is sent without the call
+            assert await reply.wait(0.01) is None
+            assert await call
+
+    assert sent == ["sendMessage"]
+    assert limiter.acquired == 1
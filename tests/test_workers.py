@@ -0,0 +1,27 @@
+"""Tests for routing webhook updates to worker processes."""
+
+import pytest
+
+workers = pytest.importorskip("gpgram.api.workers")
+
+
+def update(update_id, chat_id=None):
+    data = {"update_id": update_id}
+    if chat_id is not None:
+        data["message"] = {"message_id": 1, "date": 0, "chat": {"id": chat_id}}
+    return data
+
+
+@pytest.mark.parametrize("chat_id", [1, 42, -1001234567890])
+def test_chats_stay_with_one_worker(chat_id):
+    indexes = {
+        workers.get_worker_index(update(update_id, chat_id), 4)
+        for update_id in range(20)
+    }
+    assert len(indexes) == 1
+    assert 0 <= indexes.pop() < 4
+
+
+def test_updates_without_a_chat_are_spread():
+    indexes = {workers.get_worker_index(update(update_id), 4) for update_id in range(8)}
+    assert indexes == {0, 1, 2, 3}